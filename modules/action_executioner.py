@@ -1,19 +1,58 @@
 from typing import Dict
 import os
 import json
+import re
 import subprocess
 import sys
+from modules.chunked_reader import ChunkedReader
+from modules.code_navigator import CodeNavigator
+from modules.data_profiler import DataProfiler
+from modules.directory_snapshot import DirectorySnapshot
+from modules.line_index import LineIndexCache
 from modules.llm_assistant import LLMAssistant
-from low_level_actions import build_full_path
+from modules.observation_store import ObservationStore
+from modules.script_cache import ScriptResultCache
+from modules.script_patcher import PatchError, ScriptPatcher
+from modules.script_runner import ScriptRunner
+from modules.script_validator import ScriptValidator
+from modules.smoke_run import SmokeRunner
+from modules.job_manager import JobManager
+from modules.parameter_sweep import ParameterSweep
+from modules.training_snapshot import TrainingSnapshot
+from modules.version_store import VersionStore
+from low_level_actions import build_full_path, parse_bool, summarize_diff
 
 
 class ActionExecutioner:
     FINAL_ANSWER_FLAG = 'Final answer submitted'
-
-    def __init__(self, action_mapping: dict, assistant: LLMAssistant):
+    MAX_INSPECTED_LINES = 100
+
+    def __init__(self, action_mapping: dict, assistant: LLMAssistant, observation_store: ObservationStore = None,
+                 script_cache: ScriptResultCache = None, training_snapshot: TrainingSnapshot = None,
+                 script_runner: ScriptRunner = None, script_validator: ScriptValidator = None,
+                 smoke_runner: SmokeRunner = None, job_manager: JobManager = None,
+                 parameter_sweep: ParameterSweep = None, data_profiler: DataProfiler = None,
+                 chunked_reader: ChunkedReader = None, code_navigator: CodeNavigator = None,
+                 line_index_cache: LineIndexCache = None, directory_snapshot: DirectorySnapshot = None,
+                 script_patcher: ScriptPatcher = None, version_store: VersionStore = None):
         self.action_mapping = action_mapping
         self.task_dir_path = None
         self.assistant = assistant
+        self.observation_store = observation_store
+        self.script_cache = script_cache
+        self.training_snapshot = training_snapshot
+        self.script_runner = script_runner if script_runner is not None else ScriptRunner()
+        self.script_validator = script_validator
+        self.smoke_runner = smoke_runner if smoke_runner is not None else SmokeRunner()
+        self.job_manager = job_manager if job_manager is not None else JobManager()
+        self.parameter_sweep = parameter_sweep if parameter_sweep is not None else ParameterSweep()
+        self.data_profiler = data_profiler if data_profiler is not None else DataProfiler()
+        self.chunked_reader = chunked_reader if chunked_reader is not None else ChunkedReader()
+        self.code_navigator = code_navigator if code_navigator is not None else CodeNavigator()
+        self.line_index_cache = line_index_cache if line_index_cache is not None else LineIndexCache()
+        self.directory_snapshot = directory_snapshot if directory_snapshot is not None else DirectorySnapshot()
+        self.script_patcher = script_patcher
+        self.version_store = version_store if version_store is not None else VersionStore()
 
     def setup(self, task_dir_path: str):
         """
@@ -24,7 +63,12 @@ class ActionExecutioner:
 
             Behavior:
                 - Stores the provided task directory path in an instance variable.
+                - Cancels the background jobs of the previous task and forgets its directory snapshot.
+                - Starts an empty version history for the task files, removing the versions of the previous task.
             """
+        self.job_manager.cancel_all()
+        self.directory_snapshot.clear()
+        self.version_store.setup(task_dir_path)
         self.task_dir_path = task_dir_path
 
     def execute(self, action_name: str, action_args: dict) -> str:
@@ -42,7 +86,12 @@ class ActionExecutioner:
                 - If 'action_name' is None, returns an error message.
                 - If 'action_args' is None, returns an error message.
                 - If 'action_name' is not found in 'self.action_mapping', returns an error message.
-                - Adds 'task_folder_path' and 'assistant' to 'action_args' before executing the action.
+                - Adds 'task_folder_path', 'assistant', 'script_runner', 'smoke_runner', 'job_manager',
+                  'parameter_sweep', 'data_profiler', 'chunked_reader', 'code_navigator', 'line_index_cache',
+                  'directory_snapshot', 'version_store' and the optional helpers
+                  ('observation_store', 'script_cache', 'training_snapshot', 'script_validator', 'script_patcher')
+                  to 'action_args'
+                  before executing the action.
                 - Calls the corresponding function from 'self.action_mapping' and returns its result.
 
             Example:
@@ -64,6 +113,21 @@ class ActionExecutioner:
 
         action_args["task_folder_path"] = self.task_dir_path
         action_args["assistant"] = self.assistant
+        action_args["script_runner"] = self.script_runner
+        action_args["smoke_runner"] = self.smoke_runner
+        action_args["job_manager"] = self.job_manager
+        action_args["parameter_sweep"] = self.parameter_sweep
+        action_args["data_profiler"] = self.data_profiler
+        action_args["chunked_reader"] = self.chunked_reader
+        action_args["code_navigator"] = self.code_navigator
+        action_args["line_index_cache"] = self.line_index_cache
+        action_args["directory_snapshot"] = self.directory_snapshot
+        action_args["script_patcher"] = self.script_patcher
+        action_args["version_store"] = self.version_store
+        action_args["observation_store"] = self.observation_store
+        action_args["script_cache"] = self.script_cache
+        action_args["training_snapshot"] = self.training_snapshot
+        action_args["script_validator"] = self.script_validator
 
         return self.action_mapping[action_name](action_args)
 
@@ -73,12 +137,16 @@ class ActionExecutioner:
 
             Behavior:
                 - Calls the 'end_conversation' method of the 'assistant' instance.
+                - Cancels all background jobs.
+                - Removes the stored versions of the task files.
 
             Example:
                 self.shutdown()
                 -> Ends the ongoing conversation handled by 'self.assistant'.
             """
         self.assistant.end_conversation()
+        self.job_manager.cancel_all()
+        self.version_store.clear()
 
     @staticmethod
     def list_files(args: Dict) -> str:
@@ -95,6 +163,10 @@ class ActionExecutioner:
                     dir_path or current directory is dir_path is empty, or an error
                     message if dir_path is invalid.]
         ‘‘‘
+        With any of the optional "recursive", "max_depth", "pattern" or "page"
+        inputs, the listing includes subdirectories (if "recursive" is true),
+        file sizes and line counts, filtered by the "pattern" glob, and split
+        into pages.
         """
         try:
             dir_path = args.get('dir_path', '.')
@@ -103,11 +175,78 @@ class ActionExecutioner:
             if not os.path.exists(full_dir_path):
                 return f"Error: Directory '{full_dir_path}' does not exist"
 
+            if any(args.get(name) is not None for name in ('recursive', 'max_depth', 'pattern', 'page')):
+                max_depth = args.get('max_depth')
+                return args["directory_snapshot"].describe(
+                    full_dir_path, display_path=dir_path or '.',
+                    recursive=parse_bool(args.get('recursive', False)),
+                    max_depth=int(max_depth) if max_depth is not None else DirectorySnapshot.DEFAULT_MAX_DEPTH,
+                    pattern=args.get('pattern') or None,
+                    page=int(args.get('page') or 1))
+
             files = os.listdir(full_dir_path)
             return json.dumps(files, indent=2)
         except Exception as e:
             return f"Error listing files: {str(e)}"
 
+    @staticmethod
+    def __run_script(script_runner: ScriptRunner, task_dir_path: str, command: list,
+                     env: dict | None = None) -> tuple[str, int | None]:
+        """
+            Runs a python script in a child process and formats its output as an observation.
+
+            Parameters:
+                script_runner (ScriptRunner): The runner enforcing the time limits of the script.
+                task_dir_path (str): The path to the task directory, used as working directory.
+                command (list): The command running the script, such as [sys.executable, "train.py"].
+                env (dict | None): Environment variables to add to the environment of the script.
+
+            Returns:
+                tuple[str, int | None]: The observation and the exit code, or None if the script did not finish.
+
+            Behavior:
+                - If the script is stopped, the output collected until then is returned with the reason.
+        """
+        try:
+            result = script_runner.run(command, cwd=os.path.abspath(task_dir_path) or '.', env=env)
+            return result.to_observation(), result.return_code
+
+        except (OSError, subprocess.SubprocessError) as e:
+            return f"Error executing script: {str(e)}", None
+
+    @staticmethod
+    def __smoke_run(args: Dict, script_name: str) -> tuple[str, int | None]:
+        """
+            Runs a script on a down-sampled copy of the task directory, with capped training.
+
+            Parameters:
+                args (Dict): The arguments of the action, with 'smoke_runner' and 'script_runner'.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                tuple[str, int | None]: The observation and the exit code, or None if the script did not finish.
+
+            Behavior:
+                - The smoke run is stopped after the smoke runner's timeout or when the task deadline passes.
+                - The memory limits and the execution scheduler of the task's script runner apply, and the resource
+                  usage is added to its totals.
+                - The copy, including every file the script wrote, is removed afterwards.
+        """
+        smoke_runner = args["smoke_runner"]
+        smoke_runner.script_runner.set_deadline(args["script_runner"].deadline)
+        smoke_runner.script_runner.resource_totals = args["script_runner"].resource_totals
+        smoke_runner.script_runner.memory_limit_mb = args["script_runner"].memory_limit_mb
+        smoke_runner.script_runner.address_space_limit_mb = args["script_runner"].address_space_limit_mb
+        smoke_runner.script_runner.scheduler = args["script_runner"].scheduler
+        smoke_dir_path, note = smoke_runner.create_copy(args["task_folder_path"])
+        try:
+            observation, return_code = ActionExecutioner.__run_script(smoke_runner.script_runner, smoke_dir_path,
+                                                                      [sys.executable, script_name],
+                                                                      env=smoke_runner.get_environment())
+        finally:
+            smoke_runner.remove_copy(smoke_dir_path)
+        return f"{note}\n{observation}", return_code
+
     @staticmethod
     def execute_script(args: Dict) -> str:
         """
@@ -132,42 +271,259 @@ class ActionExecutioner:
             if not os.path.exists(full_script_name):
                 return f"Error: Script '{full_script_name}' does not exist"
 
-            python_executable = sys.executable
+            script_validator = args.get("script_validator")
+            if script_validator is not None:
+                problems = script_validator.validate(args["task_folder_path"], script_name)
+                if problems:
+                    return (f"{script_validator.describe_problems(script_name, problems)}\n"
+                            f"The script was not executed. Fix these problems and execute it again.")
+
+            script_cache = args.get("script_cache")
+            snapshot_before = None
+            if script_cache is not None:
+                script_name = os.path.normpath(script_name).replace(os.sep, "/")
+                cached_observation = script_cache.lookup(args["task_folder_path"], script_name)
+                if cached_observation is not None:
+                    return cached_observation
+                snapshot_before = script_cache.snapshot(args["task_folder_path"])
+
+            smoke_runner = args.get("smoke_runner")
+            if smoke_runner is not None and smoke_runner.run_before_execution:
+                smoke_observation, smoke_return_code = ActionExecutioner.__smoke_run(args, script_name)
+                if smoke_return_code not in (0, None):
+                    return (f"{smoke_observation}\nThe smoke run failed, so the full run was skipped. "
+                            f"Fix the script and execute it again.")
+
+            training_snapshot = args.get("training_snapshot")
+            command, resume_note = [sys.executable, script_name], None
+            if training_snapshot is not None:
+                script_name = os.path.normpath(script_name).replace(os.sep, "/")
+                command, resume_note = training_snapshot.prepare(args["task_folder_path"], script_name)
+
+            observation, return_code = ActionExecutioner.__run_script(args["script_runner"],
+                                                                      args["task_folder_path"], command)
+
+            if training_snapshot is not None:
+                training_snapshot.finish(args["task_folder_path"], script_name, succeeded=return_code == 0)
+                if resume_note is not None:
+                    observation = f"{resume_note}\n{observation}"
+
+            if script_cache is not None and return_code == 0:
+                script_cache.store(args["task_folder_path"], script_name, snapshot_before, observation)
+
+            return observation
+
+        except Exception as e:
+            return f"Error executing script: {str(e)}"
+
+    @staticmethod
+    def smoke_run_script(args: Dict) -> str:
+        """
+        Use this to quickly check that a python script runs end to end before training on the full data.
+        Usage:
+        ‘‘‘
+        Action: Smoke Run Script
+        Action Input: {
+        "script_name": [a valid python script name with relative path to
+                        current directory if needed]
+        }
+        Observation: [The observation will be the output of the script run on a
+                    temporary copy of the task directory with down-sampled data files
+                    and training capped to a few steps. Files written by the script
+                    are discarded and the reported metrics are meaningless.]
+        ‘‘‘
+        """
+        try:
+            script_name = args.get('script_name')
+            if not script_name:
+                return "Error: No script name provided"
+
+            full_script_name = build_full_path(args["task_folder_path"], script_name)
+
+            if not os.path.exists(full_script_name):
+                return f"Error: Script '{full_script_name}' does not exist"
+
+            observation, _ = ActionExecutioner.__smoke_run(args, script_name)
+            return observation
+
+        except Exception as e:
+            return f"Error smoke running script: {str(e)}"
+
+    @staticmethod
+    def run_parameter_sweep(args: Dict) -> str:
+        """
+        Use this to try several hyperparameter settings of a python script at once.
+        The script must read the parameters from environment variables (e.g.
+        os.environ.get("LR")) or from command line arguments (e.g. with argparse).
+        Usage:
+        '''
+        Action: Run Parameter Sweep
+        Action Input: {
+        "script_name": [a valid python script name with relative path to
+                        current directory if needed],
+        "parameters": [a JSON object mapping every parameter to the list of
+                    values to try, such as {"LR": [0.01, 0.001], "--epochs": [2, 4]}.
+                    Names starting with "-" are passed as command line arguments,
+                    all others as environment variables. At most 8 combinations.]
+        }
+        Observation: [The observation will be a table with the status and the
+                    final metrics of every combination, or an error message.]
+        '''
+        """
+        try:
+            script_name = args.get('script_name')
+            parameters = args.get('parameters')
+            if not script_name:
+                return "Error: No script name provided"
+            if isinstance(parameters, str):
+                parameters = json.loads(parameters)
+            if not isinstance(parameters, dict):
+                return "Error: 'parameters' must be a JSON object mapping parameter names to lists of values"
+
+            full_script_name = build_full_path(args["task_folder_path"], script_name)
+
+            if not os.path.exists(full_script_name):
+                return f"Error: Script '{full_script_name}' does not exist"
+
+            script_validator = args.get("script_validator")
+            if script_validator is not None:
+                problems = script_validator.validate(args["task_folder_path"], script_name)
+                if problems:
+                    return (f"{script_validator.describe_problems(script_name, problems)}\n"
+                            f"The sweep was not run. Fix these problems and run it again.")
 
-            try:
-                result = subprocess.run(
-                    [python_executable, script_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=None,
-                    cwd=os.path.abspath(args["task_folder_path"]) or '.'
-                )
+            return args["parameter_sweep"].run(args["script_runner"], args["task_folder_path"], script_name,
+                                               parameters)
+        except Exception as e:
+            return f"Error running parameter sweep: {str(e)}"
 
-                output = []
-                if result.stdout:
-                    output.append("Script Output: '''")
-                    output.append(result.stdout)
+    @staticmethod
+    def start_background_job(args: Dict) -> str:
+        """
+        Use this to start a long running python script in the background and
+        keep working while it runs. The script must already exist.
+        Usage:
+        '''
+        Action: Start Background Job
+        Action Input: {
+        "script_name": [a valid python script name with relative path to
+                        current directory if needed]
+        }
+        Observation: [The observation will be the id of the started job, such as
+                    "job-1", or an error message.]
+        '''
+        """
+        try:
+            script_name = args.get('script_name')
+            if not script_name:
+                return "Error: No script name provided"
 
-                if result.stderr:
-                    # pass
-                    output.append("Errors and Warnings:")
-                    output.append(result.stderr)
+            full_script_name = build_full_path(args["task_folder_path"], script_name)
 
-                output.append(f"Process finished with exit code {result.returncode}")
-                output.append("'''")
+            if not os.path.exists(full_script_name):
+                return f"Error: Script '{full_script_name}' does not exist"
 
-                if not output:
-                    return "Script executed successfully with no output"
+            script_validator = args.get("script_validator")
+            if script_validator is not None:
+                problems = script_validator.validate(args["task_folder_path"], script_name)
+                if problems:
+                    return (f"{script_validator.describe_problems(script_name, problems)}\n"
+                            f"The job was not started. Fix these problems and start it again.")
+
+            job = args["job_manager"].start(args["script_runner"], args["task_folder_path"], script_name)
+            return (f"Started background job '{job.job_id}' running '{script_name}'. Use Check Background Job to "
+                    f"see its progress, Wait For Background Job to get its result or Cancel Background Job to "
+                    f"stop it.")
+        except Exception as e:
+            return f"Error starting background job: {str(e)}"
 
-                return "\n".join(output)
+    @staticmethod
+    def __get_job(args: Dict):
+        job_id = args.get('job_id')
+        if not job_id:
+            return None, "Error: No job id provided"
 
-            except subprocess.TimeoutExpired:
-                return "Error: Script execution timed out after 30 seconds"
-            except subprocess.SubprocessError as e:
-                return f"Error executing script: {str(e)}"
+        job = args["job_manager"].get(str(job_id).strip())
+        if job is None:
+            return None, f"Error: Job '{job_id}' does not exist"
+        return job, None
 
+    @staticmethod
+    def check_background_job(args: Dict) -> str:
+        """
+        Use this to see the status and the latest output of a background job
+        without waiting for it.
+        Usage:
+        '''
+        Action: Check Background Job
+        Action Input: {
+        "job_id": [the id of the job, such as "job-1"],
+        "tail_lines": [optional number of latest output lines to show, 20 by default]
+        }
+        Observation: [The observation will be the status of the job with the
+                    latest lines of its output, or its full output if it is no
+                    longer running.]
+        '''
+        """
+        try:
+            job, error = ActionExecutioner.__get_job(args)
+            if error is not None:
+                return error
+
+            tail_lines = int(args.get('tail_lines') or JobManager.DEFAULT_TAIL_LINES)
+            return args["job_manager"].describe(job, tail_lines=max(1, tail_lines))
         except Exception as e:
-            return f"Error executing script: {str(e)}"
+            return f"Error checking background job: {str(e)}"
+
+    @staticmethod
+    def wait_for_background_job(args: Dict) -> str:
+        """
+        Use this to wait until a background job stops running and get its output.
+        Usage:
+        '''
+        Action: Wait For Background Job
+        Action Input: {
+        "job_id": [the id of the job, such as "job-1"],
+        "timeout_seconds": [optional maximum number of seconds to wait]
+        }
+        Observation: [The observation will be the full output of the job, or its
+                    status and latest output if the timeout passed first.]
+        '''
+        """
+        try:
+            job, error = ActionExecutioner.__get_job(args)
+            if error is not None:
+                return error
+
+            timeout = args.get('timeout_seconds')
+            args["job_manager"].wait(job, timeout=float(timeout) if timeout is not None else None)
+            return args["job_manager"].describe(job)
+        except Exception as e:
+            return f"Error waiting for background job: {str(e)}"
+
+    @staticmethod
+    def cancel_background_job(args: Dict) -> str:
+        """
+        Use this to stop a background job.
+        Usage:
+        '''
+        Action: Cancel Background Job
+        Action Input: {
+        "job_id": [the id of the job, such as "job-1"]
+        }
+        Observation: [The observation will be the output the job produced until
+                    it was cancelled.]
+        '''
+        """
+        try:
+            job, error = ActionExecutioner.__get_job(args)
+            if error is not None:
+                return error
+
+            args["job_manager"].cancel(job)
+            return args["job_manager"].describe(job)
+        except Exception as e:
+            return f"Error cancelling background job: {str(e)}"
 
     @staticmethod
     def final_answer(args: Dict) -> str:
@@ -214,6 +570,8 @@ class ActionExecutioner:
                     and lines in the file. If the file does not exist, the observation
                     will be an error message.]
         ‘‘‘
+        Large files are split into chunks that are analysed concurrently and
+        merged by a final request.
 
         """
         try:
@@ -235,12 +593,78 @@ class ActionExecutioner:
 
             llm_instruction = things_to_look_for
 
-            llm_response = llm_assistant.consult_once(script_content=content,
-                                                      instructions=llm_instruction)
+            llm_response = args["chunked_reader"].understand(assistant=llm_assistant, file_name=file_name,
+                                                             content=content, instructions=llm_instruction)
             return llm_response
         except Exception as e:
             return f"Error understanding file: {str(e)}"
 
+    @staticmethod
+    def profile_data(args: Dict) -> str:
+        """
+        Use this to learn the schema and statistics of a data file without
+        sending it to the supporting assistant. The file is read in chunks,
+        so large files are fine.
+        Usage:
+        ‘‘‘
+        Action: Profile Data
+        Action Input: {
+        "file_name": [a valid data file name (CSV, TSV, JSON Lines, JSON or
+                    Parquet) with relative path to current directory if needed]
+        }
+        Observation: [The observation will be the number of rows and columns,
+                    an example row and one line of statistics per column. If
+                    the file does not exist, the observation will be an error
+                    message.]
+        ‘‘‘
+
+        """
+        try:
+            file_name = args.get('file_name')
+            if not file_name:
+                return "Error: Missing file name"
+
+            full_file_path = build_full_path(args["task_folder_path"], file_name)
+            if not os.path.isfile(full_file_path):
+                return f"Error: File '{full_file_path}' does not exist"
+
+            return args["data_profiler"].profile(full_file_path, display_name=file_name)
+        except Exception as e:
+            return f"Error profiling data: {str(e)}"
+
+    @staticmethod
+    def recall_observation(args: Dict) -> str:
+        """
+        Use this to see the full text of an earlier observation that was
+        replaced by a short digest in the conversation.
+        Usage:
+        '''
+        Action: Recall Observation
+        Action Input: {
+        "observation_id": [the handle of the observation given in its digest,
+                        such as "obs-3"]
+        }
+        Observation: [The observation will be the full text of the earlier
+                    observation, or an error message if the handle is unknown.]
+        '''
+        """
+        try:
+            observation_id = args.get('observation_id')
+            if not observation_id:
+                return "Error: No observation id provided"
+
+            observation_store = args.get("observation_store")
+            if observation_store is None:
+                return "Error: Observation store is not enabled"
+
+            observation = observation_store.load(str(observation_id).strip())
+            if observation is None:
+                return f"Error: Observation '{observation_id}' does not exist"
+
+            return observation
+        except Exception as e:
+            return f"Error recalling observation: {str(e)}"
+
     @staticmethod
     def inspect_script_lines(args: Dict) -> str:
         """
@@ -260,6 +684,10 @@ class ActionExecutioner:
                     start_line_number and end_line_number . If the script does not exist,
                     the observation will be an error message.]
         ‘‘‘
+        Lines are sliced from a memory-mapped file through a cached index of
+        line offsets, so reading a range of a large file does not read the
+        lines before it. If more lines are requested than the limit, the
+        observation ends with where to continue.
 
         """
         try:
@@ -278,19 +706,97 @@ class ActionExecutioner:
             if not os.path.exists(full_script_name):
                 return f"Error: Script '{full_script_name}' does not exist"
 
-            with open(full_script_name, 'r') as f:
-                lines = f.readlines()
+            line_index = args["line_index_cache"].get(full_script_name)
+            line_count = line_index.get_line_count()
+
+            start_line = max(1, int(start_line))
+            if line_count == 0:
+                return f"[The file '{script_name}' is empty.]"
+            if start_line > line_count:
+                return f"Error: Start line {start_line} is after the end of the file, which has {line_count} lines"
+
+            requested_end_line = int(end_line) if end_line is not None else line_count
+            end_line = min(requested_end_line, line_count, start_line + ActionExecutioner.MAX_INSPECTED_LINES - 1)
+            if end_line < start_line:
+                return f"Error: End line {end_line} is before start line {start_line}"
+
+            content = line_index.read_lines(start_line, end_line)
+            if end_line < min(requested_end_line, line_count):
+                content += (f"\n[Showing lines {start_line}-{end_line} of {line_count}. At most "
+                            f"{ActionExecutioner.MAX_INSPECTED_LINES} lines are shown at once, more lines are available "
+                            f"from line {end_line + 1}.]")
+            return content
+        except Exception as e:
+            return f"Error inspecting script lines: {str(e)}"
 
-            if start_line == 0:
-                start_line = 1
+    @staticmethod
+    def outline_script(args: Dict) -> str:
+        """
+        Use this to get the structure of a python script with the line range
+        of every function, class and top-level statement, without reading it.
+        Usage:
+        ‘‘‘
+        Action: Outline Script
+        Action Input: {
+        "script_name": [a valid python script name with relative path to
+                        current directory if needed]
+        }
+        Observation: [The observation will be one line per statement with its
+                    line range. If the script does not exist or cannot be
+                    parsed, the observation will be an error message.]
+        ‘‘‘
 
-            if end_line is not None:
-                selected_lines = lines[start_line - 1:end_line]
-            else:
-                selected_lines = lines[start_line - 1:]
-            return ''.join(selected_lines)
+        """
+        try:
+            script_name = args.get('script_name')
+            if not script_name:
+                return "Error: Missing script name"
+
+            full_script_path = build_full_path(args["task_folder_path"], script_name)
+            if not os.path.isfile(full_script_path):
+                return f"Error: Script '{full_script_path}' does not exist"
+
+            with open(full_script_path, 'r', encoding='utf-8') as f:
+                source = f.read()
+
+            return args["code_navigator"].outline(source, display_name=script_name)
+        except SyntaxError as e:
+            return f"Error outlining script: line {e.lineno}: {e.msg}"
         except Exception as e:
-            return f"Error inspecting script lines: {str(e)}"
+            return f"Error outlining script: {str(e)}"
+
+    @staticmethod
+    def search_files(args: Dict) -> str:
+        """
+        Use this to find the lines matching a regular expression in the files of
+        the current directory.
+        Usage:
+        ‘‘‘
+        Action: Search Files
+        Action Input: {
+        "pattern": [a regular expression to look for],
+        "file_pattern": [optional glob the file names must match, such as
+                        "*.py"],
+        "ignore_case": [optional, true for a case insensitive search]
+        }
+        Observation: [The observation will be the matching lines as
+                    "path:line: text" with a capped number of matches, or an
+                    error message if the pattern is invalid.]
+        ‘‘‘
+
+        """
+        try:
+            pattern = args.get('pattern')
+            if not pattern:
+                return "Error: Missing pattern"
+
+            return args["code_navigator"].search(args["task_folder_path"], pattern,
+                                                 file_pattern=args.get('file_pattern'),
+                                                 ignore_case=parse_bool(args.get('ignore_case', False)))
+        except re.error as e:
+            return f"Error: Invalid regular expression '{pattern}': {e}"
+        except Exception as e:
+            return f"Error searching files: {str(e)}"
 
     @staticmethod
     def edit_script_ai(args: Dict) -> str:
@@ -310,13 +816,20 @@ class ActionExecutioner:
         "save_name": [a valid file name with relative path to current
                     directory if needed]
         }
-        Observation: [The observation will be the edited content of the script.
-                    If the script does not exist, the observation will be an error
-                    message. You should always double-check whether the edit is correct.
-                    If it is far from correct, you can use the Undo Edit Script action to
-                    undo the edit.]
+        Observation: [The observation will be the line counts of the edited script
+                    and a unified diff against the previous version. Use Inspect
+                    Script Lines to read the full edited script. You should always
+                    double-check whether the edit is correct. If it is far from
+                    correct, you can use the Restore Version action to undo the edit.]
         ‘‘‘
 
+        With a script patcher, an existing script is edited by asking the
+        supporting assistant only for the changed lines, as search/replace blocks
+        or a unified diff, which are applied locally. If the patch does not
+        apply, or breaks a script that compiled before, the whole script is
+        regenerated instead. Every saved
+        script is stored as a version, as is the previous content of save_name
+        the first time it is overwritten.
         """
         try:
             script_name = args.get('script_name')
@@ -338,13 +851,146 @@ class ActionExecutioner:
 
             llm_instruction = edit_instruction
 
-            edited_content = llm_assistant.consult_once(script_content=content, instructions=llm_instruction)
+            # A repeated edit request should get a fresh attempt, not the cached edit
+            edited_content = None
+            script_patcher = args.get("script_patcher")
+            if script_patcher is not None and content.strip():
+                patch = llm_assistant.consult_once(script_content=content,
+                                                   instructions=script_patcher.build_instructions(llm_instruction),
+                                                   use_cache=False)
+                try:
+                    edited_content = script_patcher.apply(content, patch)
+                    script_patcher.validate(content, edited_content, save_name)
+                    script_patcher.patched_edits += 1
+                except PatchError:
+                    edited_content = None
+
+            if edited_content is None:
+                edited_content = llm_assistant.consult_once(script_content=content, instructions=llm_instruction,
+                                                            use_cache=False)
+                if script_patcher is not None:
+                    script_patcher.regenerated_edits += 1
 
             full_save_path = build_full_path(args["task_folder_path"], save_name)
+            version_store = args.get("version_store")
+            if version_store is not None and not version_store.is_tracked(save_name) and \
+                    os.path.exists(full_save_path):
+                with open(full_save_path, 'r') as f:
+                    version_store.save(save_name, f.read(), note="Before the first edit")
+
             with open(full_save_path, 'w') as f:
                 f.write(edited_content)
 
-            return edited_content
+            # The main assistant gets the diff, not the whole script, since every observation is resent each turn
+            observation = f"Saved {summarize_diff(content, edited_content, f'{script_name} (before)', save_name)}"
+            observation += f"\nUse Inspect Script Lines to read '{save_name}' in full."
+            if version_store is not None:
+                version_number = version_store.save(save_name, edited_content, note="Edit Script (AI)")
+                observation += f" Stored as version v{version_number}, use Restore Version to roll back."
+
+            script_validator = args.get("script_validator")
+            if script_validator is not None and script_validator.check_edits and save_name.endswith(".py"):
+                problems = script_validator.validate(args["task_folder_path"], save_name)
+                if problems:
+                    observation += f"\n\n{script_validator.describe_problems(save_name, problems)}"
+
+            return observation
+
+        except Exception as e:
+            return f"Error editing script: {str(e)}"
 
+    @staticmethod
+    def __parse_version(value) -> int:
+        """
+            Parses a version number given as 3 or "v3".
+        """
+        text = str(value).strip().lower()
+        return int(text[1:] if text.startswith("v") else text)
+
+    @staticmethod
+    def list_versions(args: Dict) -> str:
+        """
+        Use this to see the stored versions of the files written by Edit Script
+        (AI), to find the version to compare or restore.
+        Usage:
+        ‘‘‘
+        Action: List Versions
+        Action Input: {
+        "file_name": [optional file name with relative path to current
+                    directory, to only list the versions of this file]
+        }
+        Observation: [The observation will be one line per version with its
+                    number, such as "v3", file, line count, time and how it was
+                    created.]
+        ‘‘‘
+        """
+        try:
+            return args["version_store"].describe_versions(args.get('file_name') or None)
+        except Exception as e:
+            return f"Error listing versions: {str(e)}"
+
+    @staticmethod
+    def diff_versions(args: Dict) -> str:
+        """
+        Use this to compare two stored versions, e.g. to see what an edit
+        changed or what restoring a version would change.
+        Usage:
+        ‘‘‘
+        Action: Diff Versions
+        Action Input: {
+        "old_version": [the earlier version, such as "v2"],
+        "new_version": [the later version, such as "v5"]
+        }
+        Observation: [The observation will be the line counts of both versions
+                    and a unified diff between them.]
+        ‘‘‘
+        """
+        try:
+            old_version = args.get('old_version')
+            new_version = args.get('new_version')
+            if old_version is None or new_version is None:
+                return "Error: Missing required parameters"
+
+            return args["version_store"].diff(ActionExecutioner.__parse_version(old_version),
+                                              ActionExecutioner.__parse_version(new_version))
+        except Exception as e:
+            return f"Error comparing versions: {str(e)}"
+
+    @staticmethod
+    def restore_version(args: Dict) -> str:
+        """
+        Use this to roll a file back to a stored version, e.g. to undo a bad
+        edit. The version is copied back directly, without another AI edit.
+        Usage:
+        ‘‘‘
+        Action: Restore Version
+        Action Input: {
+        "version": [the version to restore, such as "v2"],
+        "save_name": [optional file name with relative path to current
+                    directory to write the version to, by default the file
+                    the version belongs to]
+        }
+        Observation: [The observation will be the line counts of the restored
+                    content and a diff from the content it replaced.]
+        ‘‘‘
+        """
+        try:
+            version = args.get('version')
+            if version is None:
+                return "Error: No version provided"
+
+            version_store = args["version_store"]
+            version_number = ActionExecutioner.__parse_version(version)
+            save_name = args.get('save_name') or version_store.get(version_number)["file_name"]
+            full_save_path = build_full_path(args["task_folder_path"], save_name)
+            previous_content = ""
+            if os.path.exists(full_save_path):
+                with open(full_save_path, 'r') as f:
+                    previous_content = f.read()
+
+            restored_version_number = version_store.restore(version_number, args["task_folder_path"], save_name)
+            summary = summarize_diff(previous_content, version_store.load(version_number), f"{save_name} (before)",
+                                     save_name)
+            return f"Restored v{version_number} as v{restored_version_number}: {summary}"
         except Exception as e:
-            return f"Error editing script: {str(e)}"
\ No newline at end of file
+            return f"Error restoring version: {str(e)}"
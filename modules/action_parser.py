@@ -8,10 +8,23 @@ class ActionParser:
     DEFAULT_ACTION_MAPPING = {
         'List Files': ActionExecutioner.list_files,
         'Execute Script': ActionExecutioner.execute_script,
+        'Smoke Run Script': ActionExecutioner.smoke_run_script,
+        'Run Parameter Sweep': ActionExecutioner.run_parameter_sweep,
+        'Start Background Job': ActionExecutioner.start_background_job,
+        'Check Background Job': ActionExecutioner.check_background_job,
+        'Wait For Background Job': ActionExecutioner.wait_for_background_job,
+        'Cancel Background Job': ActionExecutioner.cancel_background_job,
         'Final Answer': ActionExecutioner.final_answer,
         'Understand File': ActionExecutioner.understand_file,
+        'Profile Data': ActionExecutioner.profile_data,
         'Inspect Script Lines': ActionExecutioner.inspect_script_lines,
-        'Edit Script (AI)': ActionExecutioner.edit_script_ai
+        'Outline Script': ActionExecutioner.outline_script,
+        'Search Files': ActionExecutioner.search_files,
+        'Edit Script (AI)': ActionExecutioner.edit_script_ai,
+        'List Versions': ActionExecutioner.list_versions,
+        'Diff Versions': ActionExecutioner.diff_versions,
+        'Restore Version': ActionExecutioner.restore_version,
+        'Recall Observation': ActionExecutioner.recall_observation
     }
 
     @staticmethod
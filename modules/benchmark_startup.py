@@ -0,0 +1,99 @@
+"""
+    Compares the start-up latency of task scripts run by a fresh interpreter (cold) and forked from the fork
+    server (warm).
+
+    For every bundled task, the imports of 'setup/train.py' are copied into a probe script, so the benchmark
+    measures the start-up cost of each script without training anything.
+
+    Usage (from the 'modules' directory, with the repository root on the Python path):
+        python benchmark_startup.py [repeats]
+"""
+import ast
+import os
+import statistics
+import sys
+import tempfile
+
+from modules.fork_server import ForkServer
+from modules.script_runner import ScriptRunner
+
+TASKS_DIR = "../tasks"
+DEFAULT_REPEATS = 5
+
+
+def build_probe_script(script_path: str) -> str:
+    """
+        Builds a probe script with the top-level imports of a task script.
+
+        Parameters:
+            script_path (str): The path to the task script.
+
+        Returns:
+            str: The source of the probe script.
+    """
+    with open(script_path, mode="r", encoding="utf-8") as file:
+        source = file.read()
+
+    lines = source.splitlines()
+    imports = [node for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join("\n".join(lines[node.lineno - 1:node.end_lineno]) for node in imports) + "\nprint('ok')\n"
+
+
+def measure(script_runner: ScriptRunner, probe_dir_path: str, repeats: int) -> tuple[list, str | None]:
+    """
+        Runs a probe script repeatedly.
+
+        Returns:
+            tuple[list, str | None]: The wall times of the runs and, if a run failed, its stderr.
+    """
+    wall_times = []
+    for _ in range(repeats):
+        result = script_runner.run([sys.executable, "probe.py"], probe_dir_path)
+        if result.return_code != 0:
+            return wall_times, result.stderr
+        wall_times.append(result.wall_time)
+    return wall_times, None
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+    if not ForkServer.is_supported():
+        print("The fork server is not supported on this platform.")
+        return
+
+    fork_server = ForkServer()
+    print("Starting the fork server and preloading:", ", ".join(fork_server.preloaded_modules))
+    fork_server.start()
+
+    cold_runner = ScriptRunner()
+    warm_runner = ScriptRunner(fork_server=fork_server)
+    rows = []
+    try:
+        for task_name in sorted(os.listdir(TASKS_DIR)):
+            script_path = os.path.join(TASKS_DIR, task_name, "setup", "train.py")
+            if not os.path.isfile(script_path):
+                continue
+
+            with tempfile.TemporaryDirectory() as probe_dir_path:
+                with open(os.path.join(probe_dir_path, "probe.py"), mode="w", encoding="utf-8") as file:
+                    file.write(build_probe_script(script_path))
+
+                cold_times, cold_error = measure(cold_runner, probe_dir_path, repeats)
+                warm_times, warm_error = measure(warm_runner, probe_dir_path, repeats)
+
+            error = cold_error or warm_error
+            if error:
+                print(f"{task_name}: the probe script failed:\n{error.strip()}")
+                continue
+            rows.append((task_name, statistics.median(cold_times), statistics.median(warm_times)))
+    finally:
+        fork_server.stop()
+
+    print(f"\nMedian start-up latency over {repeats} runs:")
+    print(f"{'Task':<25}{'Cold (s)':>10}{'Warm (s)':>10}{'Speed-up':>10}")
+    for task_name, cold_time, warm_time in rows:
+        print(f"{task_name:<25}{cold_time:>10.3f}{warm_time:>10.3f}{cold_time / warm_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from low_level_actions import estimate_tokens
+from modules.llm_assistant import LLMAssistant
+
+
+class ChunkedReader:
+    """
+        Lets the supporting assistant understand files that are too large for a single request, with map-reduce:
+        the file is split into chunks of whole lines, every chunk is analysed by its own request (map), and the
+        notes of all chunks are merged by a final request (reduce).
+
+        The map requests run concurrently, with at most 'max_in_flight' requests at a time. The estimated tokens of
+        all requests are kept below 'max_total_tokens' by analysing an evenly spread subset of the chunks, always
+        including the first and the last one, when the file is too large.
+    """
+    DEFAULT_CHUNK_THRESHOLD_TOKENS = 12_000
+    DEFAULT_CHUNK_TOKENS = 8_000
+    DEFAULT_MAX_IN_FLIGHT = 4
+    DEFAULT_MAX_TOTAL_TOKENS = 200_000
+    DEFAULT_MAP_OUTPUT_TOKENS = 600
+    NOTHING_RELEVANT = "Nothing relevant"
+
+    def __init__(self, chunk_threshold_tokens: int = DEFAULT_CHUNK_THRESHOLD_TOKENS,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_total_tokens: int = DEFAULT_MAX_TOTAL_TOKENS, map_output_tokens: int = DEFAULT_MAP_OUTPUT_TOKENS):
+        """
+            Parameters:
+                chunk_threshold_tokens (int): Files with more estimated tokens are read with map-reduce, smaller files
+                                              with a single request.
+                chunk_tokens (int): The estimated tokens of every chunk.
+                max_in_flight (int): The number of map requests sent at the same time.
+                max_total_tokens (int): The estimated input and output tokens all requests of one file may use.
+                map_output_tokens (int): The maximum number of tokens of the notes of one chunk.
+        """
+        self.chunk_threshold_tokens = chunk_threshold_tokens
+        self.chunk_tokens = chunk_tokens
+        self.max_in_flight = max_in_flight
+        self.max_total_tokens = max_total_tokens
+        self.map_output_tokens = map_output_tokens
+
+    def split(self, content: str) -> list[tuple[int, int, str]]:
+        """
+            Splits text into chunks of whole lines of about 'chunk_tokens' tokens.
+
+            Returns:
+                list[tuple[int, int, str]]: The first line number, the last line number and the text of every chunk.
+                                            A single line longer than a chunk is split into several chunks.
+        """
+        max_chars = self.chunk_tokens * 4
+        chunks = []
+        lines = []
+        chars = 0
+        first_line = 1
+        for line_number, line in enumerate(content.splitlines(keepends=True), start=1):
+            if lines and chars + len(line) > max_chars:
+                chunks.append((first_line, line_number - 1, "".join(lines)))
+                lines, chars, first_line = [], 0, line_number
+            while len(line) > max_chars:
+                chunks.append((line_number, line_number, line[:max_chars]))
+                line = line[max_chars:]
+            lines.append(line)
+            chars += len(line)
+        if lines:
+            chunks.append((first_line, first_line + len(lines) - 1, "".join(lines)))
+        return chunks
+
+    def __select_chunks(self, chunks: list, instructions: str) -> list:
+        """
+            Chooses the chunks to analyse so the estimated tokens of the map and reduce requests stay within
+            'max_total_tokens'.
+        """
+        tokens_per_chunk = self.chunk_tokens + estimate_tokens(instructions) + self.map_output_tokens
+        # The reduce request reads the notes of every chunk
+        tokens_per_chunk += self.map_output_tokens
+        max_chunks = max(1, self.max_total_tokens // tokens_per_chunk)
+        if len(chunks) <= max_chunks:
+            return chunks
+        if max_chunks == 1:
+            return chunks[:1]
+
+        step = (len(chunks) - 1) / (max_chunks - 1)
+        return [chunks[round(index * step)] for index in range(max_chunks)]
+
+    def __map(self, assistant: LLMAssistant, file_name: str, chunk: tuple, chunk_count: int,
+              instructions: str) -> str:
+        first_line, last_line, text = chunk
+        map_instructions = (f"You are reading one part of the file '{file_name}': lines {first_line}-{last_line}, "
+                            f"one of {chunk_count} parts analysed separately. {instructions}\n"
+                            f"Only report what this part contains that is relevant, with line numbers, as short "
+                            f"notes. If nothing in this part is relevant, answer '{self.NOTHING_RELEVANT}'.")
+        return assistant.consult_once(script_content=text, instructions=map_instructions,
+                                      max_tokens=self.map_output_tokens)
+
+    def understand(self, assistant: LLMAssistant, file_name: str, content: str, instructions: str) -> str:
+        """
+            Asks the assistant to understand a file, with map-reduce if the file is large.
+
+            Parameters:
+                assistant (LLMAssistant): The supporting assistant.
+                file_name (str): The name of the file, shown to the assistant.
+                content (str): The content of the file.
+                instructions (str): What to look for and what should be returned.
+
+            Returns:
+                str: The answer of the assistant. If only part of a large file was analysed, the answer ends with
+                     the line ranges that were read.
+
+            Raises:
+                Exception: If every map request failed.
+        """
+        if estimate_tokens(content) <= self.chunk_threshold_tokens:
+            return assistant.consult_once(script_content=content, instructions=instructions)
+
+        chunks = self.split(content)
+        selected_chunks = self.__select_chunks(chunks, instructions)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = [executor.submit(self.__map, assistant, file_name, chunk, len(selected_chunks), instructions)
+                       for chunk in selected_chunks]
+
+        notes = []
+        errors = []
+        for (first_line, last_line, _), future in zip(selected_chunks, futures):
+            try:
+                answer = future.result()
+            except Exception as e:
+                errors.append(e)
+                notes.append(f"Lines {first_line}-{last_line}: (could not be analysed: {e})")
+                continue
+            if answer and not answer.strip().startswith(self.NOTHING_RELEVANT):
+                notes.append(f"Lines {first_line}-{last_line}:\n{answer.strip()}")
+        if len(errors) == len(selected_chunks):
+            raise errors[0]
+
+        reduce_instructions = (f"The file '{file_name}' was too large to read at once, so it was split into parts and "
+                               f"the notes below were taken from every part. Using only these notes, answer the "
+                               f"following request as if you had read the whole file. {instructions}")
+        answer = assistant.consult_once(script_content="\n\n".join(notes) if notes else self.NOTHING_RELEVANT,
+                                        instructions=reduce_instructions)
+
+        if len(selected_chunks) < len(chunks):
+            line_ranges = ", ".join(f"{first_line}-{last_line}" for first_line, last_line, _ in selected_chunks)
+            answer += (f"\n\n(The file has {len(chunks)} parts, but the token budget allowed reading only "
+                       f"{len(selected_chunks)} of them: lines {line_ranges}. Use Inspect Script Lines to read "
+                       f"other lines.)")
+        return answer
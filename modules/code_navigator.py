@@ -0,0 +1,181 @@
+import ast
+import fnmatch
+import os
+import re
+
+
+class CodeNavigator:
+    """
+        Local, zero-token alternatives to Understand File for finding the way around the task files: an outline of
+        a python script and a regex search over the task directory.
+    """
+    DEFAULT_MAX_MATCHES = 50
+    MAX_LINE_CHARS = 200
+    MAX_SNIPPET_CHARS = 80
+    MAX_SEARCHED_FILE_BYTES = 10 * 1024 * 1024
+    BINARY_PROBE_BYTES = 8192
+    IGNORED_DIR_NAMES = ("__pycache__", ".git", ".ipynb_checkpoints")
+
+    def __init__(self, max_matches: int = DEFAULT_MAX_MATCHES):
+        self.max_matches = max_matches
+
+    @staticmethod
+    def __describe_arguments(arguments: ast.arguments) -> str:
+        names = [argument.arg for argument in arguments.posonlyargs + arguments.args]
+        if arguments.vararg is not None:
+            names.append(f"*{arguments.vararg.arg}")
+        elif arguments.kwonlyargs:
+            names.append("*")
+        names += [argument.arg for argument in arguments.kwonlyargs]
+        if arguments.kwarg is not None:
+            names.append(f"**{arguments.kwarg.arg}")
+        return ", ".join(names)
+
+    def __describe_statement(self, node: ast.stmt, source: str) -> str:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            return f"{prefix} {node.name}({self.__describe_arguments(node.args)})"
+        if isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            return f"class {node.name}({bases})" if bases else f"class {node.name}"
+
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            first_line = f"docstring: {(node.value.value.strip().splitlines() or [''])[0].strip()}"
+        else:
+            segment = ast.get_source_segment(source, node) or ast.unparse(node)
+            first_line = segment.split("\n", 1)[0].strip()
+        if len(first_line) > self.MAX_SNIPPET_CHARS:
+            first_line = first_line[:self.MAX_SNIPPET_CHARS] + "..."
+        return first_line
+
+    @staticmethod
+    def __describe_lines(node: ast.stmt) -> str:
+        first_line = node.decorator_list[0].lineno if getattr(node, "decorator_list", None) else node.lineno
+        last_line = node.end_lineno or node.lineno
+        return f"{first_line}-{last_line}" if last_line != first_line else str(first_line)
+
+    def __outline_body(self, body: list, source: str, depth: int) -> list[str]:
+        lines = []
+        imports = []
+
+        def flush_imports():
+            if imports:
+                modules = []
+                for node in imports:
+                    if isinstance(node, ast.Import):
+                        modules += [alias.name for alias in node.names]
+                    else:
+                        modules.append(f"{'.' * node.level}{node.module or ''}")
+                line_range = f"{imports[0].lineno}-{imports[-1].end_lineno}" \
+                    if imports[-1].end_lineno != imports[0].lineno else str(imports[0].lineno)
+                lines.append(f"{line_range:<10}{'    ' * depth}imports: {', '.join(dict.fromkeys(modules))}")
+                imports.clear()
+
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                imports.append(node)
+                continue
+            flush_imports()
+
+            lines.append(f"{self.__describe_lines(node):<10}{'    ' * depth}{self.__describe_statement(node, source)}")
+            if isinstance(node, ast.ClassDef):
+                lines += self.__outline_body(node.body, source, depth + 1)
+            elif isinstance(node, ast.If) and ast.unparse(node.test).replace("'", '"') == '__name__ == "__main__"':
+                lines += self.__outline_body(node.body, source, depth + 1)
+        flush_imports()
+        return lines
+
+    def outline(self, source: str, display_name: str) -> str:
+        """
+            Outlines a python script with 'ast'.
+
+            Parameters:
+                source (str): The source code of the script.
+                display_name (str): The name of the script shown in the outline.
+
+            Returns:
+                str: One line per top-level statement with its line range: grouped imports, functions with their
+                     arguments, classes with their methods, and the first line of every other statement. The body of
+                     an 'if __name__ == "__main__":' block is outlined too.
+
+            Raises:
+                SyntaxError: If the script cannot be parsed.
+        """
+        tree = ast.parse(source)
+        line_count = len(source.splitlines())
+        lines = [f"Outline of '{display_name}' ({line_count} lines):"]
+        lines += self.__outline_body(tree.body, source, depth=0)
+        return "\n".join(lines)
+
+    def __is_searchable(self, file_path: str) -> bool:
+        try:
+            if os.path.getsize(file_path) > self.MAX_SEARCHED_FILE_BYTES:
+                return False
+            with open(file_path, mode="rb") as file:
+                return b"\0" not in file.read(self.BINARY_PROBE_BYTES)
+        except OSError:
+            return False
+
+    def search(self, task_dir_path: str, pattern: str, file_pattern: str | None = None,
+               ignore_case: bool = False) -> str:
+        """
+            Searches the text files of the task directory for a regular expression.
+
+            Parameters:
+                task_dir_path (str): The directory to search.
+                pattern (str): The regular expression to look for, matched against every line.
+                file_pattern (str | None): A glob the file names or relative paths must match, such as "*.py".
+                ignore_case (bool): Whether the search is case insensitive.
+
+            Returns:
+                str: The matches as "path:line: text", sorted by path and line, followed by a summary.
+
+            Raises:
+                re.error: If the pattern is not a valid regular expression.
+
+            Behavior:
+                - Skips binary files, files larger than 'MAX_SEARCHED_FILE_BYTES' and cache directories.
+                - Stops after 'max_matches' matches and says so.
+        """
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        matches = []
+        matched_files = set()
+        searched_files = 0
+        truncated = False
+
+        for dir_path, dir_names, file_names in os.walk(task_dir_path):
+            dir_names[:] = sorted(name for name in dir_names if name not in self.IGNORED_DIR_NAMES)
+            for file_name in sorted(file_names):
+                file_path = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(file_path, task_dir_path).replace(os.sep, "/")
+                if file_pattern and not (fnmatch.fnmatch(file_name, file_pattern) or
+                                         fnmatch.fnmatch(relative_path, file_pattern)):
+                    continue
+                if not self.__is_searchable(file_path):
+                    continue
+
+                searched_files += 1
+                with open(file_path, mode="r", encoding="utf-8", errors="replace") as file:
+                    for line_number, line in enumerate(file, start=1):
+                        if regex.search(line) is None:
+                            continue
+                        if len(matches) >= self.max_matches:
+                            truncated = True
+                            break
+                        text = line.rstrip("\r\n")
+                        if len(text) > self.MAX_LINE_CHARS:
+                            text = text[:self.MAX_LINE_CHARS] + "..."
+                        matches.append(f"{relative_path}:{line_number}: {text}")
+                        matched_files.add(relative_path)
+                if truncated:
+                    break
+            if truncated:
+                break
+
+        if not matches:
+            return f"No matches for '{pattern}' in {searched_files} searched files."
+
+        summary = f"{len(matches)} matches in {len(matched_files)} files"
+        if truncated:
+            summary += f" (stopped after the first {self.max_matches} matches, narrow the pattern or file_pattern)"
+        return "\n".join(matches + [summary + "."])
@@ -0,0 +1,65 @@
+import hashlib
+import re
+
+from modules.disk_cache import DiskCache
+
+
+class ConsultationCache:
+    """
+        Persists the answers of one-off supporting-assistant consultations (e.g. Understand File), so asking the same
+        question about the same content again, in the same or a later run, does not call the API.
+
+        An answer is keyed by the hash of the content, the normalized question, the model, the starting instructions
+        of the assistant and the output token limit.
+    """
+    CACHE_DEFAULT_DIR = "../cache/consultations"
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+    DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+    def __init__(self, cache_dir_path: str = None, max_bytes: int = None, ttl_seconds: float | None = None):
+        if cache_dir_path is None:
+            cache_dir_path = ConsultationCache.CACHE_DEFAULT_DIR
+        if max_bytes is None:
+            max_bytes = ConsultationCache.DEFAULT_MAX_BYTES
+        if ttl_seconds is None:
+            ttl_seconds = ConsultationCache.DEFAULT_TTL_SECONDS
+
+        self.cache = DiskCache(cache_dir_path=cache_dir_path, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """
+            Normalizes a question so trivially different phrasings share an entry.
+
+            Behavior:
+                - Lowercases the question and collapses every run of whitespace into one space.
+        """
+        return re.sub(r"\s+", " ", question).strip().lower()
+
+    @staticmethod
+    def build_key(model: str, starting_instructions: str, question: str, content: str,
+                  max_tokens: int | None = None) -> str:
+        """
+            Builds the cache key of a consultation.
+
+            Returns:
+                str: A SHA-256 hex digest.
+        """
+        key = hashlib.sha256()
+        for part in (model, str(max_tokens), starting_instructions, ConsultationCache.normalize_question(question)):
+            key.update(hashlib.sha256(part.encode("utf-8")).digest())
+        key.update(hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).digest())
+        return key.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+            Returns the cached answer, or None if there is none or it has expired.
+        """
+        entry = self.cache.get(key)
+        return entry["answer"] if entry is not None else None
+
+    def put(self, key: str, answer: str):
+        """
+            Stores an answer, evicting the least recently used answers if the cache is too large.
+        """
+        self.cache.put(key, {"answer": answer})
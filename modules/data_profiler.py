@@ -0,0 +1,212 @@
+import math
+import os
+import random
+from collections import Counter
+
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+
+class ColumnProfile:
+    """
+        The statistics of one column, updated chunk by chunk so the whole file never has to be in memory.
+    """
+
+    def __init__(self, name: str, max_tracked_values: int, sample_size: int):
+        self.name = name
+        self.max_tracked_values = max_tracked_values
+        self.sample_size = sample_size
+        self.dtypes = []
+        self.rows = 0
+        self.missing = 0
+        # Numeric values: count, mean and sum of squared deviations, merged with Chan's parallel algorithm
+        self.numeric_count = 0
+        self.numeric_mean = 0.0
+        self.numeric_m2 = 0.0
+        self.numeric_min = None
+        self.numeric_max = None
+        # Text values: a reservoir sample of their lengths
+        self.text_count = 0
+        self.text_length_sum = 0
+        self.text_length_max = 0
+        self.text_length_sample = []
+        self.random = random.Random(0)
+        # Distinct values, until there are too many to track
+        self.value_counts = Counter()
+        self.too_many_values = False
+
+    def update(self, series: pd.Series):
+        """
+            Adds the values of a chunk of the column.
+        """
+        if str(series.dtype) not in self.dtypes:
+            self.dtypes.append(str(series.dtype))
+        self.rows += len(series)
+        values = series.dropna()
+        self.missing += len(series) - len(values)
+        if values.empty:
+            return
+
+        if is_numeric_dtype(values) and not is_bool_dtype(values):
+            self.__update_numeric(values.astype("float64"))
+        else:
+            self.__update_text(values.astype(str))
+
+        if not self.too_many_values:
+            self.value_counts.update(values.tolist())
+            if len(self.value_counts) > self.max_tracked_values:
+                self.too_many_values = True
+                self.value_counts = Counter()
+
+    def __update_numeric(self, values: pd.Series):
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.numeric_count + count
+        delta = mean - self.numeric_mean
+        self.numeric_m2 += m2 + delta ** 2 * self.numeric_count * count / total
+        self.numeric_mean += delta * count / total
+        self.numeric_count = total
+        chunk_min, chunk_max = float(values.min()), float(values.max())
+        self.numeric_min = chunk_min if self.numeric_min is None else min(self.numeric_min, chunk_min)
+        self.numeric_max = chunk_max if self.numeric_max is None else max(self.numeric_max, chunk_max)
+
+    def __update_text(self, values: pd.Series):
+        lengths = values.str.len()
+        self.text_length_sum += int(lengths.sum())
+        self.text_length_max = max(self.text_length_max, int(lengths.max()))
+        for length in lengths.tolist():
+            self.text_count += 1
+            if len(self.text_length_sample) < self.sample_size:
+                self.text_length_sample.append(length)
+            else:
+                index = self.random.randrange(self.text_count)
+                if index < self.sample_size:
+                    self.text_length_sample[index] = length
+
+    @staticmethod
+    def __format_number(value: float) -> str:
+        if float(value).is_integer() and abs(value) < 1e15:
+            return f"{int(value):,}"
+        return f"{value:.4g}"
+
+    def describe(self, max_categories: int) -> str:
+        """
+            Describes the column in one line.
+
+            Parameters:
+                max_categories (int): Columns with at most this many distinct values show the count of each value,
+                                      such as the label distribution.
+        """
+        parts = [f"{self.missing:,} missing"]
+        if not self.too_many_values:
+            parts.append(f"{len(self.value_counts):,} unique")
+        else:
+            parts.append(f"more than {self.max_tracked_values:,} unique")
+
+        if self.numeric_count:
+            std = math.sqrt(self.numeric_m2 / (self.numeric_count - 1)) if self.numeric_count > 1 else 0.0
+            parts.append(f"min {self.__format_number(self.numeric_min)}, max {self.__format_number(self.numeric_max)}, "
+                         f"mean {self.numeric_mean:.6g}, std {std:.6g}")
+        if self.text_count:
+            median = sorted(self.text_length_sample)[len(self.text_length_sample) // 2]
+            parts.append(f"length mean {self.text_length_sum / self.text_count:.1f}, median ~{median:,}, "
+                         f"max {self.text_length_max:,} chars")
+
+        description = f"- {self.name} ({'/'.join(self.dtypes)}): {', '.join(parts)}"
+        non_missing = self.rows - self.missing
+        if not self.too_many_values and 0 < len(self.value_counts) <= max_categories and non_missing:
+            distribution = ", ".join(f"{value!r}: {count:,} ({100 * count / non_missing:.1f}%)"
+                                     for value, count in self.value_counts.most_common())
+            description += f"\n    values: {distribution}"
+        return description
+
+
+class DataProfiler:
+    """
+        Summarises tabular data files locally, so the schema and statistics of a dataset can be learned without
+        sending the file to an assistant.
+
+        Supported formats: CSV, TSV, JSON Lines and, if 'pyarrow' is installed, Parquet. Every format except
+        plain JSON is read in chunks, so memory stays bounded for large files.
+    """
+    DEFAULT_CHUNK_ROWS = 50_000
+    DEFAULT_MAX_CATEGORIES = 20
+    MAX_TRACKED_VALUES = 10_000
+    LENGTH_SAMPLE_SIZE = 10_000
+    MAX_EXAMPLE_VALUE_CHARS = 80
+
+    def __init__(self, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_categories: int = DEFAULT_MAX_CATEGORIES):
+        self.chunk_rows = chunk_rows
+        self.max_categories = max_categories
+
+    def __read_chunks(self, file_path: str):
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in (".csv", ".tsv", ".txt"):
+            separator = "\t" if extension == ".tsv" else ","
+            with pd.read_csv(file_path, sep=separator, chunksize=self.chunk_rows) as reader:
+                yield from reader
+        elif extension in (".jsonl", ".ndjson"):
+            with pd.read_json(file_path, lines=True, chunksize=self.chunk_rows) as reader:
+                yield from reader
+        elif extension == ".json":
+            yield pd.read_json(file_path)
+        elif extension == ".parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ValueError("Reading Parquet files requires the 'pyarrow' package")
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=self.chunk_rows):
+                yield batch.to_pandas()
+        else:
+            raise ValueError(f"Unsupported file format '{extension}'. Supported formats: .csv, .tsv, .txt, .jsonl, "
+                             f".ndjson, .json, .parquet")
+
+    def __describe_example(self, row: dict) -> str:
+        values = []
+        for name, value in row.items():
+            text = repr(value)
+            if len(text) > self.MAX_EXAMPLE_VALUE_CHARS:
+                text = text[:self.MAX_EXAMPLE_VALUE_CHARS] + "..."
+            values.append(f"{name}={text}")
+        return ", ".join(values)
+
+    def profile(self, file_path: str, display_name: str | None = None) -> str:
+        """
+            Computes the schema and the statistics of a data file.
+
+            Parameters:
+                file_path (str): The path to the file.
+                display_name (str | None): The name of the file shown in the summary, the path if None.
+
+            Returns:
+                str: The number of rows and columns, an example row and one line per column with its dtype,
+                     missing and unique values, numeric statistics or text lengths, and the distribution of
+                     columns with few distinct values (e.g. labels).
+
+            Raises:
+                ValueError: If the file format is not supported.
+        """
+        columns = {}
+        example = None
+        rows = 0
+        for chunk in self.__read_chunks(file_path):
+            if example is None and not chunk.empty:
+                example = chunk.head(1).to_dict(orient="records")[0]
+            rows += len(chunk)
+            for name in chunk.columns:
+                if name not in columns:
+                    columns[name] = ColumnProfile(str(name), self.MAX_TRACKED_VALUES, self.LENGTH_SAMPLE_SIZE)
+                columns[name].update(chunk[name])
+
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        lines = [f"Profile of '{display_name or file_path}' ({size_mb:.1f} MB): {rows:,} rows, {len(columns)} columns"]
+        if example is not None:
+            lines.append(f"Example row: {self.__describe_example(example)}")
+        lines.append("Columns:")
+        for column in columns.values():
+            # Columns missing from some chunks (e.g. optional JSON fields) count as missing there
+            column.missing += rows - column.rows
+            column.rows = rows
+            lines.append(column.describe(self.max_categories))
+        return "\n".join(lines)
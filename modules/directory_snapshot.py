@@ -0,0 +1,164 @@
+import fnmatch
+import math
+import os
+import threading
+
+
+class DirectorySnapshot:
+    """
+        Lists the task directory recursively, with file sizes and line counts, from a snapshot that makes repeated
+        listings cheap.
+
+        The entries of a directory are only listed again when its modification time changes. Files are stat'ed on
+        every listing, since rewriting a file in place does not change the modification time of its directory, and
+        their line counts are only recounted when their size or modification time changes.
+    """
+    DEFAULT_PAGE_SIZE = 100
+    DEFAULT_MAX_DEPTH = 3
+    MAX_COUNTED_BYTES = 256 * 1024 * 1024
+    BINARY_PROBE_BYTES = 8192
+    READ_BLOCK_BYTES = 1024 * 1024
+    IGNORED_DIR_NAMES = ("__pycache__",)
+
+    def __init__(self, page_size: int = DEFAULT_PAGE_SIZE):
+        self.page_size = page_size
+        self.directories = {}
+        self.line_counts = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        """
+            Forgets the snapshot, e.g. when a new task starts.
+        """
+        with self.lock:
+            self.directories = {}
+            self.line_counts = {}
+
+    def list_directory(self, dir_path: str) -> list[tuple[str, bool]]:
+        """
+            Returns the sorted names of the entries of a directory and whether each is a directory.
+        """
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        with self.lock:
+            cached = self.directories.get(dir_path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        with os.scandir(dir_path) as scanned_entries:
+            entries = sorted((entry.name, entry.is_dir()) for entry in scanned_entries
+                             if entry.name not in self.IGNORED_DIR_NAMES)
+        with self.lock:
+            self.directories[dir_path] = (mtime_ns, entries)
+        return entries
+
+    def count_lines(self, file_path: str, stat: os.stat_result) -> int | None:
+        """
+            Counts the lines of a text file.
+
+            Returns:
+                int | None: The number of lines, or None for binary files and files above 'MAX_COUNTED_BYTES'.
+        """
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self.line_counts.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        line_count = None
+        if stat.st_size <= self.MAX_COUNTED_BYTES:
+            try:
+                with open(file_path, mode="rb") as file:
+                    block = file.read(self.BINARY_PROBE_BYTES)
+                    if b"\0" not in block:
+                        line_count = 0
+                        last_byte = b""
+                        while block:
+                            line_count += block.count(b"\n")
+                            last_byte = block[-1:]
+                            block = file.read(self.READ_BLOCK_BYTES)
+                        if last_byte not in (b"", b"\n"):
+                            line_count += 1
+            except OSError:
+                line_count = None
+
+        with self.lock:
+            self.line_counts[file_path] = (signature, line_count)
+        return line_count
+
+    @staticmethod
+    def format_size(size: int) -> str:
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024 or unit == "GB":
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+            size /= 1024
+
+    def __walk(self, root_path: str, relative_dir: str, depth: int, max_depth: int, pattern: str | None,
+               rows: list):
+        dir_path = os.path.join(root_path, relative_dir) if relative_dir else root_path
+        for name, is_dir in self.list_directory(dir_path):
+            relative_path = f"{relative_dir}/{name}" if relative_dir else name
+            full_path = os.path.join(dir_path, name)
+            if is_dir:
+                if depth < max_depth:
+                    if pattern is None:
+                        rows.append((f"{relative_path}/", "dir", ""))
+                    self.__walk(root_path, relative_path, depth + 1, max_depth, pattern, rows)
+                elif pattern is None:
+                    try:
+                        entry_count = len(self.list_directory(full_path))
+                    except OSError:
+                        continue
+                    entries = "entry" if entry_count == 1 else "entries"
+                    rows.append((f"{relative_path}/", "dir", f"{entry_count:,} {entries}, not expanded"))
+                continue
+
+            if pattern is not None and not (fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)):
+                continue
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            line_count = self.count_lines(full_path, stat)
+            rows.append((relative_path, self.format_size(stat.st_size),
+                         f"{line_count:,} lines" if line_count is not None else ""))
+
+    def describe(self, root_path: str, display_path: str, recursive: bool = True,
+                 max_depth: int = DEFAULT_MAX_DEPTH, pattern: str | None = None, page: int = 1) -> str:
+        """
+            Lists a directory with the size of every file and the line count of every text file.
+
+            Parameters:
+                root_path (str): The directory to list.
+                display_path (str): The name of the directory shown in the listing.
+                recursive (bool): Whether subdirectories are listed too, up to 'max_depth' levels deep.
+                max_depth (int): The deepest level listed. Deeper directories are shown with their entry count.
+                pattern (str | None): A glob the file names or relative paths must match, such as "*.csv". With a
+                                      pattern, only matching files are listed.
+                page (int): The page to show, starting from 1, with 'page_size' entries per page.
+
+            Returns:
+                str: One line per entry with its path relative to the listed directory, followed by the paging
+                     position.
+        """
+        rows = []
+        self.__walk(os.path.abspath(root_path), "", 0, max_depth if recursive else 0, pattern, rows)
+
+        page_count = max(1, math.ceil(len(rows) / self.page_size))
+        page = min(max(1, page), page_count)
+        page_rows = rows[(page - 1) * self.page_size:page * self.page_size]
+
+        mode = f"recursive, depth {max_depth}" if recursive else "not recursive"
+        if pattern is not None:
+            mode += f", matching '{pattern}'"
+        if not rows:
+            return f"No entries in '{display_path}' ({mode})."
+
+        first_entry = (page - 1) * self.page_size + 1
+        lines = [f"Entries {first_entry}-{first_entry + len(page_rows) - 1} of {len(rows)} in '{display_path}' "
+                 f"({mode}):"]
+        widths = [max(len(row[column]) for row in page_rows) for column in range(2)]
+        for path, size, details in page_rows:
+            lines.append(f"{path.ljust(widths[0])}  {size.rjust(widths[1])}  {details}".rstrip())
+        if page < page_count:
+            lines.append(f"Page {page} of {page_count}. Request \"page\": {page + 1} for more.")
+        return "\n".join(lines)
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+
+
+class DiskCache:
+    ENTRY_EXTENSION = ".json"
+
+    def __init__(self, cache_dir_path: str, max_bytes: int, ttl_seconds: float | None = None):
+        self.cache_dir_path = cache_dir_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def __build_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir_path, key[:2], f"{key}{self.ENTRY_EXTENSION}")
+
+    def get(self, key: str):
+        """
+            Retrieves a cached value.
+
+            Parameters:
+                key (str): A hexadecimal key, usually a content hash.
+
+            Returns:
+                The cached value, or None if the key is not cached or its entry has expired.
+
+            Behavior:
+                - Deletes the entry if it is older than 'ttl_seconds'.
+                - Marks the entry as recently used, so it is evicted last.
+        """
+        entry_path = self.__build_entry_path(key)
+        try:
+            with open(entry_path, mode="r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl_seconds is not None and time.time() - entry["created"] > self.ttl_seconds:
+            self.__remove(entry_path)
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, key: str, value):
+        """
+            Stores a value in the cache.
+
+            Parameters:
+                key (str): A hexadecimal key, usually a content hash.
+                value: A JSON serializable value.
+
+            Behavior:
+                - Writes the entry atomically, so concurrent readers never see a partial entry.
+                - Evicts the least recently used entries while the cache is larger than 'max_bytes'.
+        """
+        entry_path = self.__build_entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        temporary_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, mode="w", encoding="utf-8") as file:
+            json.dump({"created": time.time(), "value": value}, file)
+        os.replace(temporary_path, entry_path)
+
+        self.evict()
+
+    def evict(self):
+        """
+            Evicts the least recently used entries until the cache fits into 'max_bytes'.
+
+            Behavior:
+                - Uses the modification time of an entry as its last use time.
+        """
+        entries = []
+        total_bytes = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir_path):
+            for file_name in file_names:
+                if not file_name.endswith(self.ENTRY_EXTENSION):
+                    continue
+
+                entry_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+                total_bytes += stat.st_size
+
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self.__remove(entry_path)
+            total_bytes -= size
+
+    @staticmethod
+    def __remove(entry_path: str):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
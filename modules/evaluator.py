@@ -1,9 +1,12 @@
 import os
+import threading
 from typing import Optional, Tuple
 
 import pandas as pd
 from openai.types.chat import ChatCompletion
 
+from modules.resource_usage import MEGABYTE, ResourceTotals
+
 
 class UsageStatistics:
     def __init__(self, model):
@@ -11,6 +14,10 @@ class UsageStatistics:
         self.input_tokens = 0
         self.output_tokens = 0
         self.requests = 0
+        self.context_tokens_saved = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = threading.Lock()
 
     def update(self, response: ChatCompletion):
         """
@@ -23,14 +30,57 @@ class UsageStatistics:
                 - Extracts the number of input (prompt) and output (completion) tokens from the response.
                 - Increments the total input and output token counts.
                 - Increments the total request count.
+                - Safe to call from concurrent requests.
         """
         usage = response.usage
         input_tokens = usage.prompt_tokens
         output_tokens = usage.completion_tokens
 
-        self.input_tokens += input_tokens
-        self.output_tokens += output_tokens
-        self.requests += 1
+        with self.lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.requests += 1
+
+    def update_context_savings(self, tokens_saved: int):
+        """
+            Records how many prompt tokens were saved by pruning the context of a single request.
+
+            Parameters:
+                tokens_saved (int): The estimated number of prompt tokens that were not sent.
+
+            Behavior:
+                - Appends the saving to the per-request list, so savings can be reported per iteration.
+        """
+        self.context_tokens_saved.append(tokens_saved)
+
+    def get_total_context_savings(self) -> int:
+        """
+            Returns the estimated number of prompt tokens saved over all requests.
+
+            Returns:
+                int: The sum of all recorded context savings.
+        """
+        return sum(self.context_tokens_saved)
+
+    def update_cache_lookup(self, hit: bool):
+        """
+            Records a lookup of the consultation cache.
+
+            Parameters:
+                hit (bool): Whether the answer was cached, so no request was sent.
+        """
+        with self.lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def get_cache_hit_rate(self) -> float | None:
+        """
+            Returns the share of consultation cache lookups that were hits, or None if the cache was not used.
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
 
 
 class AgentEvaluator:
@@ -49,7 +99,8 @@ class AgentEvaluator:
     @staticmethod
     def save_performance_metrics(task_name: str, main_usage_statistics: UsageStatistics,
                                  supporting_usage_statistics: UsageStatistics,
-                                 goal_achieved: bool) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+                                 goal_achieved: bool, resource_totals: ResourceTotals | None = None) \
+            -> Tuple[Optional[int], Optional[int], Optional[float]]:
         """
         Saves agent performance metrics to evaluation/agent_performance.csv.
         Creates the file and directory if they don't exist.
@@ -59,6 +110,8 @@ class AgentEvaluator:
             main_usage_statistics (UsageStatistics): Main Assistant usage statistics
             supporting_usage_statistics (UsageStatistics): Supporting Assistant usage statistics
             goal_achieved (bool): Whether the task goal was achieved
+            resource_totals (ResourceTotals | None): Resources used by the scripts run during the task. Rows of runs
+                                                     without them, or from older files, leave the script columns empty
 
         Returns:
             bool: True if metrics were saved successfully, False otherwise
@@ -91,7 +144,12 @@ class AgentEvaluator:
                 'requests': 'int64',
                 'tokens_spent': 'int64',
                 'money_spent': 'float64',
-                'goal_achieved': 'bool'
+                'goal_achieved': 'bool',
+                'script_runs': 'Int64',
+                'script_wall_time': 'float64',
+                'script_cpu_time': 'float64',
+                'script_peak_rss_mb': 'float64',
+                'script_mb_written': 'float64'
             }
 
             new_data = {
@@ -100,7 +158,12 @@ class AgentEvaluator:
                 'requests': [total_requests],
                 'tokens_spent': [tokens_spent],
                 'money_spent': [money_spent],
-                'goal_achieved': [goal_achieved]
+                'goal_achieved': [goal_achieved],
+                'script_runs': [resource_totals.runs if resource_totals else None],
+                'script_wall_time': [resource_totals.wall_time if resource_totals else None],
+                'script_cpu_time': [resource_totals.cpu_time if resource_totals else None],
+                'script_peak_rss_mb': [resource_totals.peak_rss_bytes / MEGABYTE if resource_totals else None],
+                'script_mb_written': [resource_totals.bytes_written / MEGABYTE if resource_totals else None]
             }
 
             new_df = pd.DataFrame(new_data).astype(dtypes)
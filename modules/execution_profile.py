@@ -0,0 +1,173 @@
+import os
+import threading
+import uuid
+
+HOOKS_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script_hooks")
+
+
+def build_hooks_environment() -> dict:
+    """
+        Builds the PYTHONPATH that makes scripts load the start-up hooks in 'script_hooks'.
+
+        Returns:
+            dict: The PYTHONPATH variable, with the hooks directory in front of the current PYTHONPATH.
+
+        Behavior:
+            - The hooks are a 'sitecustomize' module, which shadows the 'sitecustomize' of the environment, if any.
+              The hooks find that module further down 'sys.path' and run it after themselves.
+    """
+    python_path = [HOOKS_DIR_PATH]
+    if os.environ.get("PYTHONPATH"):
+        python_path.append(os.environ["PYTHONPATH"])
+    return {"PYTHONPATH": os.pathsep.join(python_path)}
+
+
+class ExecutionProfile:
+    """
+        The CPU resources a script may use: its thread counts and the CPUs it is pinned to.
+    """
+    THREAD_ENVIRONMENT_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                                    "NUMEXPR_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "MLAGENTIO_TORCH_THREADS")
+
+    def __init__(self, threads: int, interop_threads: int = 1, tokenizers_parallelism: bool = False,
+                 cpu_affinity: list[int] | None = None):
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.tokenizers_parallelism = tokenizers_parallelism
+        self.cpu_affinity = cpu_affinity
+
+    def build_environment(self) -> dict:
+        """
+            Builds the environment variables that apply the profile to a script.
+
+            Returns:
+                dict: The variables to add to the environment of the script.
+
+            Behavior:
+                - BLAS/OpenMP libraries and TensorFlow read their thread counts from the environment.
+                - The PyTorch thread counts and the CPU affinity are applied by the start-up hooks.
+        """
+        environment = {name: str(self.threads) for name in self.THREAD_ENVIRONMENT_VARIABLES}
+        environment["TF_NUM_INTEROP_THREADS"] = str(self.interop_threads)
+        environment["MLAGENTIO_TORCH_INTEROP_THREADS"] = str(self.interop_threads)
+        environment["TOKENIZERS_PARALLELISM"] = "true" if self.tokenizers_parallelism else "false"
+        if self.cpu_affinity:
+            environment["MLAGENTIO_CPU_AFFINITY"] = ",".join(str(cpu) for cpu in self.cpu_affinity)
+        environment.update(build_hooks_environment())
+        return environment
+
+    def describe(self) -> str:
+        """
+            Describes the profile in one line.
+        """
+        description = f"{self.threads} thread(s)"
+        if self.cpu_affinity:
+            description += f" on CPUs {','.join(str(cpu) for cpu in self.cpu_affinity)}"
+        return description
+
+
+class ExecutionScheduler:
+    """
+        Chooses the execution profile of every script from the number of scripts running concurrently, so
+        concurrent scripts split the CPUs instead of each using all of them.
+
+        Scripts are counted within this process and, if a registry directory is given, across every agent process
+        sharing that directory on the host.
+    """
+
+    def __init__(self, cpus: list[int] | None = None, registry_dir_path: str | None = None, pin_cpus: bool = True):
+        """
+            Parameters:
+                cpus (list[int] | None): The CPUs the scripts may use, or None for every CPU available to the agent.
+                registry_dir_path (str | None): A directory shared by the agents on the host, in which running
+                                                scripts are registered, or None to only count this process.
+                pin_cpus (bool): Whether every script is pinned to its own share of the CPUs.
+        """
+        if cpus is None:
+            cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else \
+                list(range(os.cpu_count() or 1))
+        self.cpus = cpus
+        self.registry_dir_path = os.path.abspath(registry_dir_path) if registry_dir_path is not None else None
+        self.pin_cpus = pin_cpus and hasattr(os, "sched_setaffinity")
+        self.lock = threading.Lock()
+        self.slots = {}
+
+        if self.registry_dir_path is not None:
+            os.makedirs(self.registry_dir_path, exist_ok=True)
+
+    @staticmethod
+    def __is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def __read_registry(self) -> dict:
+        """
+            Returns the slots taken by the scripts of other schedulers, removing entries of dead processes.
+        """
+        registered_slots = {}
+        if self.registry_dir_path is None:
+            return registered_slots
+
+        for file_name in os.listdir(self.registry_dir_path):
+            try:
+                pid, slot, _ = file_name.split("_", 2)
+                pid, slot = int(pid), int(slot)
+            except ValueError:
+                continue
+            if file_name in self.slots:
+                continue
+            if not self.__is_alive(pid):
+                try:
+                    os.remove(os.path.join(self.registry_dir_path, file_name))
+                except OSError:
+                    pass
+                continue
+            registered_slots[file_name] = slot
+        return registered_slots
+
+    def acquire(self) -> tuple[ExecutionProfile, str]:
+        """
+            Chooses the profile of a script that is about to start.
+
+            Returns:
+                tuple[ExecutionProfile, str]: The profile and a lease, which must be passed to 'release' once the
+                                              script stops.
+
+            Behavior:
+                - The script takes the lowest free slot. With N scripts running (including this one), each gets
+                  len(cpus) // N threads, pinned to the CPUs of its slot.
+                - Scripts that are already running keep their profile.
+        """
+        with self.lock:
+            taken_slots = set(self.slots.values()) | set(self.__read_registry().values())
+            slot = min(set(range(len(taken_slots) + 1)) - taken_slots)
+            concurrency = max(len(taken_slots) + 1, slot + 1)
+
+            lease = f"{os.getpid()}_{slot}_{uuid.uuid4().hex}"
+            self.slots[lease] = slot
+            if self.registry_dir_path is not None:
+                open(os.path.join(self.registry_dir_path, lease), mode="w").close()
+
+        threads = max(1, len(self.cpus) // concurrency)
+        cpu_affinity = None
+        if self.pin_cpus:
+            first_cpu = (slot * threads) % len(self.cpus)
+            cpu_affinity = [self.cpus[(first_cpu + index) % len(self.cpus)] for index in range(threads)]
+        return ExecutionProfile(threads=threads, cpu_affinity=cpu_affinity), lease
+
+    def release(self, lease: str):
+        """
+            Frees the slot of a script that stopped.
+        """
+        with self.lock:
+            self.slots.pop(lease, None)
+            if self.registry_dir_path is not None:
+                try:
+                    os.remove(os.path.join(self.registry_dir_path, lease))
+                except OSError:
+                    pass
@@ -0,0 +1,341 @@
+"""
+    A warm execution backend for task scripts.
+
+    The server is a long-lived Python process that imports the heavy ML libraries once and then forks a fresh child
+    for every script run, so the children start with these libraries already imported.
+
+    Usage (started by 'ForkServer.start'):
+        python fork_server.py <socket_path> <comma separated modules to preload>
+
+    Every request is a JSON line with the 'argv', 'cwd' and 'env' of the run, sent together with the write ends of
+    the stdout and stderr pipes of the client. The server answers with the pid of the child, then with its exit code
+    and resource usage.
+    The child starts a new session, so it can be killed together with its own children via its process group.
+
+    This module must only depend on the standard library. Forking is only available on POSIX systems. Environment
+    variables read by a library at import time (e.g. TF_CPP_MIN_LOG_LEVEL) keep the value they had in the server.
+"""
+import importlib
+import io
+import json
+import os
+import runpy
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows, where the fork server is not supported
+    resource = None
+
+
+class ForkedProcess:
+    """
+        A script run forked by the fork server, with the subset of the 'subprocess.Popen' interface that
+        'ScriptRunner' uses.
+    """
+
+    def __init__(self, args: list, connection: socket.socket, pid: int, stdout, stderr):
+        self.args = args
+        self.connection = connection
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.rusage = None
+        self.buffer = b""
+
+    def wait(self, timeout: float | None = None) -> int:
+        """
+            Waits for the forked script to exit.
+
+            Parameters:
+                timeout (float | None): The number of seconds to wait, or None to wait indefinitely.
+
+            Returns:
+                int: The exit code, negative if the script was killed by a signal.
+
+            Raises:
+                subprocess.TimeoutExpired: If the script is still running after 'timeout' seconds.
+        """
+        if self.returncode is not None:
+            return self.returncode
+
+        self.connection.settimeout(timeout)
+        try:
+            while b"\n" not in self.buffer:
+                data = self.connection.recv(4096)
+                if not data:
+                    raise ConnectionError("Fork server closed the connection")
+                self.buffer += data
+        except (socket.timeout, BlockingIOError):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+
+        exit_report = json.loads(self.buffer.split(b"\n", 1)[0])
+        self.returncode = exit_report["exit_code"]
+        self.rusage = resource.struct_rusage(exit_report["rusage"])
+        self.connection.close()
+        return self.returncode
+
+
+class ForkServer:
+    """
+        Starts and talks to the fork server of this module, which runs task scripts in children forked from a
+        process with the heavy ML libraries already imported.
+
+        A forked child carries the address space of the server, often several GB once torch, TensorFlow and
+        transformers are imported. An address space limit of the run ('MLAGENTIO_ADDRESS_SPACE_LIMIT_MB') is
+        therefore added to the address space of the child when it starts, so it limits what the script reserves
+        on top of the preloaded libraries, as it would for a script importing only what it needs in a fresh
+        interpreter.
+    """
+    DEFAULT_PRELOADED_MODULES = ("numpy", "pandas", "sklearn", "torch", "datasets", "transformers", "tensorflow",
+                                 "keras", "tf_keras")
+    SERVER_PATH = os.path.abspath(__file__)
+
+    def __init__(self, preloaded_modules: tuple = DEFAULT_PRELOADED_MODULES):
+        self.preloaded_modules = preloaded_modules
+        self.server_process = None
+        self.socket_dir_path = None
+        self.socket_path = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def is_supported() -> bool:
+        """
+            Checks whether the platform supports the fork server.
+
+            Returns:
+                bool: True on POSIX systems with 'os.fork' and file descriptor passing, False otherwise.
+        """
+        return hasattr(os, "fork") and hasattr(socket, "send_fds") and hasattr(socket, "AF_UNIX")
+
+    def start(self):
+        """
+            Starts the server and waits until it has imported the preloaded modules.
+
+            Behavior:
+                - Does nothing if the server is already running.
+                - The output of the imports (e.g. TensorFlow start-up logs) is discarded.
+        """
+        with self.lock:
+            if self.server_process is not None and self.server_process.poll() is None:
+                return
+
+            self.socket_dir_path = tempfile.mkdtemp(prefix="mlagentio_fork_server_")
+            self.socket_path = os.path.join(self.socket_dir_path, "server.sock")
+            self.server_process = subprocess.Popen(
+                [sys.executable, self.SERVER_PATH, self.socket_path, ",".join(self.preloaded_modules)],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+            if self.server_process.stdout.readline().strip() != b"ready":
+                self.server_process.kill()
+                self.server_process = None
+                raise RuntimeError("Fork server failed to start")
+
+    def spawn(self, command: list, cwd: str, env: dict) -> ForkedProcess:
+        """
+            Forks a fresh child of the server that runs a script.
+
+            Parameters:
+                command (list): The command running the script. The interpreter, 'command[0]', is replaced by the
+                                server and 'command[1:]' becomes 'sys.argv' of the script.
+                cwd (str): The working directory of the script.
+                env (dict): The environment variables of the script.
+
+            Returns:
+                ForkedProcess: The running script, with readable 'stdout' and 'stderr' pipes.
+        """
+        self.start()
+
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.socket_path)
+            request = json.dumps({"argv": command[1:], "cwd": os.path.abspath(cwd), "env": env})
+            socket.send_fds(connection, [request.encode("utf-8") + b"\n"], [stdout_write, stderr_write])
+        finally:
+            os.close(stdout_write)
+            os.close(stderr_write)
+
+        buffer = b""
+        while b"\n" not in buffer:
+            data = connection.recv(4096)
+            if not data:
+                raise RuntimeError("Fork server closed the connection")
+            buffer += data
+        first_line, buffer = buffer.split(b"\n", 1)
+
+        process = ForkedProcess(command, connection, json.loads(first_line)["pid"],
+                                io.open(stdout_read, mode="rb"), io.open(stderr_read, mode="rb"))
+        process.buffer = buffer
+        return process
+
+    def stop(self):
+        """
+            Stops the server and removes its socket.
+        """
+        with self.lock:
+            if self.server_process is not None:
+                self.server_process.kill()
+                self.server_process.wait()
+                self.server_process = None
+            if self.socket_path is not None and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+                os.rmdir(self.socket_dir_path)
+            self.socket_path = None
+
+
+def read_address_space_bytes() -> int:
+    """
+        Returns:
+            int: The virtual memory reserved by this process, or 0 where '/proc' is not available.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def apply_execution_profile():
+    """
+        Applies the CPU affinity and the PyTorch thread counts of the execution profile of a forked child, and its
+        address space limit.
+        The other thread counts are read by the preloaded libraries at import time and keep the server's values.
+        The address space limit comes on top of the address space inherited from the server, so the preloaded
+        libraries do not count against it.
+    """
+    try:
+        limit_mb = os.environ.get("MLAGENTIO_ADDRESS_SPACE_LIMIT_MB")
+        if limit_mb:
+            _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+            limit_bytes = int(limit_mb) * 1024 * 1024 + read_address_space_bytes()
+            if hard_limit != resource.RLIM_INFINITY:
+                limit_bytes = min(limit_bytes, hard_limit)
+            resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard_limit))
+
+        cpus = os.environ.get("MLAGENTIO_CPU_AFFINITY")
+        if cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {int(cpu) for cpu in cpus.split(",")})
+
+        torch = sys.modules.get("torch")
+        if torch is not None and os.environ.get("MLAGENTIO_TORCH_THREADS"):
+            torch.set_num_threads(int(os.environ["MLAGENTIO_TORCH_THREADS"]))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Execution profile: could not be applied: {e}", file=sys.stderr)
+
+
+def run_child(request: dict, stdout_fd: int, stderr_fd: int):
+    """
+        Runs a script in a freshly forked child of the server. Never returns.
+
+        Parameters:
+            request (dict): The 'argv', 'cwd' and 'env' of the run.
+            stdout_fd (int): The write end of the stdout pipe of the client.
+            stderr_fd (int): The write end of the stderr pipe of the client.
+    """
+    exit_code = 0
+    script_path = None
+    try:
+        os.setsid()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        sys.stdout = io.TextIOWrapper(io.FileIO(1, mode="w", closefd=False), write_through=True)
+        sys.stderr = io.TextIOWrapper(io.FileIO(2, mode="w", closefd=False), write_through=True)
+
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        apply_execution_profile()
+        script_path = os.path.abspath(request["argv"][0])
+        sys.argv = [script_path] + request["argv"][1:]
+        sys.path[0] = os.path.dirname(script_path)
+
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Hide the frames of the server, so the traceback looks like one of a plain interpreter
+        script_traceback = e.__traceback__
+        while script_traceback is not None and script_traceback.tb_frame.f_code.co_filename != script_path:
+            script_traceback = script_traceback.tb_next
+        traceback.print_exception(type(e), e, script_traceback or e.__traceback__)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def report_exit(connection: socket.socket, pid: int):
+    """
+        Waits for a forked child in a background thread of the server and reports its exit code and resource usage
+        to the client.
+    """
+    _, status, rusage = os.wait4(pid, 0)
+    try:
+        connection.sendall(json.dumps({"exit_code": os.waitstatus_to_exitcode(status),
+                                       "rusage": list(rusage)}).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+    finally:
+        connection.close()
+
+
+def serve(socket_path: str, preloaded_modules: list):
+    """
+        Imports the preloaded modules and serves run requests until the server is killed.
+    """
+    for module_name in preloaded_modules:
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        connection, _ = server.accept()
+        message, fds, _, _ = socket.recv_fds(connection, 1024 * 1024, 2)
+        while not message.endswith(b"\n"):
+            message += connection.recv(1024 * 1024)
+        request = json.loads(message)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            connection.close()
+            run_child(request, fds[0], fds[1])
+
+        for fd in fds:
+            os.close(fd)
+        connection.sendall(json.dumps({"pid": pid}).encode("utf-8") + b"\n")
+        threading.Thread(target=report_exit, args=(connection, pid), daemon=True).start()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1], [name for name in sys.argv[2].split(",") if name])
@@ -0,0 +1,161 @@
+import os
+import sys
+import threading
+import time
+
+from modules.script_runner import ScriptRunner, ScriptRunResult
+
+
+class Job:
+
+    def __init__(self, job_id: str, script_name: str):
+        self.job_id = job_id
+        self.script_name = script_name
+        self.start_time = time.monotonic()
+        self.cancel_event = threading.Event()
+        self.finished_event = threading.Event()
+        self.thread = None
+        self.stdout = None
+        self.stderr = None
+        self.result: ScriptRunResult | None = None
+        self.error = None
+
+    def get_status(self) -> str:
+        """
+            Returns the status of the job: "running", "finished", "failed", "stopped" or "cancelled".
+        """
+        if not self.finished_event.is_set():
+            return "running"
+        if self.error is not None or (self.result.stop_reason is None and self.result.return_code != 0):
+            return "failed"
+        if self.result.stop_reason is None:
+            return "finished"
+        return "cancelled" if self.cancel_event.is_set() else "stopped"
+
+    def get_observation(self) -> str:
+        """
+            Returns the observation of a job that is no longer running.
+        """
+        if self.error is not None:
+            return f"Error executing script: {self.error}"
+        return self.result.to_observation()
+
+
+class JobManager:
+    """
+        Runs scripts in the background, so the agent can keep working while they train.
+        Every job runs in its own thread through the shared 'ScriptRunner', so it keeps the time limits, the
+        training monitor and the output buffering of foreground runs.
+    """
+    DEFAULT_MAX_RUNNING_JOBS = 2
+    DEFAULT_TAIL_LINES = 20
+
+    def __init__(self, max_running_jobs: int = DEFAULT_MAX_RUNNING_JOBS):
+        self.max_running_jobs = max_running_jobs
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def __run_job(job: Job, script_runner: ScriptRunner, task_dir_path: str, started: threading.Event):
+        def on_start(stdout, stderr):
+            job.stdout = stdout
+            job.stderr = stderr
+            started.set()
+
+        try:
+            job.result = script_runner.run([sys.executable, job.script_name], cwd=os.path.abspath(task_dir_path),
+                                           cancel_event=job.cancel_event, on_start=on_start)
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            job.finished_event.set()
+            started.set()
+
+    def start(self, script_runner: ScriptRunner, task_dir_path: str, script_name: str) -> Job:
+        """
+            Starts a script as a background job.
+
+            Parameters:
+                script_runner (ScriptRunner): The runner enforcing the time limits of the script.
+                task_dir_path (str): The path to the task directory, used as working directory.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                Job: The started job.
+
+            Raises:
+                RuntimeError: If 'max_running_jobs' jobs are already running.
+        """
+        with self.lock:
+            running_jobs = [job.job_id for job in self.jobs.values() if job.get_status() == "running"]
+            if len(running_jobs) >= self.max_running_jobs:
+                raise RuntimeError(f"{len(running_jobs)} jobs are already running ({', '.join(running_jobs)}). "
+                                   f"Wait for one of them or cancel it first")
+
+            job = Job(job_id=f"job-{len(self.jobs) + 1}", script_name=script_name)
+            self.jobs[job.job_id] = job
+
+        started = threading.Event()
+        job.thread = threading.Thread(target=self.__run_job, args=(job, script_runner, task_dir_path, started),
+                                      daemon=True)
+        job.thread.start()
+        started.wait()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """
+            Returns the job with the given id, or None if it does not exist.
+        """
+        return self.jobs.get(job_id)
+
+    def describe(self, job: Job, tail_lines: int = DEFAULT_TAIL_LINES) -> str:
+        """
+            Describes a job for the main assistant.
+
+            Parameters:
+                job (Job): The job to describe.
+                tail_lines (int): The number of output lines to show for a running job.
+
+            Returns:
+                str: The status of a running job with the tail of its output, or the full observation of a job that
+                     is no longer running.
+        """
+        status = job.get_status()
+        if status != "running":
+            return f"Job '{job.job_id}' ({job.script_name}) {status}.\n{job.get_observation()}"
+
+        lines = [f"Job '{job.job_id}' ({job.script_name}) is running for {time.monotonic() - job.start_time:.0f} "
+                 f"seconds."]
+        for name, output in (("Output", job.stdout), ("Errors and Warnings", job.stderr)):
+            text = output.getvalue().rstrip("\n") if output is not None else ""
+            if text:
+                lines.append(f"{name} (last {tail_lines} lines): '''")
+                lines.extend(text.split("\n")[-tail_lines:])
+                lines.append("'''")
+        return "\n".join(lines)
+
+    def wait(self, job: Job, timeout: float | None = None) -> bool:
+        """
+            Waits for a job to stop running.
+
+            Returns:
+                bool: True if the job is no longer running, False if the timeout passed first.
+        """
+        return job.finished_event.wait(timeout)
+
+    def cancel(self, job: Job):
+        """
+            Cancels a job and waits until its process group is killed.
+        """
+        job.cancel_event.set()
+        job.finished_event.wait()
+
+    def cancel_all(self):
+        """
+            Cancels every running job and forgets all jobs, e.g. when a task ends.
+        """
+        for job in list(self.jobs.values()):
+            if job.get_status() == "running":
+                self.cancel(job)
+        with self.lock:
+            self.jobs = {}
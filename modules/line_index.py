@@ -0,0 +1,91 @@
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class LineIndex:
+    """
+        The byte offset at which every line of a file starts, so any range of lines can be sliced out of a
+        memory-mapped file without reading the lines before it.
+    """
+
+    def __init__(self, file_path: str):
+        stat = os.stat(file_path)
+        self.file_path = file_path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        # offsets[i] is where line i + 1 starts, offsets[-1] is the size of the file
+        self.offsets = array("Q", [0])
+
+        if stat.st_size == 0:
+            return
+        with open(file_path, mode="rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = mapped.find(b"\n")
+            while position != -1:
+                self.offsets.append(position + 1)
+                position = mapped.find(b"\n", position + 1)
+        if self.offsets[-1] != stat.st_size:
+            self.offsets.append(stat.st_size)
+
+    def get_line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def is_current(self) -> bool:
+        """
+            Checks whether the file is unchanged since it was indexed, by its modification time and size.
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self.signature
+
+    def read_lines(self, start_line: int, end_line: int) -> str:
+        """
+            Reads a range of lines.
+
+            Parameters:
+                start_line (int): The first line to read, starting from 1.
+                end_line (int): The last line to read, included.
+
+            Returns:
+                str: The lines, decoded as UTF-8 with undecodable bytes replaced.
+        """
+        start_offset = self.offsets[start_line - 1]
+        end_offset = self.offsets[end_line]
+        if end_offset <= start_offset:
+            return ""
+        with open(self.file_path, mode="rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[start_offset:end_offset].decode("utf-8", errors="replace")
+
+
+class LineIndexCache:
+    """
+        Keeps the line indexes of the most recently read files. An index is rebuilt when its file changes.
+    """
+    DEFAULT_MAX_FILES = 32
+
+    def __init__(self, max_files: int = DEFAULT_MAX_FILES):
+        self.max_files = max_files
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, file_path: str) -> LineIndex:
+        """
+            Returns the line index of a file, building it if the file is not indexed or changed since.
+        """
+        file_path = os.path.abspath(file_path)
+        with self.lock:
+            index = self.indexes.get(file_path)
+            if index is not None and index.is_current():
+                self.indexes.move_to_end(file_path)
+                return index
+
+        index = LineIndex(file_path)
+        with self.lock:
+            self.indexes[file_path] = index
+            self.indexes.move_to_end(file_path)
+            while len(self.indexes) > self.max_files:
+                self.indexes.popitem(last=False)
+        return index
@@ -1,13 +1,30 @@
 from openai import OpenAI
+from consultation_cache import ConsultationCache
 from evaluator import UsageStatistics
+from low_level_actions import estimate_tokens
+from observation_store import ObservationStore
 
 
 class LLMAssistant:
+    FULL_CONTEXT_MODE = "full"
+    ROLLING_CONTEXT_MODE = "rolling"
+    CONTEXT_MODES = (FULL_CONTEXT_MODE, ROLLING_CONTEXT_MODE)
+    TRAIL_ENTRY_MAX_CHARS = 300
+
+    def __init__(self, api_key: str, starting_instructions: str, model=None, context_mode: str = FULL_CONTEXT_MODE,
+                 observation_store: ObservationStore | None = None, observation_max_age: int | None = None,
+                 consultation_cache: ConsultationCache | None = None):
+        if context_mode not in self.CONTEXT_MODES:
+            raise Exception(f"Invalid context mode '{context_mode}'. Expected one of {self.CONTEXT_MODES}")
 
-    def __init__(self, api_key: str, starting_instructions: str, model=None):
         self.starting_instructions = self.to_developer_message(starting_instructions)
         self.history = []
         self.model = model if model else "gpt-4o-mini"
+        self.context_mode = context_mode
+        self.observation_store = observation_store
+        self.observation_max_age = observation_max_age
+        self.observation_digests = {}
+        self.consultation_cache = consultation_cache
         self.client = OpenAI(api_key=api_key)
         self.usage_statistics = UsageStatistics(self.model)
 
@@ -64,12 +81,102 @@ class LLMAssistant:
         for message in context:
             print(message["content"])
 
-    def __build_context(self, observation: str) -> list:
+    @staticmethod
+    def estimate_context_tokens(context: list) -> int:
+        """
+            Estimates the number of prompt tokens a conversation context will use.
+
+            Parameters:
+                context (list): A list of messages forming the conversation context.
+
+            Returns:
+                int: The estimated number of tokens of all message contents combined.
+        """
+        return sum(estimate_tokens(message["content"]) for message in context)
+
+    @staticmethod
+    def extract_action_line(response: str) -> str:
+        """
+            Extracts a compact, single-line version of the Action and Action Input of an assistant response.
+
+            Parameters:
+                response (str): The full response of the assistant.
+
+            Returns:
+                str: The Action and Action Input collapsed into one line and truncated to 'TRAIL_ENTRY_MAX_CHARS'
+                     characters, or a placeholder if the response contains no action.
+        """
+        action_start = response.find('Action:')
+        if action_start == -1:
+            return "(no action)"
+
+        action_line = " ".join(response[action_start:].split())
+        if len(action_line) > LLMAssistant.TRAIL_ENTRY_MAX_CHARS:
+            action_line = action_line[:LLMAssistant.TRAIL_ENTRY_MAX_CHARS] + "..."
+        return action_line
+
+    def __build_rolling_context(self, observation_message: dict) -> list:
+        """
+            Constructs a pruned conversation context that only keeps the latest full assistant turn.
+
+            Parameters:
+                observation_message (dict): The latest observation as a user message.
+
+            Returns:
+                list: The starting instructions, the research problem, a compact trail of the earlier actions,
+                      the latest assistant response and the new observation.
+
+            Behavior:
+                - Every assistant response restates the full Research Plan and Status, so the earlier responses
+                  and their observations are superseded by the latest one.
+                - The earlier responses are reduced to their Action and Action Input, one line per iteration.
+        """
+        research_problem_message = self.history[0]
+        assistant_messages = [message for message in self.history if message["role"] == "assistant"]
+        context = [self.starting_instructions, research_problem_message]
+
+        if len(assistant_messages) > 1:
+            trail = [f"Iteration {index}: {self.extract_action_line(message['content'])}"
+                     for index, message in enumerate(assistant_messages[:-1], start=1)]
+            trail_message = self.to_user_message(
+                "Earlier iterations were pruned from this conversation. "
+                "Your latest Research Plan and Status supersedes them. Actions taken so far:\n"
+                + "\n".join(trail))
+            context.append(trail_message)
+
+        context.append(assistant_messages[-1])
+        context.append(observation_message)
+        return context
+
+    def __age_history(self, observation_index: int) -> list:
+        """
+            Replaces the observations older than 'observation_max_age' iterations with their digests.
+
+            Parameters:
+                observation_index (int): The iteration number of the observation being added.
+
+            Returns:
+                list: A copy of the conversation history in which the aged observations are digested.
+        """
+        if self.observation_max_age is None:
+            return self.history
+
+        aged_history = []
+        for history_index, message in enumerate(self.history):
+            digest = self.observation_digests.get(history_index)
+            if digest is not None and observation_index - digest[0] > self.observation_max_age:
+                aged_history.append(digest[1])
+            else:
+                aged_history.append(message)
+        return aged_history
+
+    def __build_context(self, observation: str, observation_index: int) -> list:
         """
             Constructs the conversation context by incorporating past interactions.
 
             Parameters:
                 observation (str): The latest observation or input from the user.
+                observation_index (int): The iteration number of the observation.
 
             Returns:
                 list: A list of messages representing the conversation context, including the starting instructions,
@@ -77,11 +184,19 @@ class LLMAssistant:
 
             Behavior:
                 - Converts the observation into a user message.
-                - Includes starting instructions and past interactions.
+                - Includes starting instructions and past interactions, with aged observations digested.
+                - In rolling context mode, prunes the superseded turns and records the estimated tokens saved.
                 - Appends the new observation to the conversation history.
         """
         observation_message = self.to_user_message(observation)
-        context = [self.starting_instructions] + self.history + [observation_message]
+        context = [self.starting_instructions] + self.__age_history(observation_index) + [observation_message]
+
+        if self.context_mode == self.ROLLING_CONTEXT_MODE:
+            rolling_context = self.__build_rolling_context(observation_message)
+            tokens_saved = self.estimate_context_tokens(context) - self.estimate_context_tokens(rolling_context)
+            self.usage_statistics.update_context_savings(tokens_saved)
+            context = rolling_context
+
         self.history.append(observation_message)
         return context
 
@@ -136,36 +251,50 @@ class LLMAssistant:
         self.history.append(self.to_assistant_message(output))
         return output
 
-    def consult(self, observation: str, observation_index: int) -> str:
+    def consult(self, observation: str, observation_index: int, action_name: str | None = None) -> str:
         """
             Engages the assistant in a consultation session using an observation.
 
             Parameters:
                 observation (str): The input or finding to be analyzed.
                 observation_index (int): The iteration number of the observation.
+                action_name (str | None): The action that produced the observation, named in its digest.
 
             Returns:
                 str: The assistant's response to the observation.
 
             Behavior:
                 - Formats the observation with its iteration index.
+                - Saves the observation to the observation store, so it can be digested once it ages.
                 - Builds the conversation context and sends it to the assistant.
                 - Stores the response in the conversation history.
         """
         full_observation = (f"Iteration: {observation_index}\n"
                             f"Observation:\n{observation}")
-        context = self.__build_context(full_observation)
+        context = self.__build_context(full_observation, observation_index)
+
+        if self.observation_store is not None:
+            handle = self.observation_store.save(observation, observation_index)
+            digest = ObservationStore.build_digest(observation, handle, action_name)
+            if len(digest) < len(observation):
+                self.observation_digests[len(self.history) - 1] = (
+                    observation_index,
+                    self.to_user_message(f"Iteration: {observation_index}\nObservation:\n{digest}"))
         output = self.__ask_assistant(context)
         self.history.append(self.to_assistant_message(output))
         return output
 
-    def consult_once(self, script_content: str, instructions: str) -> str:
+    def consult_once(self, script_content: str, instructions: str, max_tokens: int | None = None,
+                     use_cache: bool = True) -> str:
         """
            Performs a single consultation with the assistant using script content and instructions.
 
            Parameters:
                script_content (str): The script or code to be analyzed.
                instructions (str): The guidelines or instructions for processing the script.
+               max_tokens (int, optional): The maximum number of tokens the response can contain.
+               use_cache (bool, optional): Whether the answer may come from, and is stored in, the consultation
+                                           cache. Defaults to True.
 
            Returns:
                str: The assistant's response.
@@ -173,10 +302,25 @@ class LLMAssistant:
            Behavior:
                - Constructs a user message combining the instructions and script content.
                - Calls the assistant with the generated context.
+               - Does not touch the conversation history, so it can be called from several threads at once.
+               - If a consultation cache is set, a cached answer for the same content, question and model is returned
+                 without a request, and new answers are cached. Lookups are counted in the usage statistics.
        """
+        cache_key = None
+        if self.consultation_cache is not None and use_cache:
+            cache_key = ConsultationCache.build_key(self.model, self.starting_instructions["content"], instructions,
+                                                    script_content, max_tokens)
+            output = self.consultation_cache.get(cache_key)
+            self.usage_statistics.update_cache_lookup(hit=output is not None)
+            if output is not None:
+                return output
+
         message = self.to_user_message(f"{instructions}\n\nScript Content:\n{script_content}")
         context = [self.starting_instructions, message]
-        output = self.__ask_assistant(context)
+        output = self.__ask_assistant(context, max_tokens=max_tokens)
+
+        if cache_key is not None and output is not None:
+            self.consultation_cache.put(cache_key, output)
         return output
 
     def get_usage_statistics(self) -> UsageStatistics:
@@ -229,6 +373,17 @@ class LLMAssistant:
         """
         return self.history
 
+    def get_last_context_savings(self) -> int | None:
+        """
+            Retrieves the estimated number of prompt tokens saved by the latest consultation.
+
+            Returns:
+                int | None: The tokens saved by pruning the latest context, or None if no pruning took place.
+        """
+        if not self.usage_statistics.context_tokens_saved:
+            return None
+        return self.usage_statistics.context_tokens_saved[-1]
+
     def get_model(self) -> str:
         """
             Retrieves the assistant model being used.
@@ -74,6 +74,20 @@ class AgentLogger:
         self.logs_file.write("\n'''")
         self.step += 1
 
+    def save_statistics(self, statistics: str):
+        """
+            Saves a block of run statistics at the current position of the log.
+
+            Parameters:
+                statistics (str): The formatted statistics to be written.
+
+            Behavior:
+                - Writes a separated statistics section to the log file.
+        """
+        self.logs_file.write("\n\nStatistics:\n'''\n")
+        self.logs_file.write(statistics)
+        self.logs_file.write("\n'''")
+
     def close(self):
         """
             Closes the log file.
@@ -1,3 +1,4 @@
+import difflib
 import os
 import re
 
@@ -122,3 +123,78 @@ def replace_n_occurrences(text: str, old: str, new: str, n: int, reverse: bool =
         result[index:index + len(old)] = new
 
     return "".join(result)
+
+
+def parse_bool(value) -> bool:
+    """
+        Parses a boolean action input, which the model may give as a JSON boolean or as a string.
+
+        Parameters:
+            value: The input value, such as True, "true", "False", 1 or None.
+
+        Returns:
+            bool: True for True, non-zero numbers and the strings "true", "yes", "y" and "1" (in any case),
+                  False otherwise.
+
+        Example:
+            parse_bool("false")
+            -> False
+        """
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "y", "1")
+    return bool(value)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+        Estimates the number of tokens a piece of text will occupy in a model request.
+
+        Parameters:
+            text (str): The text whose token count should be estimated.
+
+        Returns:
+            int: The estimated number of tokens.
+
+        Notes:
+            - Uses the common approximation of 4 characters per token for English text and code.
+            - The estimate is only used for reporting and budgeting, never for billing.
+
+        Example:
+            estimate_tokens("Hello, world!")
+            -> 4
+        """
+    return (len(text) + 3) // 4
+
+
+def summarize_diff(old_text: str, new_text: str, old_name: str, new_name: str, max_lines: int = 200) -> str:
+    """
+        Summarizes the difference between two versions of a file as line counts and a compact unified diff.
+
+        Parameters:
+            old_text (str): The previous version.
+            new_text (str): The new version.
+            old_name (str): The name of the previous version, shown in the diff header.
+            new_name (str): The name of the new version, shown in the diff header.
+            max_lines (int, optional): The maximum number of diff lines shown. Defaults to 200.
+
+        Returns:
+            str: A line such as "'train.py': 104 lines (was 100), 6 added, 2 removed." followed by the unified
+                 diff with 3 lines of context, or a note that the versions are identical.
+
+        Example:
+            summarize_diff("a\nb\n", "a\nc\n", "x.py (before)", "x.py")
+            -> "'x.py': 2 lines (was 2), 1 added, 1 removed.\n--- x.py (before)\n+++ x.py\n@@ -1,2 +1,2 @@\n a\n-b\n+c"
+        """
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    diff_lines = list(difflib.unified_diff(old_lines, new_lines, fromfile=old_name, tofile=new_name, lineterm=""))
+    if not diff_lines:
+        return f"'{new_name}': {len(new_lines)} lines, identical to '{old_name}'."
+
+    added = sum(1 for line in diff_lines[2:] if line.startswith("+"))
+    removed = sum(1 for line in diff_lines[2:] if line.startswith("-"))
+    summary = [f"'{new_name}': {len(new_lines)} lines (was {len(old_lines)}), {added} added, {removed} removed."]
+    summary += diff_lines[:max_lines]
+    if len(diff_lines) > max_lines:
+        summary.append(f"[{len(diff_lines) - max_lines} more diff lines are not shown.]")
+    return "\n".join(summary)
@@ -1,12 +1,25 @@
 import os
 import shutil
+import time
 from datetime import datetime
 
 from modules.action_executioner import ActionExecutioner
 from modules.action_parser import ActionParser
+from modules.consultation_cache import ConsultationCache
 from modules.evaluator import AgentEvaluator, UsageStatistics
+from modules.execution_profile import ExecutionScheduler
+from modules.fork_server import ForkServer
 from modules.llm_assistant import LLMAssistant
 from modules.logger import AgentLogger
+from modules.observation_compressor import ObservationCompressor
+from modules.observation_store import ObservationStore
+from modules.script_cache import ScriptResultCache
+from modules.script_patcher import ScriptPatcher
+from modules.script_runner import ScriptRunner
+from modules.script_validator import ScriptValidator
+from modules.smoke_run import SmokeRunner
+from modules.training_monitor import TrainingMonitor
+from modules.training_snapshot import TrainingSnapshot
 from modules.low_level_actions import read_file
 
 
@@ -92,23 +105,51 @@ class MLAgentIO:
     SUPPORTING_LLM_INSTRUCTIONS_DIR = "../assistants_instructions/supporting"
     ENVIRONMENT_DIR = "../environment"
 
-    def __init__(self, api_key: str, assistant_model: str | None = None):
+    def __init__(self, api_key: str, assistant_model: str | None = None,
+                 context_mode: str = LLMAssistant.FULL_CONTEXT_MODE, observation_max_age: int | None = None,
+                 cache_script_results: bool = False, reuse_training_snapshots: bool = False,
+                 script_timeout: float | None = None, observation_compressor: ObservationCompressor | None = None,
+                 warm_start: bool = False, validate_scripts: bool = False, validate_edits: bool = False,
+                 smoke_run_before_execution: bool = False, training_monitor: TrainingMonitor | None = None,
+                 execution_scheduler: ExecutionScheduler | None = None, script_memory_limit_mb: int | None = None,
+                 script_address_space_limit_mb: int | None = None, cache_consultations: bool = False,
+                 patch_edits: bool = False):
         self.main_instructions: str = self.__build_instructions(self.MAIN_LLM_INSTRUCTIONS_DIR)
         self.supporting_instructions = self.__build_instructions(self.SUPPORTING_LLM_INSTRUCTIONS_DIR)
+        # Observations are only stored when they can be aged into digests and recalled
+        self.observation_store = ObservationStore() if observation_max_age is not None else None
         self.main_assistant = LLMAssistant(api_key=api_key,
                                            starting_instructions=self.main_instructions,
-                                           model=assistant_model
+                                           model=assistant_model,
+                                           context_mode=context_mode,
+                                           observation_store=self.observation_store,
+                                           observation_max_age=observation_max_age
                                            )
         self.supporting_assistant = LLMAssistant(api_key=api_key,
                                                  starting_instructions=self.supporting_instructions,
-                                                 model=None
+                                                 model=None,
+                                                 consultation_cache=ConsultationCache() if cache_consultations
+                                                 else None
                                                  )
 
         self.parser = ActionParser()
+        self.fork_server = ForkServer() if warm_start and ForkServer.is_supported() else None
 
+        script_runner = ScriptRunner(timeout=script_timeout, fork_server=self.fork_server, monitor=training_monitor,
+                                     scheduler=execution_scheduler, memory_limit_mb=script_memory_limit_mb,
+                                     address_space_limit_mb=script_address_space_limit_mb)
         self.executioner = ActionExecutioner(action_mapping=self.parser.DEFAULT_ACTION_MAPPING,
-                                             assistant=self.supporting_assistant)
-
+                                             assistant=self.supporting_assistant,
+                                             observation_store=self.observation_store,
+                                             script_cache=ScriptResultCache() if cache_script_results else None,
+                                             training_snapshot=TrainingSnapshot() if reuse_training_snapshots else None,
+                                             script_runner=script_runner,
+                                             script_validator=ScriptValidator(check_edits=validate_edits)
+                                             if validate_scripts or validate_edits else None,
+                                             smoke_runner=SmokeRunner(run_before_execution=smoke_run_before_execution),
+                                             script_patcher=ScriptPatcher() if patch_edits else None)
+
+        self.observation_compressor = observation_compressor if observation_compressor else ObservationCompressor()
         self.logger = AgentLogger()
         self.evaluator = AgentEvaluator()
 
@@ -326,7 +367,8 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
             print(f"Error creating task: {str(e)}")
             return False
 
-    def run_task(self, task_name: str | None = None, auto: bool = False, terminate_after: int = 30) -> TaskResult:
+    def run_task(self, task_name: str | None = None, auto: bool = False, terminate_after: int = 30,
+                 time_budget: float | None = None) -> TaskResult:
         """
             Runs a task with specified parameters and iterates through multiple steps to achieve the goal.
 
@@ -334,6 +376,7 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
                 task_name (str | None): The name of the task to execute. If None, the user is prompted to choose a task.
                 auto (bool): If True, automatically proceeds with the task. If False, the user is prompted for decisions during execution.
                 terminate_after (int): The iteration after which the task should automatically terminate (only relevant if `auto` is True).
+                time_budget (float | None): The wall-clock budget of the task in seconds. Once it runs out, running scripts are stopped and the task is terminated.
 
             Behavior:
                 - Chooses a task if `task_name` is not provided.
@@ -342,7 +385,8 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
                 - Iterates through multiple steps, executing actions and capturing observations.
                 - Provides an option to manually control whether to continue or terminate the task.
                 - Records output and observation logs, including performance metrics and statistics.
-                - Automatically terminates if the goal is achieved or if the `auto` flag is set to True and `terminate_after` is reached.
+                - Logs the raw observations, but sends them to the assistant through the observation compressor.
+                - Automatically terminates if the goal is achieved, if the `auto` flag is set to True and `terminate_after` is reached, or if the `time_budget` runs out.
                 - Evaluates the agent performance and saves the metrics at the end.
 
             Returns:
@@ -353,11 +397,20 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
         task_env_dir_path = self.__setup_task(active_task=active_task, run_timestamp_str=run_timestamp_str)
 
         self.executioner.setup(task_dir_path=task_env_dir_path)
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        self.executioner.script_runner.set_deadline(deadline)
+        self.executioner.script_runner.resource_totals.reset()
+        if self.executioner.script_patcher is not None:
+            self.executioner.script_patcher.reset_statistics()
         self.logger.setup(task_name=active_task.name, log_timestamp_str=run_timestamp_str)
+        if self.observation_store is not None:
+            self.observation_store.setup(task_name=active_task.name, run_timestamp_str=run_timestamp_str)
+        self.observation_compressor.reset_statistics()
 
         iteration_index = 1
         output = None
         observation = None
+        action_name = None
         goal_achieved = False
         while True:
             if iteration_index == 1:
@@ -366,7 +419,10 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
                 self.logger.initial_log(instructions=self.main_instructions,
                                         research_problem=self.__get_research_problem(active_task=active_task))
             else:
-                output = self.main_assistant.consult(observation, iteration_index)
+                output = self.main_assistant.consult(observation, iteration_index, action_name=action_name)
+                context_savings = self.main_assistant.get_last_context_savings()
+                if context_savings is not None:
+                    print(f"Context tokens saved ({iteration_index}): {context_savings}")
 
             print(f"\n=======Output ({iteration_index})=======:\n", output)
             print("=" * 10)
@@ -390,6 +446,10 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
                 command = input()
             command = command.lower()
 
+            if deadline is not None and time.monotonic() >= deadline:
+                print("The wall-clock budget of the task ran out. Terminating.")
+                command = "t"
+
             if command.lower() == "end":
                 break
 
@@ -407,8 +467,6 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
                 self.logger.save_log(output, observation)
 
                 goal_achieved = self.parser.parse_final_message(observation)
-
-                self.logger.close()
                 break
 
             observation = self.executioner.execute(action_name, action_args)
@@ -418,9 +476,10 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
 
             if ActionExecutioner.FINAL_ANSWER_FLAG in observation:
                 goal_achieved = self.parser.parse_final_message(observation)
-                self.logger.close()
                 break
 
+            observation = self.observation_compressor.compress(action_name, observation)
+
             if not auto:
                 print(
                     "Should the agent process continue executing?"
@@ -434,13 +493,31 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
 
             iteration_index += 1
 
+        self.executioner.job_manager.cancel_all()
+        self.executioner.version_store.clear()
         main_usage_statistics = self.main_assistant.get_and_reset_usage_statistics()
         supporting_usage_statistics = self.supporting_assistant.get_and_reset_usage_statistics()
+        resource_totals = self.executioner.script_runner.resource_totals
+        statistics = [self.observation_compressor.describe_statistics(), resource_totals.describe()]
+        if main_usage_statistics.context_tokens_saved:
+            statistics.append(f"Context tokens saved per iteration: {main_usage_statistics.context_tokens_saved}")
+            statistics.append(f"Context tokens saved in total: {main_usage_statistics.get_total_context_savings()}")
+        if supporting_usage_statistics.get_cache_hit_rate() is not None:
+            statistics.append(f"Consultation cache: {supporting_usage_statistics.cache_hits} hits, "
+                              f"{supporting_usage_statistics.cache_misses} misses "
+                              f"({100 * supporting_usage_statistics.get_cache_hit_rate():.0f}% hit rate)")
+        if self.executioner.script_patcher is not None and \
+                self.executioner.script_patcher.describe_statistics() is not None:
+            statistics.append(self.executioner.script_patcher.describe_statistics())
+        print("\n".join(statistics))
+        self.logger.save_statistics("\n".join(statistics))
+        self.logger.close()
         total_requests, tokens_spent, money_spent = self.evaluator.save_performance_metrics(
             task_name=active_task.name,
             main_usage_statistics=main_usage_statistics,
             supporting_usage_statistics=supporting_usage_statistics,
-            goal_achieved=goal_achieved)
+            goal_achieved=goal_achieved,
+            resource_totals=resource_totals)
 
         task_result = TaskResult(model=self.main_assistant.get_model(),
                                  task=active_task,
@@ -460,9 +537,12 @@ After completing steps 1 and 2, press any key in the console to finalize task cr
             Behavior:
                 - Ends the current conversation with the main assistant.
                 - Shuts down the executioner, stopping any ongoing operations.
+                - Stops the fork server, if warm start is enabled.
 
             Returns:
                 None
         """
         self.main_assistant.end_conversation()
         self.executioner.shutdown()
+        if self.fork_server is not None:
+            self.fork_server.stop()
@@ -0,0 +1,207 @@
+import re
+
+from modules.low_level_actions import estimate_tokens
+
+
+class ObservationCompressor:
+    """
+        Compresses observations before they are sent to the main assistant.
+        The base compressor keeps observations unchanged. Subclasses override 'compress_observation'.
+    """
+
+    def __init__(self):
+        self.original_tokens = 0
+        self.compressed_tokens = 0
+        self.compressed_observations = 0
+
+    def reset_statistics(self):
+        """
+            Resets the statistics, so they describe a single task run.
+        """
+        self.original_tokens = 0
+        self.compressed_tokens = 0
+        self.compressed_observations = 0
+
+    def compress(self, action_name: str | None, observation: str) -> str:
+        """
+            Compresses an observation and records the estimated tokens saved.
+
+            Parameters:
+                action_name (str | None): The name of the action that produced the observation.
+                observation (str): The raw observation.
+
+            Returns:
+                str: The compressed observation.
+        """
+        compressed_observation = self.compress_observation(action_name, observation)
+
+        self.original_tokens += estimate_tokens(observation)
+        self.compressed_tokens += estimate_tokens(compressed_observation)
+        if compressed_observation != observation:
+            self.compressed_observations += 1
+        return compressed_observation
+
+    def compress_observation(self, action_name: str | None, observation: str) -> str:
+        """
+            Compresses a single observation.
+
+            Parameters:
+                action_name (str | None): The name of the action that produced the observation.
+                observation (str): The raw observation.
+
+            Returns:
+                str: The compressed observation.
+        """
+        return observation
+
+    def get_tokens_saved(self) -> int:
+        """
+            Returns the estimated number of tokens saved since the last reset.
+        """
+        return self.original_tokens - self.compressed_tokens
+
+    def describe_statistics(self) -> str:
+        """
+            Describes the compression statistics since the last reset.
+
+            Returns:
+                str: A one-line summary of the compressed observations and tokens saved.
+        """
+        return (f"Observation compression: {self.compressed_observations} observations compressed, "
+                f"~{self.original_tokens} -> ~{self.compressed_tokens} tokens "
+                f"(~{self.get_tokens_saved()} tokens saved)")
+
+
+class NoiseAwareCompressor(ObservationCompressor):
+    """
+        Compresses the "Errors and Warnings" section of script observations.
+        Known benign warning families are collapsed into one-line counts, repeated lines are deduplicated and
+        tracebacks are kept verbatim.
+    """
+    ERRORS_SECTION_PATTERN = re.compile(r"(Errors and Warnings:\n)(.*?)(\n(?:Output shortened|Script execution was "
+                                        r"stopped|Process finished with exit code))", re.DOTALL)
+    TRACEBACK_START = "Traceback (most recent call last):"
+    EMBEDDED_TRACEBACK_PATTERN = re.compile(r"([^\n])(Traceback \(most recent call last\):)")
+    SAMPLE_MAX_CHARS = 120
+
+    # (family name, line pattern, continuation line pattern, which occurrence to show as a sample, whether every
+    # distinct message, the last group of the pattern, is collapsed separately)
+    BENIGN_WARNING_FAMILIES = (
+        ("TensorFlow oneDNN notice", re.compile(r"oneDNN custom operations are on"), None, None, False),
+        ("TensorFlow CPU instructions notice", re.compile(r"cpu_feature_guard\.cc"),
+         re.compile(r"^To enable the following instructions"), None, False),
+        ("TensorFlow CUDA/TensorRT notice",
+         re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+: [IWE] |[IWE]\d{4} ).*(cuda|cudnn|cufft|cublas|tensorrt)",
+                    re.IGNORECASE), None, None, False),
+        ("TensorFlow/absl log", re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+: [IW] |[IW]\d{4} |WARNING: All log "
+                                           r"messages before absl)"), None, None, False),
+        ("TensorFlow deprecation warning", re.compile(r"^WARNING:tensorflow:From .*is deprecated"), None, "first",
+         False),
+        ("Transformers uninitialized weights notice", re.compile(r"^Some weights of .* were not initialized"),
+         re.compile(r"^(- This IS|- This IS NOT|You should probably TRAIN this model)"), None, False),
+        ("tokenizers fork warning", re.compile(r"^huggingface/tokenizers: The current process just got forked"),
+         re.compile(r"^(To disable this warning|\t- (Avoid using|Explicitly set))"), None, False),
+        # Python warnings can be actionable (convergence, ill-defined metrics, changed defaults), so only
+        # repetitions of the same message are collapsed, and every distinct message keeps a sample
+        ("Python {0}", re.compile(r":\d+: (\w*Warning): (.*)"), re.compile(r"^\s+(warnings\.warn|warn)\("), "first",
+         True),
+        ("progress bar line", re.compile(r"(\d+%\|.*\||\d+ examples \[|it/s\]|s/it\])"), None, "last", False),
+    )
+
+    def __match_family(self, line: str) -> tuple[str, int, str] | None:
+        """
+            Returns the key the line is grouped by, the index of its family and the name shown in the summary.
+        """
+        for index, (name, pattern, _, _, distinct_messages) in enumerate(self.BENIGN_WARNING_FAMILIES):
+            match = pattern.search(line)
+            if match is not None:
+                display_name = name.format(*match.groups())
+                key = f"{display_name}\0{match.group(match.lastindex)}" if distinct_messages else display_name
+                return key, index, display_name
+        return None
+
+    def compress_errors(self, errors: str) -> str:
+        """
+            Compresses the stderr output of a script.
+
+            Parameters:
+                errors (str): The content of the "Errors and Warnings" section.
+
+            Returns:
+                str: The compressed section.
+
+            Behavior:
+                - Lines of tracebacks, from "Traceback (most recent call last):" up to and including the exception
+                  line, are kept verbatim, even if the traceback starts in the middle of a progress bar line.
+                - Lines of a benign warning family, and their continuation lines, are replaced by a single line
+                  with their count at the position of the first occurrence. Python warnings are collapsed per
+                  distinct message, so every different warning keeps its own line and sample.
+                - Other lines that occur more than once are kept once, annotated with their count.
+                - Runs of blank lines are reduced to one.
+        """
+        lines = self.EMBEDDED_TRACEBACK_PATTERN.sub("\\1\n\\2", errors).split("\n")
+        entries = []
+        families = {}
+        line_counts = {}
+        in_traceback = False
+        previous_family = None
+
+        for line in lines:
+            if line.startswith(self.TRACEBACK_START):
+                in_traceback = True
+            if in_traceback:
+                entries.append(("verbatim", line))
+                if line and not line[0].isspace() and not line.startswith(self.TRACEBACK_START):
+                    in_traceback = False
+                previous_family = None
+                continue
+
+            if previous_family is not None:
+                continuation_pattern = self.BENIGN_WARNING_FAMILIES[previous_family[1]][2]
+                if continuation_pattern is not None and continuation_pattern.search(line):
+                    continue
+
+            family = self.__match_family(line)
+            if family is not None:
+                if family[0] not in families:
+                    families[family[0]] = [0, line, line, family[1], family[2]]
+                    entries.append(("family", family[0]))
+                families[family[0]][0] += 1
+                families[family[0]][2] = line
+                previous_family = family
+                continue
+
+            previous_family = None
+            if not line.strip():
+                if entries and entries[-1] == ("line", ""):
+                    continue
+                entries.append(("line", ""))
+                continue
+
+            if line not in line_counts:
+                line_counts[line] = 0
+                entries.append(("line", line))
+            line_counts[line] += 1
+
+        compressed_lines = []
+        for kind, content in entries:
+            if kind == "family":
+                count, first_line, last_line, family_index, display_name = families[content]
+                sample_kind = self.BENIGN_WARNING_FAMILIES[family_index][3]
+                summary = f"[{count}x {display_name} collapsed"
+                if sample_kind is not None:
+                    sample = (first_line if sample_kind == "first" else last_line).strip()
+                    if len(sample) > self.SAMPLE_MAX_CHARS:
+                        sample = sample[:self.SAMPLE_MAX_CHARS] + "..."
+                    summary += f", {sample_kind}: {sample}"
+                compressed_lines.append(summary + "]")
+            elif kind == "line" and line_counts.get(content, 1) > 1:
+                compressed_lines.append(f"{content} [repeated {line_counts[content]}x]")
+            else:
+                compressed_lines.append(content)
+
+        return "\n".join(compressed_lines).strip("\n")
+
+    def compress_observation(self, action_name: str | None, observation: str) -> str:
+        return self.ERRORS_SECTION_PATTERN.sub(
+            lambda match: match.group(1) + self.compress_errors(match.group(2)) + match.group(3), observation)
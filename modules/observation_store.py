@@ -0,0 +1,118 @@
+import os
+
+
+class ObservationStore:
+    OBSERVATIONS_DEFAULT_DIR = "../observations"
+    DIGEST_PREVIEW_CHARS = 150
+    DIGEST_TAIL_LINES = 3
+    FENCE_LINES = ("'''", '"""', "```")
+
+    def __init__(self, observations_dir_path: str = None):
+        if observations_dir_path is None:
+            observations_dir_path = ObservationStore.OBSERVATIONS_DEFAULT_DIR
+
+        self.observations_dir_path = observations_dir_path
+        self.run_dir_path = None
+
+    def setup(self, task_name: str, run_timestamp_str: str):
+        """
+            Initializes the store for a specific task run.
+
+            Parameters:
+                task_name (str): The name of the task whose observations are being stored.
+                run_timestamp_str (str): A timestamp string to ensure a unique directory per run.
+
+            Behavior:
+                - Creates a dedicated directory for the observations of this run.
+        """
+        self.run_dir_path = os.path.join(self.observations_dir_path, f"{task_name}_{run_timestamp_str}")
+        os.makedirs(self.run_dir_path, exist_ok=True)
+
+    @staticmethod
+    def to_handle(iteration_index: int) -> str:
+        """
+            Builds the handle under which the observation of an iteration is stored.
+
+            Parameters:
+                iteration_index (int): The iteration number of the observation.
+
+            Returns:
+                str: The handle, for example "obs-7".
+        """
+        return f"obs-{iteration_index}"
+
+    def __build_observation_path(self, handle: str) -> str:
+        return os.path.join(self.run_dir_path, f"{handle}.txt")
+
+    def save(self, observation: str, iteration_index: int) -> str:
+        """
+            Stores the full text of an observation.
+
+            Parameters:
+                observation (str): The full observation.
+                iteration_index (int): The iteration number of the observation.
+
+            Returns:
+                str: The handle that can later be used to load the observation.
+        """
+        handle = self.to_handle(iteration_index)
+        with open(self.__build_observation_path(handle), mode="w", encoding="utf-8") as file:
+            file.write(observation)
+        return handle
+
+    def load(self, handle: str) -> str | None:
+        """
+            Loads the full text of a stored observation.
+
+            Parameters:
+                handle (str): The handle returned when the observation was saved.
+
+            Returns:
+                str | None: The full observation, or None if no observation is stored under the handle.
+        """
+        if self.run_dir_path is None or not handle.startswith("obs-") or not handle[4:].isdigit():
+            return None
+
+        observation_path = self.__build_observation_path(handle)
+        if not os.path.exists(observation_path):
+            return None
+
+        with open(observation_path, mode="r", encoding="utf-8") as file:
+            return file.read()
+
+    @staticmethod
+    def build_digest(observation: str, handle: str, action_name: str | None = None) -> str:
+        """
+            Builds a short digest that replaces an aged observation in the assistant context.
+
+            Parameters:
+                observation (str): The full observation.
+                handle (str): The handle under which the observation is stored.
+                action_name (str | None): The action that produced the observation.
+
+            Returns:
+                str: A digest with the action, the size of the observation, a preview of its first line, its last
+                     non-empty lines and its handle.
+
+            Behavior:
+                - The last lines are kept because they hold the outcome of most observations, e.g. the final
+                  metrics, the exit code and the resource footer of a script run. Lines that only close a quoted
+                  block are skipped.
+        """
+        def shorten(line: str) -> str:
+            line = line.strip()
+            if len(line) > ObservationStore.DIGEST_PREVIEW_CHARS:
+                line = line[:ObservationStore.DIGEST_PREVIEW_CHARS] + "..."
+            return line
+
+        lines = observation.splitlines()
+        preview = shorten(lines[0]) if lines else ""
+        tail_lines = [line for line in lines[1:] if line.strip() and line.strip() not in ObservationStore.FENCE_LINES]
+        tail_lines = tail_lines[-ObservationStore.DIGEST_TAIL_LINES:]
+
+        source = f" of {action_name}" if action_name else ""
+        digest = (f"[Aged observation '{handle}'{source}: {len(lines)} lines, {len(observation)} characters. "
+                  f"Starts with: {preview}\n")
+        if tail_lines:
+            digest += "Ends with:\n" + "".join(f"    {shorten(line)}\n" for line in tail_lines)
+        return digest + f"Use the Recall Observation action with \"observation_id\": \"{handle}\" to see it in full.]"
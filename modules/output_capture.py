@@ -0,0 +1,143 @@
+import codecs
+import re
+import threading
+from collections import deque
+
+
+class BoundedOutput:
+    LINE_BREAK_PATTERN = re.compile(r"[\r\n]")
+    DEFAULT_HEAD_CHARS = 4000
+    DEFAULT_TAIL_CHARS = 8000
+    MAX_LINE_CHARS = 2000
+
+    def __init__(self, head_chars: int = DEFAULT_HEAD_CHARS, tail_chars: int = DEFAULT_TAIL_CHARS,
+                 line_callback=None):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.line_callback = line_callback
+        self.lock = threading.Lock()
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.current_line = []
+        self.current_line_size = 0
+        self.pending_carriage_return = False
+
+        self.total_bytes = 0
+        self.elided_lines = 0
+        self.elided_bytes = 0
+        self.elided_in_line_bytes = 0
+        self.collapsed_redraws = 0
+
+    def feed(self, chunk: bytes):
+        """
+            Adds a chunk of raw output to the buffer.
+
+            Parameters:
+                chunk (bytes): The bytes read from an output pipe of the script.
+
+            Behavior:
+                - A carriage return that is not followed by a newline starts a redraw of the current line, such as
+                  a progress bar update. Only the final state of the line is kept.
+                - Completed lines fill the head first. Later lines go to the tail, which drops its oldest lines
+                  once it exceeds 'tail_chars', so memory stays constant regardless of the output size.
+                - Every completed line, and the last state of every redrawn line, is passed to 'line_callback'.
+        """
+        with self.lock:
+            self.total_bytes += len(chunk)
+            text = self.decoder.decode(chunk)
+            start = 0
+            for match in self.LINE_BREAK_PATTERN.finditer(text):
+                self.__append_to_line(text[start:match.start()])
+                start = match.end()
+                if match.group() == "\n":
+                    self.pending_carriage_return = False
+                    self.__complete_line()
+                else:
+                    self.pending_carriage_return = True
+
+            self.__append_to_line(text[start:])
+
+    def __append_to_line(self, text: str):
+        if not text:
+            return
+
+        if self.pending_carriage_return:
+            self.pending_carriage_return = False
+            if self.line_callback is not None:
+                self.line_callback("".join(self.current_line))
+            self.current_line = []
+            self.current_line_size = 0
+            self.collapsed_redraws += 1
+
+        free_chars = self.MAX_LINE_CHARS - self.current_line_size
+        if len(text) > free_chars:
+            self.elided_in_line_bytes += len(text[free_chars:].encode("utf-8"))
+            text = text[:free_chars]
+
+        if text:
+            self.current_line.append(text)
+            self.current_line_size += len(text)
+
+    def __complete_line(self):
+        line = "".join(self.current_line)
+        self.current_line = []
+        self.current_line_size = 0
+        if self.line_callback is not None:
+            self.line_callback(line)
+
+        if not self.tail and self.head_size + len(line) <= self.head_chars:
+            self.head.append(line)
+            self.head_size += len(line) + 1
+            return
+
+        self.tail.append(line)
+        self.tail_size += len(line) + 1
+        while self.tail_size > self.tail_chars and len(self.tail) > 1:
+            elided_line = self.tail.popleft()
+            self.tail_size -= len(elided_line) + 1
+            self.elided_lines += 1
+            self.elided_bytes += len(elided_line.encode("utf-8")) + 1
+
+    def getvalue(self) -> str:
+        """
+            Returns the kept output.
+
+            Returns:
+                str: The head, a marker where lines were elided, and the tail, including an unfinished last line.
+
+            Behavior:
+                - Can be called while the output is still being fed, e.g. to tail a running script.
+        """
+        with self.lock:
+            lines = list(self.head)
+            if self.elided_lines:
+                lines.append(f"[... {self.elided_lines} lines ({self.elided_bytes} bytes) elided ...]")
+            lines.extend(self.tail)
+
+            text = "\n".join(lines)
+            if lines:
+                text += "\n"
+            return text + "".join(self.current_line)
+
+    def describe_elision(self) -> str | None:
+        """
+            Describes how much of the output was dropped or collapsed.
+
+            Returns:
+                str | None: A one-line summary, or None if the whole output was kept.
+        """
+        details = []
+        if self.elided_lines:
+            details.append(f"{self.elided_lines} lines ({self.elided_bytes} bytes) elided")
+        if self.elided_in_line_bytes:
+            details.append(f"{self.elided_in_line_bytes} bytes of overlong lines elided")
+        if self.collapsed_redraws:
+            details.append(f"{self.collapsed_redraws} progress redraws collapsed")
+
+        if not details:
+            return None
+        return f"{', '.join(details)} out of {self.total_bytes} bytes"
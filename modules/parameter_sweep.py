@@ -0,0 +1,203 @@
+import itertools
+import os
+import queue
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.execution_profile import ExecutionProfile, ExecutionScheduler
+from modules.script_runner import ScriptRunner, ScriptRunResult
+from modules.training_monitor import TrainingMonitor
+
+
+class ParameterSweep:
+    """
+        Runs the variants of a script with a grid of parameter overrides concurrently and tabulates their metrics.
+
+        Parameters whose name starts with "-" are passed as command line arguments (e.g. "--lr 0.01"), all others
+        as environment variables (e.g. "LR=0.01"). Every variant runs in its own temporary copy of the task
+        directory, so files written by one variant do not affect the others or the task.
+    """
+    DEFAULT_MAX_VARIANTS = 8
+    MAX_METRIC_COLUMNS = 6
+    REPORT_ACCURACY_PATTERN = re.compile(r"^\s*accuracy\s+(\d*\.\d+)\s+\d+\s*$")
+    REPORT_AVERAGE_PATTERN = re.compile(r"^\s*(macro|weighted) avg\s+(\d*\.\d+)\s+(\d*\.\d+)\s+(\d*\.\d+)\s+\d+\s*$")
+    IGNORED_DIR_NAMES = ("__pycache__",)
+
+    def __init__(self, max_variants: int = DEFAULT_MAX_VARIANTS, max_workers: int | None = None):
+        self.max_variants = max_variants
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count() or 1
+
+    def build_variants(self, parameters: dict) -> list[dict]:
+        """
+            Expands a grid of parameter values into the list of its combinations.
+
+            Parameters:
+                parameters (dict): The values to try for every parameter, such as {"LR": [0.1, 0.01]}.
+
+            Returns:
+                list[dict]: Every combination of one value per parameter.
+
+            Raises:
+                ValueError: If the grid is empty, a parameter has no values, or the grid has more than
+                            'max_variants' combinations.
+        """
+        if not parameters:
+            raise ValueError("No parameters provided")
+
+        names = list(parameters)
+        values = [parameters[name] if isinstance(parameters[name], list) else [parameters[name]] for name in names]
+        if any(not parameter_values for parameter_values in values):
+            raise ValueError("Every parameter needs at least one value")
+
+        variant_count = 1
+        for parameter_values in values:
+            variant_count *= len(parameter_values)
+        if variant_count > self.max_variants:
+            raise ValueError(f"The grid has {variant_count} combinations, but at most {self.max_variants} are allowed")
+
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+    @staticmethod
+    def extract_metrics(result: ScriptRunResult) -> dict:
+        """
+            Extracts the final value of every metric printed by a script.
+
+            Returns:
+                dict: The metrics found in "name: value" / "name=value" pairs and in scikit-learn classification
+                      reports, keeping the last value of each.
+        """
+        monitor = TrainingMonitor(stop_on_nan=False, patience=None, explosion_factor=None)
+        report_metrics = {}
+        for line in result.stdout.split("\n"):
+            monitor.observe_line(line)
+
+            match = ParameterSweep.REPORT_ACCURACY_PATTERN.match(line)
+            if match is not None:
+                report_metrics["accuracy"] = float(match.group(1))
+            match = ParameterSweep.REPORT_AVERAGE_PATTERN.match(line)
+            if match is not None:
+                report_metrics[f"{match.group(1)}_avg_f1"] = float(match.group(4))
+
+        return {**monitor.last_metrics, **report_metrics}
+
+    @staticmethod
+    def __describe_status(result: ScriptRunResult | None, error: str | None) -> str:
+        if error is not None:
+            return f"error: {error}"
+        if result.stop_reason is not None:
+            return f"stopped after {result.wall_time:.0f}s"
+        return f"exit {result.return_code} in {result.wall_time:.0f}s"
+
+    @staticmethod
+    def __describe_failure(result: ScriptRunResult | None) -> str | None:
+        if result is None or (result.return_code == 0 and result.stop_reason is None):
+            return None
+        if result.stop_reason is not None:
+            return result.stop_reason
+        error_lines = [line for line in result.stderr.split("\n") if line.strip()]
+        return error_lines[-1].strip() if error_lines else None
+
+    def __run_variant(self, script_runner: ScriptRunner, task_dir_path: str, script_name: str, variant: dict,
+                      profiles: queue.Queue) -> tuple[ScriptRunResult | None, str | None]:
+        variant_dir_path = tempfile.mkdtemp(prefix="mlagentio_sweep_")
+        profile = profiles.get()
+        try:
+            shutil.copytree(task_dir_path, variant_dir_path, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns(*self.IGNORED_DIR_NAMES))
+
+            command = [sys.executable, script_name]
+            # Without a profile, the scheduler of the runner chooses the threads and CPUs of the variant
+            environment = profile.build_environment() if profile is not None else {}
+            for name, value in variant.items():
+                if name.startswith("-"):
+                    command += [name, str(value)]
+                else:
+                    environment[name] = str(value)
+
+            return script_runner.run(command, cwd=variant_dir_path, env=environment), None
+        except Exception as e:
+            return None, str(e)
+        finally:
+            profiles.put(profile)
+            shutil.rmtree(variant_dir_path, ignore_errors=True)
+
+    def run(self, script_runner: ScriptRunner, task_dir_path: str, script_name: str, parameters: dict) -> str:
+        """
+            Runs every variant of a script and tabulates the results.
+
+            Parameters:
+                script_runner (ScriptRunner): The runner whose timeout, deadline, memory limits and training monitor
+                                              apply to every variant, and whose resource totals the variants are
+                                              added to.
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+                parameters (dict): The values to try for every parameter.
+
+            Returns:
+                str: A table with the parameters, the status and the final metrics of every variant.
+
+            Behavior:
+                - Runs up to 'max_workers' variants at once. If the runner has an execution scheduler, every
+                  variant takes a lease from it, so the variants share the CPUs with the other scripts of the agent
+                  and, through its registry, of the other agents on the host. Otherwise the CPUs are split evenly
+                  between the variants, and every concurrently running variant is pinned to its own share.
+                - The variants are run without the fork server, since thread limits must be set before the ML
+                  libraries are imported.
+        """
+        variants = self.build_variants(parameters)
+        workers = max(1, min(len(variants), self.max_workers))
+        profiles = queue.Queue()
+        if script_runner.scheduler is not None:
+            threads = None
+            for _ in range(workers):
+                profiles.put(None)
+        else:
+            scheduler = ExecutionScheduler()
+            threads = max(1, len(scheduler.cpus) // workers)
+            for worker in range(workers):
+                cpu_affinity = [scheduler.cpus[(worker * threads + index) % len(scheduler.cpus)]
+                                for index in range(threads)] if scheduler.pin_cpus else None
+                profiles.put(ExecutionProfile(threads=threads, cpu_affinity=cpu_affinity))
+
+        variant_runner = ScriptRunner(timeout=script_runner.timeout, monitor=script_runner.monitor,
+                                      scheduler=script_runner.scheduler,
+                                      resource_totals=script_runner.resource_totals,
+                                      memory_limit_mb=script_runner.memory_limit_mb,
+                                      address_space_limit_mb=script_runner.address_space_limit_mb)
+        variant_runner.set_deadline(script_runner.deadline)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(
+                lambda variant: self.__run_variant(variant_runner, task_dir_path, script_name, variant, profiles),
+                variants))
+
+        metrics = [self.extract_metrics(result) if result is not None else {} for result, _ in outcomes]
+        metric_names = []
+        for variant_metrics in metrics:
+            metric_names += [name for name in variant_metrics if name not in metric_names]
+        # Prefer validation and final report metrics, which are the ones variants are compared by
+        metric_names = sorted(metric_names, key=lambda name: not name.lower().startswith(
+            ("val_", "eval_", "accuracy", "macro", "weighted")))[:self.MAX_METRIC_COLUMNS]
+
+        header = ["#", *variants[0].keys(), "status", *metric_names]
+        rows = []
+        for index, (variant, (result, error), variant_metrics) in enumerate(zip(variants, outcomes, metrics)):
+            rows.append([str(index + 1), *[str(value) for value in variant.values()],
+                         self.__describe_status(result, error),
+                         *[f"{variant_metrics[name]:.4g}" if name in variant_metrics else "-" for name in metric_names]])
+
+        widths = [max(len(row[column]) for row in [header, *rows]) for column in range(len(header))]
+        cpu_share = f"{threads} CPU thread(s) each" if threads is not None else "CPU threads from the scheduler"
+        lines = [f"Parameter sweep of '{script_name}': {len(variants)} variants, {workers} at a time with "
+                 f"{cpu_share}."]
+        for row in [header, *rows]:
+            lines.append(" | ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        lines.insert(2, "-+-".join("-" * width for width in widths))
+
+        failures = [(index + 1, self.__describe_failure(result)) for index, (result, _) in enumerate(outcomes)]
+        for index, failure in failures:
+            if failure is not None:
+                lines.append(f"Variant {index}: {failure}")
+        return "\n".join(lines)
@@ -0,0 +1,258 @@
+import os
+import sys
+import threading
+
+MEGABYTE = 1024 * 1024
+
+
+class ResourceUsage:
+    """
+        The resources used by one script run, including every process the script started.
+        Values that could not be measured on the platform are None.
+    """
+
+    def __init__(self, wall_time: float, user_time: float | None = None, system_time: float | None = None,
+                 peak_rss_bytes: int | None = None, bytes_written: int | None = None):
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.peak_rss_bytes = peak_rss_bytes
+        self.bytes_written = bytes_written
+
+    def get_cpu_time(self) -> float | None:
+        """
+            Returns the user plus system CPU time, or None if it was not measured.
+        """
+        if self.user_time is None or self.system_time is None:
+            return None
+        return self.user_time + self.system_time
+
+    def describe(self) -> str:
+        """
+            Describes the usage in one compact line, such as
+            "Resources: wall 12.3s, CPU 40.1s user + 2.0s sys, peak RSS 1234 MB, written 5.2 MB".
+        """
+        parts = [f"wall {self.wall_time:.1f}s"]
+        if self.get_cpu_time() is not None:
+            parts.append(f"CPU {self.user_time:.1f}s user + {self.system_time:.1f}s sys")
+        if self.peak_rss_bytes is not None:
+            parts.append(f"peak RSS {self.peak_rss_bytes / MEGABYTE:.0f} MB")
+        if self.bytes_written is not None:
+            parts.append(f"written {self.bytes_written / MEGABYTE:.1f} MB")
+        return f"Resources: {', '.join(parts)}"
+
+
+class ProcessGroupSampler:
+    """
+        Periodically samples the processes of a script's process group from /proc, to measure the peak memory of the
+        whole process tree (e.g. a training script with its DataLoader workers) and the bytes it wrote.
+        If an RSS limit is given, 'limit_exceeded' is set as soon as the summed RSS of the group is above it.
+
+        Sampling is only available on Linux. On other platforms the sampler does nothing.
+    """
+    DEFAULT_INTERVAL_SECONDS = 0.5
+    PROC_DIR_PATH = "/proc"
+
+    def __init__(self, process_group_id: int, interval: float = DEFAULT_INTERVAL_SECONDS,
+                 rss_limit_bytes: int | None = None):
+        self.process_group_id = process_group_id
+        self.interval = interval
+        self.rss_limit_bytes = rss_limit_bytes
+        self.limit_exceeded = threading.Event()
+        self.limit_exceeded_rss_bytes = None
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.peak_rss_bytes = 0
+        self.cpu_ticks = {}
+        self.bytes_written = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def is_supported() -> bool:
+        """
+            Checks whether the platform exposes the processes under /proc.
+        """
+        return sys.platform.startswith("linux") and os.path.isdir(ProcessGroupSampler.PROC_DIR_PATH)
+
+    def __read_process(self, pid: str) -> tuple[int, int, int] | None:
+        """
+            Returns the resident memory in bytes and the user and system CPU ticks of a process of the group, or None
+            if the process belongs to another group or no longer exists.
+        """
+        try:
+            with open(os.path.join(self.PROC_DIR_PATH, pid, "stat"), mode="rb") as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            return None
+
+        # The command name may contain spaces and parentheses, so the fields are read after its last ')'
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if len(fields) < 22 or int(fields[2]) != self.process_group_id:
+            return None
+        return int(fields[21]) * self.page_size, int(fields[11]), int(fields[12])
+
+    def __read_bytes_written(self, pid: str) -> int | None:
+        try:
+            with open(os.path.join(self.PROC_DIR_PATH, pid, "io"), mode="rb") as io_file:
+                counters = dict(line.split(b":", 1) for line in io_file.read().splitlines() if b":" in line)
+            return int(counters[b"write_bytes"]) - int(counters.get(b"cancelled_write_bytes", 0))
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def sample(self) -> int:
+        """
+            Samples every process of the group once.
+
+            Returns:
+                int: The summed resident memory of the group in bytes.
+        """
+        rss_bytes = 0
+        try:
+            pids = [name for name in os.listdir(self.PROC_DIR_PATH) if name.isdigit()]
+        except OSError:
+            return rss_bytes
+
+        for pid in pids:
+            process = self.__read_process(pid)
+            if process is None:
+                continue
+            rss_bytes += process[0]
+            bytes_written = self.__read_bytes_written(pid)
+            with self.lock:
+                self.cpu_ticks[pid] = process[1:]
+                if bytes_written is not None:
+                    self.bytes_written[pid] = bytes_written
+
+        with self.lock:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss_bytes)
+            if self.rss_limit_bytes is not None and rss_bytes > self.rss_limit_bytes and \
+                    not self.limit_exceeded.is_set():
+                self.limit_exceeded_rss_bytes = rss_bytes
+                self.limit_exceeded.set()
+        return rss_bytes
+
+    def __sample_until_stopped(self):
+        while True:
+            self.sample()
+            if self.stop_event.wait(self.interval):
+                return
+
+    def start(self):
+        """
+            Starts sampling in a background thread, if the platform supports it.
+        """
+        if self.is_supported():
+            self.thread = threading.Thread(target=self.__sample_until_stopped, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+            Stops sampling and waits for the background thread.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def get_cpu_times(self) -> tuple[float, float] | None:
+        """
+            Returns the user and system CPU time of the group's processes at their last sample, or None if nothing
+            was sampled.
+        """
+        with self.lock:
+            if not self.cpu_ticks:
+                return None
+            ticks_per_second = os.sysconf("SC_CLK_TCK")
+            return (sum(user for user, _ in self.cpu_ticks.values()) / ticks_per_second,
+                    sum(system for _, system in self.cpu_ticks.values()) / ticks_per_second)
+
+    def get_bytes_written(self) -> int | None:
+        """
+            Returns the bytes the group's processes had written to storage at their last sample, or None if nothing
+            was sampled.
+        """
+        with self.lock:
+            if not self.bytes_written:
+                return None
+            return sum(self.bytes_written.values())
+
+
+def measure_resource_usage(wall_time: float, rusage=None, sampler: ProcessGroupSampler | None = None) \
+        -> ResourceUsage:
+    """
+        Combines the resource usage reported when a script was reaped with the samples of its process group.
+
+        Parameters:
+            wall_time (float): The number of seconds the script ran.
+            rusage (resource.struct_rusage | None): The usage reported by 'os.wait4' for the script, which includes
+                                                    the children it waited for, or None if it is not available.
+            sampler (ProcessGroupSampler | None): The sampler that watched the process group of the script.
+
+        Returns:
+            ResourceUsage: The usage of the run.
+
+        Behavior:
+            - CPU times and bytes written come from 'rusage' when available, since samples miss the last moments
+              of a run. Samples are used otherwise.
+            - The peak RSS is the larger of the peak of the biggest single process and the peak of the summed
+              process group.
+    """
+    user_time = system_time = peak_rss_bytes = bytes_written = None
+    if rusage is not None:
+        user_time = rusage.ru_utime
+        system_time = rusage.ru_stime
+        # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+        peak_rss_bytes = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        bytes_written = rusage.ru_oublock * 512 if sys.platform.startswith("linux") else None
+
+    if sampler is not None:
+        if sampler.peak_rss_bytes:
+            peak_rss_bytes = max(peak_rss_bytes or 0, sampler.peak_rss_bytes)
+        if user_time is None and sampler.get_cpu_times() is not None:
+            user_time, system_time = sampler.get_cpu_times()
+        if bytes_written is None:
+            bytes_written = sampler.get_bytes_written()
+
+    return ResourceUsage(wall_time=wall_time, user_time=user_time, system_time=system_time,
+                         peak_rss_bytes=peak_rss_bytes, bytes_written=bytes_written)
+
+
+class ResourceTotals:
+    """
+        Accumulates the resource usage of every script run of a task. Safe to update from concurrent runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+            Forgets every recorded run, e.g. when a new task starts.
+        """
+        with self.lock:
+            self.runs = 0
+            self.wall_time = 0.0
+            self.cpu_time = 0.0
+            self.peak_rss_bytes = 0
+            self.bytes_written = 0
+
+    def add(self, usage: ResourceUsage):
+        """
+            Records the usage of a finished run. The peak RSS is the maximum over all runs, the rest is summed.
+        """
+        with self.lock:
+            self.runs += 1
+            self.wall_time += usage.wall_time
+            self.cpu_time += usage.get_cpu_time() or 0.0
+            self.peak_rss_bytes = max(self.peak_rss_bytes, usage.peak_rss_bytes or 0)
+            self.bytes_written += usage.bytes_written or 0
+
+    def describe(self) -> str:
+        """
+            Describes the totals in one line.
+        """
+        with self.lock:
+            return (f"Script runs: {self.runs}, wall time {self.wall_time:.1f}s, CPU time {self.cpu_time:.1f}s, "
+                    f"highest peak RSS {self.peak_rss_bytes / MEGABYTE:.0f} MB, "
+                    f"written {self.bytes_written / MEGABYTE:.1f} MB")
@@ -0,0 +1,262 @@
+import ast
+import base64
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from importlib import metadata
+
+from modules.disk_cache import DiskCache
+
+
+class ScriptResultCache:
+    CACHE_DEFAULT_DIR = "../cache/script_results"
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+    MAX_RESTORED_BYTES = 64 * 1024 * 1024
+    TRACKED_LIBRARIES = ("torch", "tensorflow", "keras", "tf_keras", "transformers", "datasets",
+                         "pandas", "numpy", "scikit-learn")
+    IGNORED_DIR_NAMES = ("__pycache__",)
+
+    __environment_fingerprint = None
+
+    def __init__(self, cache_dir_path: str = None, max_bytes: int = None):
+        if cache_dir_path is None:
+            cache_dir_path = ScriptResultCache.CACHE_DEFAULT_DIR
+        if max_bytes is None:
+            max_bytes = ScriptResultCache.DEFAULT_MAX_BYTES
+
+        self.cache = DiskCache(cache_dir_path=cache_dir_path, max_bytes=max_bytes)
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """
+            Computes the SHA-256 hash of a file without loading it into memory at once.
+
+            Parameters:
+                file_path (str): The path of the file.
+
+            Returns:
+                str: The hexadecimal digest of the file content.
+        """
+        file_hash = hashlib.sha256()
+        with open(file_path, mode="rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def get_environment_fingerprint() -> str:
+        """
+            Describes the interpreter and the versions of the ML libraries the scripts are executed with.
+
+            Returns:
+                str: The interpreter version followed by the version of every tracked library.
+
+            Behavior:
+                - The fingerprint is computed once per process, since the environment does not change during a run.
+        """
+        if ScriptResultCache.__environment_fingerprint is None:
+            versions = [sys.executable, sys.version]
+            for library in ScriptResultCache.TRACKED_LIBRARIES:
+                try:
+                    versions.append(f"{library}=={metadata.version(library)}")
+                except metadata.PackageNotFoundError:
+                    versions.append(f"{library}==none")
+            ScriptResultCache.__environment_fingerprint = "\n".join(versions)
+        return ScriptResultCache.__environment_fingerprint
+
+    @staticmethod
+    def snapshot(task_dir_path: str) -> dict:
+        """
+            Records the size and modification time of every file in the task directory.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+
+            Returns:
+                dict: A mapping of relative file paths (with "/" separators) to their size and modification time.
+        """
+        snapshot = {}
+        for dir_path, dir_names, file_names in os.walk(task_dir_path):
+            dir_names[:] = [dir_name for dir_name in dir_names if dir_name not in ScriptResultCache.IGNORED_DIR_NAMES]
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(file_path, task_dir_path).replace(os.sep, "/")
+                stat = os.stat(file_path)
+                snapshot[relative_path] = [stat.st_size, stat.st_mtime_ns]
+        return snapshot
+
+    @staticmethod
+    def __resolve_task_path(task_dir_path: str, candidate: str) -> str | None:
+        """
+            Resolves a string literal of a script to a path inside the task directory.
+
+            Returns:
+                str | None: The normalized relative path, or None if the literal does not name an existing path
+                            inside the task directory.
+        """
+        if not candidate or len(candidate) > 256 or "\n" in candidate or os.path.isabs(candidate):
+            return None
+
+        relative_path = os.path.normpath(candidate)
+        if relative_path == "." or relative_path.startswith(".."):
+            return None
+
+        if not os.path.exists(os.path.join(task_dir_path, relative_path)):
+            return None
+        return relative_path.replace(os.sep, "/")
+
+    @staticmethod
+    def find_referenced_paths(task_dir_path: str, script_name: str) -> set:
+        """
+            Finds the files and directories of the task directory a script can read.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                set: Relative paths named by string literals of the script, and local modules it imports.
+
+            Behavior:
+                - Scripts are executed with the task directory as working directory, so every string literal
+                  naming an existing path inside it, such as "data/train.csv" or "data", is treated as an input.
+                - Imported local modules are scanned recursively.
+        """
+        referenced_paths = set()
+        pending_scripts = [script_name]
+        scanned_scripts = set()
+
+        while pending_scripts:
+            current_script = pending_scripts.pop()
+            if current_script in scanned_scripts:
+                continue
+            scanned_scripts.add(current_script)
+
+            try:
+                with open(os.path.join(task_dir_path, current_script), mode="r", encoding="utf-8") as file:
+                    tree = ast.parse(file.read())
+            except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+                continue
+
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                    relative_path = ScriptResultCache.__resolve_task_path(task_dir_path, node.value)
+                    if relative_path is not None:
+                        referenced_paths.add(relative_path)
+                elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                    if isinstance(node, ast.Import):
+                        module_names = [alias.name for alias in node.names]
+                    else:
+                        module_names = [node.module] if node.module and node.level == 0 else []
+
+                    for module_name in module_names:
+                        module_path = module_name.replace(".", "/")
+                        for candidate in (f"{module_path}.py", module_path):
+                            relative_path = ScriptResultCache.__resolve_task_path(task_dir_path, candidate)
+                            if relative_path is not None:
+                                referenced_paths.add(relative_path)
+                                if relative_path.endswith(".py"):
+                                    pending_scripts.append(relative_path)
+
+        return referenced_paths
+
+    def __build_key(self, task_dir_path: str, script_name: str, excluded_paths: set) -> str:
+        """
+            Builds the cache key of a script run from the script, its inputs and the environment.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+                excluded_paths (set): Relative paths of files the script writes, which are not inputs.
+
+            Returns:
+                str: The hexadecimal cache key.
+        """
+        inputs = []
+        for relative_path in sorted(self.find_referenced_paths(task_dir_path, script_name)):
+            full_path = os.path.join(task_dir_path, relative_path)
+            if os.path.isfile(full_path):
+                file_paths = [relative_path]
+            else:
+                file_paths = sorted(path for path in self.snapshot(full_path))
+                file_paths = [f"{relative_path}/{path}" for path in file_paths]
+
+            for file_path in file_paths:
+                if file_path not in excluded_paths:
+                    inputs.append([file_path, self.hash_file(os.path.join(task_dir_path, file_path))])
+
+        key_content = json.dumps({
+            "script": script_name,
+            "script_hash": self.hash_file(os.path.join(task_dir_path, script_name)),
+            "inputs": inputs,
+            "environment": self.get_environment_fingerprint()
+        })
+        return hashlib.sha256(key_content.encode("utf-8")).hexdigest()
+
+    def __build_outputs_key(self, task_dir_path: str, script_name: str) -> str:
+        script_hash = self.hash_file(os.path.join(task_dir_path, script_name))
+        return hashlib.sha256(f"outputs:{script_name}:{script_hash}".encode("utf-8")).hexdigest()
+
+    def lookup(self, task_dir_path: str, script_name: str) -> str | None:
+        """
+            Looks up the result of an earlier run of an unchanged script with unchanged inputs.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                str | None: The cached observation marked as cached, or None on a cache miss.
+
+            Behavior:
+                - On a hit, restores the files the cached run wrote (e.g. submission.txt) into the task directory.
+        """
+        excluded_paths = set(self.cache.get(self.__build_outputs_key(task_dir_path, script_name)) or [])
+        entry = self.cache.get(self.__build_key(task_dir_path, script_name, excluded_paths))
+        if entry is None:
+            return None
+
+        for relative_path, encoded_content in entry["files"].items():
+            full_path = os.path.join(task_dir_path, *relative_path.split("/"))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, mode="wb") as file:
+                file.write(base64.b64decode(encoded_content))
+
+        restored_files = f" Restored output files: {', '.join(entry['files'])}." if entry["files"] else ""
+        return (f"[Cached result: '{script_name}' and its inputs are unchanged since the run at {entry['created']}. "
+                f"The script was not executed again.{restored_files}]\n"
+                f"{entry['observation']}")
+
+    def store(self, task_dir_path: str, script_name: str, snapshot_before: dict, observation: str):
+        """
+            Stores the result of a successful script run.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+                snapshot_before (dict): The snapshot of the task directory taken before the run.
+                observation (str): The observation produced by the run.
+
+            Behavior:
+                - Files created or modified by the run are stored with the result, so a hit can restore them.
+                - These files are remembered as outputs of the script and excluded from its inputs.
+                - Runs whose output files exceed 'MAX_RESTORED_BYTES' are not cached.
+        """
+        snapshot_after = self.snapshot(task_dir_path)
+        written_paths = sorted(path for path, state in snapshot_after.items() if snapshot_before.get(path) != state)
+        if sum(snapshot_after[path][0] for path in written_paths) > self.MAX_RESTORED_BYTES:
+            return
+
+        files = {}
+        for relative_path in written_paths:
+            with open(os.path.join(task_dir_path, *relative_path.split("/")), mode="rb") as file:
+                files[relative_path] = base64.b64encode(file.read()).decode("ascii")
+
+        self.cache.put(self.__build_outputs_key(task_dir_path, script_name), written_paths)
+        self.cache.put(self.__build_key(task_dir_path, script_name, set(written_paths)), {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "observation": observation,
+            "files": files
+        })
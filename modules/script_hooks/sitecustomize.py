@@ -0,0 +1,188 @@
+"""
+    Start-up hooks for the scripts executed by the agent.
+
+    The script runner puts this directory first on PYTHONPATH, so the interpreter imports this module at start-up.
+    Depending on the environment variables set for the script, it:
+        - Pins the script to the CPUs listed in MLAGENTIO_CPU_AFFINITY (e.g. "0,1,2,3").
+        - Limits the address space of the script and of the processes it starts to MLAGENTIO_ADDRESS_SPACE_LIMIT_MB.
+        - Sets the intra-op and inter-op thread counts of PyTorch right after it is imported, from
+          MLAGENTIO_TORCH_THREADS and MLAGENTIO_TORCH_INTEROP_THREADS.
+        - Caps the training length of smoke runs, from MLAGENTIO_SMOKE_MAX_EPOCHS and MLAGENTIO_SMOKE_MAX_STEPS:
+            - 'keras.Model.fit' and 'tf_keras.Model.fit': 'epochs' and 'steps_per_epoch' are capped.
+            - 'transformers.TrainingArguments': 'num_train_epochs' and 'max_steps' are capped and checkpoints are
+              not saved.
+
+    Putting this directory first on PYTHONPATH shadows the 'sitecustomize' module of the environment (set up by
+    the distribution, conda or a virtual environment), so that module is found further down 'sys.path' and run at
+    the end of this one.
+
+    This module must only depend on the standard library.
+"""
+import functools
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+FIT_EPOCHS_POSITION = 3  # fit(x, y, batch_size, epochs, ...)
+
+
+def apply_cpu_affinity():
+    cpus = os.environ.get("MLAGENTIO_CPU_AFFINITY")
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {int(cpu) for cpu in cpus.split(",")})
+        except (OSError, ValueError) as e:
+            print(f"Execution profile: could not set the CPU affinity: {e}", file=sys.stderr)
+
+
+def apply_address_space_limit():
+    limit_mb = os.environ.get("MLAGENTIO_ADDRESS_SPACE_LIMIT_MB")
+    if not limit_mb:
+        return
+    try:
+        import resource
+        limit_bytes = int(limit_mb) * 1024 * 1024
+        _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+        if hard_limit != resource.RLIM_INFINITY:
+            limit_bytes = min(limit_bytes, hard_limit)
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard_limit))
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Memory limit: could not limit the address space: {e}", file=sys.stderr)
+
+
+def set_torch_threads(module):
+    if os.environ.get("MLAGENTIO_TORCH_THREADS"):
+        module.set_num_threads(int(os.environ["MLAGENTIO_TORCH_THREADS"]))
+    if os.environ.get("MLAGENTIO_TORCH_INTEROP_THREADS"):
+        module.set_num_interop_threads(int(os.environ["MLAGENTIO_TORCH_INTEROP_THREADS"]))
+
+
+def cap_fit(module):
+    max_epochs = int(os.environ["MLAGENTIO_SMOKE_MAX_EPOCHS"])
+    max_steps = int(os.environ.get("MLAGENTIO_SMOKE_MAX_STEPS", "5"))
+    model_class = getattr(module, "Model", None)
+    if model_class is None or getattr(model_class.fit, "smoke_capped", False):
+        return
+    original_fit = model_class.fit
+
+    @functools.wraps(original_fit)
+    def fit(self, *args, **kwargs):
+        initial_epoch = kwargs.get("initial_epoch", 0)
+        if len(args) > FIT_EPOCHS_POSITION:
+            args = list(args)
+            args[FIT_EPOCHS_POSITION] = min(args[FIT_EPOCHS_POSITION], initial_epoch + max_epochs)
+        else:
+            kwargs["epochs"] = min(kwargs.get("epochs", 1), initial_epoch + max_epochs)
+        if kwargs.get("steps_per_epoch") is not None:
+            kwargs["steps_per_epoch"] = min(kwargs["steps_per_epoch"], max_steps)
+        return original_fit(self, *args, **kwargs)
+
+    fit.smoke_capped = True
+    model_class.fit = fit
+
+
+def cap_training_arguments(module):
+    max_epochs = int(os.environ["MLAGENTIO_SMOKE_MAX_EPOCHS"])
+    max_steps = int(os.environ.get("MLAGENTIO_SMOKE_MAX_STEPS", "5"))
+    arguments_class = getattr(module, "TrainingArguments", None)
+    if arguments_class is None or getattr(arguments_class.__post_init__, "smoke_capped", False):
+        return
+    original_post_init = arguments_class.__post_init__
+
+    @functools.wraps(original_post_init)
+    def __post_init__(self):
+        self.num_train_epochs = min(self.num_train_epochs, max_epochs)
+        self.max_steps = max_steps if self.max_steps is None or self.max_steps <= 0 else min(self.max_steps,
+                                                                                              max_steps)
+        self.save_strategy = "no"
+        self.load_best_model_at_end = False
+        original_post_init(self)
+
+    __post_init__.smoke_capped = True
+    arguments_class.__post_init__ = __post_init__
+
+
+def build_patches() -> dict:
+    patches = {}
+    if os.environ.get("MLAGENTIO_TORCH_THREADS") or os.environ.get("MLAGENTIO_TORCH_INTEROP_THREADS"):
+        patches["torch"] = set_torch_threads
+    if os.environ.get("MLAGENTIO_SMOKE_MAX_EPOCHS"):
+        patches["keras"] = cap_fit
+        patches["tf_keras"] = cap_fit
+        patches["transformers.training_args"] = cap_training_arguments
+    return patches
+
+
+class PatchingLoader(importlib.abc.Loader):
+    """
+        Wraps the loader of a patched module and applies the patch once the module has been executed.
+    """
+
+    def __init__(self, loader, patch):
+        self.loader = loader
+        self.patch = patch
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        try:
+            self.patch(module)
+        except Exception as e:
+            print(f"Script hooks: could not patch '{module.__name__}': {e}", file=sys.stderr)
+
+
+class PatchingFinder(importlib.abc.MetaPathFinder):
+    """
+        Finds the modules to patch with the other finders and wraps their loaders.
+    """
+
+    def __init__(self, patches: dict):
+        self.patches = patches
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.patches:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = PatchingLoader(spec.loader, self.patches[fullname])
+        return spec
+
+
+def run_shadowed_sitecustomize():
+    """
+        Runs the 'sitecustomize' module this module shadows, if there is one, as the interpreter would have.
+    """
+    hooks_dir_path = os.path.dirname(os.path.abspath(__file__))
+    search_path = [path for path in sys.path if os.path.abspath(path or os.curdir) != hooks_dir_path]
+    spec = importlib.machinery.PathFinder.find_spec("sitecustomize", search_path)
+    if spec is None or spec.loader is None:
+        return
+    try:
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception as e:
+        print(f"Script hooks: error in the shadowed sitecustomize '{spec.origin}': {e}", file=sys.stderr)
+
+
+apply_cpu_affinity()
+apply_address_space_limit()
+PATCHES = build_patches()
+if PATCHES:
+    sys.meta_path.insert(0, PatchingFinder(PATCHES))
+run_shadowed_sitecustomize()
@@ -0,0 +1,197 @@
+import re
+
+
+class PatchError(Exception):
+    """
+        Raised when an edit returned as a patch cannot be applied to the script, or the patched script is invalid.
+    """
+
+
+class ScriptPatcher:
+    """
+        Lets the supporting assistant edit a script by returning only the changed parts, as search/replace blocks
+        or a unified diff, instead of the whole edited script. The patch is applied locally, so the assistant does
+        not pay output tokens for the unchanged lines.
+
+        A patch that does not apply cleanly, or that breaks a python script which compiled before, is rejected,
+        and the edit falls back to regenerating the whole script.
+    """
+    SEARCH_MARKER = "<<<<<<< SEARCH"
+    DIVIDER = "======="
+    REPLACE_MARKER = ">>>>>>> REPLACE"
+    HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+    PATCH_INSTRUCTIONS = (
+        "Do not return the whole edited script. Return only the changes, as one or more search/replace blocks in "
+        "this exact format:\n"
+        f"{SEARCH_MARKER}\n"
+        "[lines copied exactly from the script, including indentation, enough to be found only once]\n"
+        f"{DIVIDER}\n"
+        "[the lines that replace them]\n"
+        f"{REPLACE_MARKER}\n"
+        "Blocks are applied in order. To delete lines, leave the replacement empty. To add lines, include the line "
+        "before them in the search part. Return nothing but the blocks."
+    )
+
+    def __init__(self):
+        self.patched_edits = 0
+        self.regenerated_edits = 0
+
+    def build_instructions(self, edit_instruction: str) -> str:
+        """
+            Appends the patch format to an edit instruction.
+        """
+        return f"{edit_instruction}\n\n{self.PATCH_INSTRUCTIONS}"
+
+    @staticmethod
+    def __split_lines(text: str) -> list[str]:
+        return text.split("\n") if text else []
+
+    def __parse_search_replace_blocks(self, response: str) -> list[tuple[list[str], list[str], int | None]]:
+        blocks = []
+        search_lines = replace_lines = None
+        for line in response.split("\n"):
+            marker = line.strip()
+            if marker == self.SEARCH_MARKER:
+                search_lines = []
+            elif marker == self.DIVIDER and search_lines is not None and replace_lines is None:
+                replace_lines = []
+            elif marker == self.REPLACE_MARKER and replace_lines is not None:
+                blocks.append((search_lines, replace_lines, None))
+                search_lines = replace_lines = None
+            elif replace_lines is not None:
+                replace_lines.append(line)
+            elif search_lines is not None:
+                search_lines.append(line)
+        if search_lines is not None:
+            raise PatchError("A search/replace block is not closed")
+        return blocks
+
+    def __parse_unified_diff(self, response: str) -> list[tuple[list[str], list[str], int | None]]:
+        blocks = []
+        hunk = None
+        for line in response.split("\n"):
+            header = self.HUNK_HEADER_PATTERN.match(line)
+            if header is not None:
+                hunk = ([], [], int(header.group(1)))
+                blocks.append(hunk)
+            elif hunk is None or line.startswith(("```", "\\")):
+                # File headers ("---"/"+++") come before the first hunk, inside a hunk they are changed lines
+                continue
+            elif line.startswith("-"):
+                hunk[0].append(line[1:])
+            elif line.startswith("+"):
+                hunk[1].append(line[1:])
+            else:
+                # A context line, whose leading space is sometimes lost when the diff is copied
+                hunk[0].append(line[1:] if line.startswith(" ") else line)
+                hunk[1].append(line[1:] if line.startswith(" ") else line)
+        # Blank lines after the last hunk are not part of it
+        for old_lines, new_lines, _ in blocks[-1:]:
+            while old_lines and new_lines and old_lines[-1] == new_lines[-1] == "":
+                old_lines.pop()
+                new_lines.pop()
+        return blocks
+
+    def parse(self, response: str) -> list[tuple[list[str], list[str], int | None]]:
+        """
+            Parses the patch returned by the assistant.
+
+            Returns:
+                list[tuple[list[str], list[str], int | None]]: The lines to find, the lines replacing them and, for
+                                                               a unified diff hunk, the line they start at.
+
+            Raises:
+                PatchError: If the response contains neither search/replace blocks nor unified diff hunks.
+        """
+        if response is None:
+            raise PatchError("The assistant returned no patch")
+        response = response.replace("\r\n", "\n")
+        blocks = self.__parse_search_replace_blocks(response)
+        if not blocks:
+            blocks = self.__parse_unified_diff(response)
+        if not blocks:
+            raise PatchError("The response contains no search/replace blocks or unified diff hunks")
+        return blocks
+
+    @staticmethod
+    def __find(lines: list[str], search_lines: list[str], line_hint: int | None) -> int:
+        """
+            Finds where the searched lines start, first exactly and then ignoring trailing whitespace.
+        """
+        for normalize in (lambda line: line, lambda line: line.rstrip()):
+            searched = [normalize(line) for line in search_lines]
+            normalized = [normalize(line) for line in lines]
+            positions = [position for position in range(len(lines) - len(searched) + 1)
+                         if normalized[position:position + len(searched)] == searched]
+            if len(positions) == 1:
+                return positions[0]
+            if len(positions) > 1:
+                if line_hint is None:
+                    raise PatchError(f"The lines to replace occur {len(positions)} times: "
+                                     f"'{search_lines[0].strip()}'")
+                return min(positions, key=lambda position: abs(position + 1 - line_hint))
+        raise PatchError(f"The lines to replace were not found: '{search_lines[0].strip()}'")
+
+    def apply(self, content: str, response: str) -> str:
+        """
+            Applies the patch returned by the assistant to a script.
+
+            Parameters:
+                content (str): The script before the edit.
+                response (str): The search/replace blocks or unified diff returned by the assistant.
+
+            Returns:
+                str: The edited script.
+
+            Raises:
+                PatchError: If the patch cannot be parsed or a block does not match exactly one place in the script.
+        """
+        lines = self.__split_lines(content.replace("\r\n", "\n"))
+        for search_lines, replace_lines, line_hint in self.parse(response):
+            # Blank lines around a block do not help finding it, but make it fail on a whitespace difference
+            while search_lines and replace_lines and search_lines[0].strip() == replace_lines[0].strip() == "":
+                search_lines, replace_lines = search_lines[1:], replace_lines[1:]
+            while search_lines and replace_lines and search_lines[-1].strip() == replace_lines[-1].strip() == "":
+                search_lines, replace_lines = search_lines[:-1], replace_lines[:-1]
+            if not search_lines:
+                raise PatchError("A block has nothing to search for")
+
+            position = self.__find(lines, search_lines, line_hint)
+            lines[position:position + len(search_lines)] = replace_lines
+        return "\n".join(lines)
+
+    @staticmethod
+    def validate(original_content: str, edited_content: str, file_name: str):
+        """
+            Checks that patching did not break a python script.
+
+            Raises:
+                PatchError: If the script compiled before the edit and does not compile after it.
+        """
+        if not file_name.endswith(".py"):
+            return
+        try:
+            compile(original_content, file_name, "exec")
+        except (SyntaxError, ValueError):
+            return
+        try:
+            compile(edited_content, file_name, "exec")
+        except (SyntaxError, ValueError) as e:
+            raise PatchError(f"The patched script does not compile: {e}")
+
+    def reset_statistics(self):
+        """
+            Resets the counts of patched and regenerated edits, e.g. when a new task starts.
+        """
+        self.patched_edits = 0
+        self.regenerated_edits = 0
+
+    def describe_statistics(self) -> str | None:
+        """
+            Returns:
+                str | None: How many edits were applied as patches and how many regenerated the whole script, or None
+                            if there were no edits.
+        """
+        if not self.patched_edits and not self.regenerated_edits:
+            return None
+        return f"Script edits: {self.patched_edits} applied as patches, {self.regenerated_edits} regenerated in full"
@@ -0,0 +1,379 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from modules.execution_profile import ExecutionScheduler, build_hooks_environment
+from modules.fork_server import ForkServer
+from modules.output_capture import BoundedOutput
+from modules.resource_usage import MEGABYTE, ProcessGroupSampler, ResourceTotals, ResourceUsage, \
+    measure_resource_usage
+from modules.training_monitor import TrainingMonitor
+
+
+class ScriptRunResult:
+
+    def __init__(self, stdout: str, stderr: str, return_code: int | None, wall_time: float,
+                 stop_reason: str | None = None, elision: str | None = None, last_metrics: str | None = None,
+                 resource_usage: ResourceUsage | None = None, memory_error: str | None = None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elision = elision
+        self.return_code = return_code
+        self.wall_time = wall_time
+        self.stop_reason = stop_reason
+        self.last_metrics = last_metrics
+        self.resource_usage = resource_usage
+        self.memory_error = memory_error
+
+    def to_observation(self) -> str:
+        """
+            Formats the result as an observation for the main assistant.
+
+            Returns:
+                str: The output and errors of the script, followed by its exit code or by why it was stopped, and
+                     by the resources it used.
+        """
+        output = []
+        if self.stdout:
+            output.append("Script Output: '''")
+            output.append(self.stdout)
+
+        if self.stderr:
+            output.append("Errors and Warnings:")
+            output.append(self.stderr)
+
+        if self.elision is not None:
+            output.append(f"Output shortened ({self.elision}).")
+
+        if self.stop_reason is not None:
+            output.append(f"Script execution was stopped after {self.wall_time:.0f} seconds because "
+                          f"{self.stop_reason}. The output collected until then is shown above.")
+            if self.last_metrics is not None:
+                output.append(f"Last metrics seen: {self.last_metrics}")
+        else:
+            if self.memory_error is not None:
+                output.append(self.memory_error)
+            output.append(f"Process finished with exit code {self.return_code}")
+        if self.resource_usage is not None:
+            output.append(self.resource_usage.describe())
+        output.append("'''")
+
+        return "\n".join(output)
+
+
+class ReapedProcess:
+    """
+        A 'subprocess.Popen' child that is reaped with 'os.wait4' in a background thread, so its resource usage is
+        collected. It has the subset of the 'subprocess.Popen' interface that 'ScriptRunner' uses.
+    """
+
+    def __init__(self, popen: subprocess.Popen):
+        self.popen = popen
+        self.args = popen.args
+        self.pid = popen.pid
+        self.stdout = popen.stdout
+        self.stderr = popen.stderr
+        self.returncode = None
+        self.rusage = None
+        self.exited = threading.Event()
+        threading.Thread(target=self.__reap, daemon=True).start()
+
+    def __reap(self):
+        try:
+            _, status, self.rusage = os.wait4(self.pid, 0)
+            self.returncode = os.waitstatus_to_exitcode(status)
+            self.popen.returncode = self.returncode
+        except ChildProcessError:
+            self.returncode = self.popen.wait()
+        finally:
+            self.exited.set()
+
+    def wait(self, timeout: float | None = None) -> int:
+        """
+            Waits for the script to exit.
+
+            Raises:
+                subprocess.TimeoutExpired: If the script is still running after 'timeout' seconds.
+        """
+        if not self.exited.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+
+class ScriptRunner:
+    KILL_GRACE_SECONDS = 2.0
+    READER_JOIN_SECONDS = 5.0
+    MONITOR_POLL_SECONDS = 0.5
+    MEMORY_ERROR_MARKERS = ("MemoryError", "std::bad_alloc", "Cannot allocate memory")
+    # GPU memory is not limited by the address space limit, e.g. "torch.OutOfMemoryError: CUDA out of memory"
+    GPU_MEMORY_ERROR_MARKERS = ("CUDA out of memory", "CUDA error: out of memory", "CUBLAS_STATUS_ALLOC_FAILED")
+
+    def __init__(self, timeout: float | None = None, output_head_chars: int = BoundedOutput.DEFAULT_HEAD_CHARS,
+                 output_tail_chars: int = BoundedOutput.DEFAULT_TAIL_CHARS, fork_server: ForkServer | None = None,
+                 monitor: TrainingMonitor | None = None, scheduler: ExecutionScheduler | None = None,
+                 resource_totals: ResourceTotals | None = None, memory_limit_mb: int | None = None,
+                 address_space_limit_mb: int | None = None):
+        """
+            Parameters:
+                timeout (float | None): The number of seconds a script may run, or None for no limit.
+                output_head_chars (int): The number of characters kept from the start of each output stream.
+                output_tail_chars (int): The number of characters kept from the end of each output stream.
+                fork_server (ForkServer | None): The server scripts are forked from, or None to start a fresh
+                                                 interpreter for every script.
+                monitor (TrainingMonitor | None): The rules that stop a diverging or stalled training early.
+                scheduler (ExecutionScheduler | None): Chooses the CPU threads and affinity of every script.
+                resource_totals (ResourceTotals | None): Where the resource usage of every run is added.
+                memory_limit_mb (int | None): The RSS the script and its child processes may use together. The
+                                              script is stopped once a sample exceeds it. Enforced on Linux only.
+                address_space_limit_mb (int | None): The virtual memory every process of the script may reserve
+                                                     (RLIMIT_AS), after which allocations fail. POSIX only. With
+                                                     the fork server it comes on top of the address space of the
+                                                     preloaded libraries.
+        """
+        self.timeout = timeout
+        self.fork_server = fork_server
+        self.monitor = monitor
+        self.scheduler = scheduler
+        self.resource_totals = resource_totals if resource_totals is not None else ResourceTotals()
+        self.memory_limit_mb = memory_limit_mb
+        self.address_space_limit_mb = address_space_limit_mb
+        self.output_head_chars = output_head_chars
+        self.output_tail_chars = output_tail_chars
+        self.deadline = None
+
+    def set_deadline(self, deadline: float | None):
+        """
+            Sets the wall-clock deadline of the current task, after which no script may keep running.
+
+            Parameters:
+                deadline (float | None): A 'time.monotonic()' timestamp, or None to remove the deadline.
+        """
+        self.deadline = deadline
+
+    def get_time_limit(self) -> tuple[float | None, str | None]:
+        """
+            Computes how long the next script may run.
+
+            Returns:
+                tuple[float | None, str | None]: The number of seconds the script may run and a description of the
+                                                 limit, or (None, None) if the script may run indefinitely.
+
+            Behavior:
+                - Uses the smaller of the per-script timeout and the time remaining until the task deadline.
+        """
+        limits = []
+        if self.timeout is not None:
+            limits.append((self.timeout, f"it exceeded the per-script timeout of {self.timeout:g} seconds"))
+        if self.deadline is not None:
+            limits.append((max(0.0, self.deadline - time.monotonic()), "the wall-clock budget of the task ran out"))
+
+        if not limits:
+            return None, None
+        return min(limits, key=lambda limit: limit[0])
+
+    def __start_process(self, command: list, cwd: str, env_overrides: dict | None):
+        """
+            Starts the script in its own process group, so it can be killed together with its children.
+            The output of the script is unbuffered, so it can be collected while the script runs.
+            If a fork server is configured, the script is forked from it, falling back to a fresh interpreter
+            if the server is not available. On POSIX, the script is reaped with 'os.wait4' to collect its resource
+            usage.
+        """
+        env = os.environ.copy()
+        env.update(env_overrides or {})
+        env["PYTHONUNBUFFERED"] = "1"
+        if self.fork_server is not None:
+            try:
+                return self.fork_server.spawn(command, cwd, env)
+            except (OSError, RuntimeError) as e:
+                print(f"Fork server unavailable, starting a fresh interpreter: {e}")
+
+        if os.name == "nt":
+            return subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        return ReapedProcess(subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                                              stderr=subprocess.PIPE, start_new_session=True))
+
+    @staticmethod
+    def kill_process_group(process: subprocess.Popen):
+        """
+            Kills a script together with every process it started, such as DataLoader workers.
+
+            Parameters:
+                process (ReapedProcess | subprocess.Popen | ForkedProcess): The process started by 'run'.
+
+            Behavior:
+                - On POSIX, sends SIGTERM to the process group, then SIGKILL to whatever is left after a short
+                  grace period.
+                - On Windows, kills the whole process tree with 'taskkill'.
+        """
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            return
+
+        try:
+            process.wait(timeout=ScriptRunner.KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    @staticmethod
+    def __read_stream(stream, output: BoundedOutput):
+        for chunk in iter(lambda: stream.read1(64 * 1024), b""):
+            output.feed(chunk)
+        stream.close()
+
+    def __wait(self, process, time_limit: float | None, limit_description: str | None,
+               monitor: TrainingMonitor | None, monitor_stop: threading.Event,
+               cancel_event: threading.Event | None, sampler: ProcessGroupSampler | None) -> str | None:
+        """
+            Waits for the script to exit and returns why it has to be stopped, or None if it exited by itself.
+        """
+        memory_limited = sampler is not None and sampler.rss_limit_bytes is not None
+        if monitor is None and cancel_event is None and not memory_limited:
+            try:
+                process.wait(timeout=time_limit)
+                return None
+            except subprocess.TimeoutExpired:
+                return limit_description
+
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        while True:
+            poll_seconds = self.MONITOR_POLL_SECONDS
+            if deadline is not None:
+                poll_seconds = max(0.0, min(poll_seconds, deadline - time.monotonic()))
+            try:
+                process.wait(timeout=poll_seconds)
+                return None
+            except subprocess.TimeoutExpired:
+                pass
+
+            if cancel_event is not None and cancel_event.is_set():
+                return "it was cancelled"
+            if monitor_stop.is_set():
+                return f"the training monitor detected that {monitor.stop_reason}"
+            if memory_limited and sampler.limit_exceeded.is_set():
+                return (f"the memory limit was exceeded at {sampler.limit_exceeded_rss_bytes / MEGABYTE:.0f} MB "
+                        f"(limit: {self.memory_limit_mb} MB for the script and its child processes)")
+            if deadline is not None and time.monotonic() >= deadline:
+                return limit_description
+
+    def run(self, command: list, cwd: str, env: dict | None = None, cancel_event: threading.Event | None = None,
+            on_start=None) -> ScriptRunResult:
+        """
+            Runs a script command, stopping it if it exceeds its time limit.
+
+            Parameters:
+                command (list): The command running the script, such as [sys.executable, "train.py"].
+                cwd (str): The working directory of the script.
+                env (dict | None): Environment variables to add to the environment of the script.
+                cancel_event (threading.Event | None): An event that stops the script once it is set.
+                on_start (callable | None): Called with the stdout and stderr buffers once the script has started,
+                                            so its output can be read while it runs.
+
+            Returns:
+                ScriptRunResult: The output collected from the script, its exit code and, if the script was
+                                 stopped, the reason why.
+
+            Behavior:
+                - The output is streamed into bounded head and tail buffers while the script runs, so memory stays
+                  constant and the output produced before a timeout is kept.
+                - On timeout, when the training monitor detects a diverging or stalled training, or when the
+                  script exceeds its memory limit, kills the whole process group of the script.
+                - Processes the script left behind are killed once it exits.
+                - If a scheduler is set, the script runs with the execution profile it chooses. Variables in 'env'
+                  take precedence over the profile.
+                - Measures the wall time, CPU time, peak RSS and bytes written of the script and its children, and
+                  adds them to 'resource_totals'.
+                - If the script fails to allocate memory under its address space limit, the observation says so.
+        """
+        if self.scheduler is None:
+            return self.__run(command, cwd, env, cancel_event, on_start)
+
+        profile, lease = self.scheduler.acquire()
+        try:
+            return self.__run(command, cwd, {**profile.build_environment(), **(env or {})}, cancel_event, on_start)
+        finally:
+            self.scheduler.release(lease)
+
+    def __run(self, command: list, cwd: str, env: dict | None, cancel_event: threading.Event | None,
+              on_start) -> ScriptRunResult:
+        time_limit, limit_description = self.get_time_limit()
+        if self.address_space_limit_mb is not None:
+            env = {**build_hooks_environment(), **(env or {}),
+                   "MLAGENTIO_ADDRESS_SPACE_LIMIT_MB": str(self.address_space_limit_mb)}
+        start_time = time.monotonic()
+        process = self.__start_process(command, cwd, env)
+        sampler = None
+        if os.name != "nt":
+            sampler = ProcessGroupSampler(process.pid, rss_limit_bytes=self.memory_limit_mb * MEGABYTE
+                                          if self.memory_limit_mb is not None else None)
+            sampler.start()
+
+        monitor = self.monitor.copy() if self.monitor is not None else None
+        monitor_stop = threading.Event()
+        line_callback = None
+        if monitor is not None:
+            def line_callback(line: str):
+                if monitor.observe_line(line) is not None:
+                    monitor_stop.set()
+
+        stdout = BoundedOutput(self.output_head_chars, self.output_tail_chars, line_callback=line_callback)
+        stderr = BoundedOutput(self.output_head_chars, self.output_tail_chars, line_callback=line_callback)
+        readers = [threading.Thread(target=self.__read_stream, args=(process.stdout, stdout), daemon=True),
+                   threading.Thread(target=self.__read_stream, args=(process.stderr, stderr), daemon=True)]
+        for reader in readers:
+            reader.start()
+        if on_start is not None:
+            on_start(stdout, stderr)
+
+        stop_reason = None
+        try:
+            stop_reason = self.__wait(process, time_limit, limit_description, monitor, monitor_stop, cancel_event,
+                                      sampler)
+        finally:
+            self.kill_process_group(process)
+            process.wait()
+            if sampler is not None:
+                sampler.stop()
+        wall_time = time.monotonic() - start_time
+
+        for reader in readers:
+            reader.join(timeout=self.READER_JOIN_SECONDS)
+
+        elisions = [f"{name}: {output.describe_elision()}"
+                    for name, output in (("stdout", stdout), ("stderr", stderr)) if output.describe_elision()]
+
+        resource_usage = measure_resource_usage(wall_time, rusage=getattr(process, "rusage", None), sampler=sampler)
+        self.resource_totals.add(resource_usage)
+
+        stderr_text = stderr.getvalue()
+        memory_error = None
+        if self.address_space_limit_mb is not None and stop_reason is None and process.returncode != 0 and \
+                any(marker in stderr_text for marker in self.MEMORY_ERROR_MARKERS) and \
+                not any(marker in stderr_text for marker in self.GPU_MEMORY_ERROR_MARKERS):
+            memory_error = (f"Memory limit exceeded at {self.address_space_limit_mb} MB: the script failed to "
+                            f"allocate memory beyond the address space limit of each of its processes.")
+
+        return ScriptRunResult(stdout=stdout.getvalue(),
+                               stderr=stderr_text,
+                               return_code=None if stop_reason else process.returncode,
+                               wall_time=wall_time,
+                               stop_reason=stop_reason,
+                               elision="; ".join(elisions) if elisions else None,
+                               last_metrics=monitor.describe_last_metrics()
+                               if monitor is not None and stop_reason else None,
+                               resource_usage=resource_usage,
+                               memory_error=memory_error)
@@ -0,0 +1,145 @@
+import ast
+import builtins
+import importlib.util
+import os
+import symtable
+
+
+class ScriptValidator:
+    MODULE_NAMES = ("__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__",
+                    "__annotations__", "__path__", "__cached__")
+    MAX_PROBLEMS = 10
+
+    def __init__(self, check_edits: bool = False):
+        self.check_edits = check_edits
+        self.module_availability = {}
+
+    def __is_module_available(self, module_name: str, script_dir_path: str) -> bool:
+        """
+            Checks whether a top-level module can be imported by a script, without importing it.
+        """
+        if os.path.exists(os.path.join(script_dir_path, f"{module_name}.py")) or \
+                os.path.isdir(os.path.join(script_dir_path, module_name)):
+            return True
+
+        if module_name not in self.module_availability:
+            try:
+                self.module_availability[module_name] = importlib.util.find_spec(module_name) is not None
+            except (ImportError, ValueError):
+                self.module_availability[module_name] = False
+        return self.module_availability[module_name]
+
+    @staticmethod
+    def __is_main_block(node: ast.stmt) -> bool:
+        return isinstance(node, ast.If) and ast.unparse(node.test).replace("'", '"') == '__name__ == "__main__"'
+
+    def __find_missing_modules(self, tree: ast.Module, script_dir_path: str) -> list[tuple[int, str]]:
+        # Only imports that always run can be reported as blocking. Imports in 'try' blocks and their handlers,
+        # conditional branches and functions are often fallbacks for a module that is not installed.
+        unconditional_statements = []
+        for statement in tree.body:
+            if self.__is_main_block(statement):
+                unconditional_statements.extend(statement.body)
+            else:
+                unconditional_statements.append(statement)
+
+        problems = []
+        reported = set()
+        for node in unconditional_statements:
+            if isinstance(node, ast.Import):
+                module_names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                module_names = [node.module]
+            else:
+                continue
+
+            for module_name in module_names:
+                top_level_name = module_name.split(".")[0]
+                if top_level_name in reported or self.__is_module_available(top_level_name, script_dir_path):
+                    continue
+                reported.add(top_level_name)
+                problems.append((node.lineno, f"ModuleNotFoundError: No module named '{top_level_name}'"))
+        return problems
+
+    def __find_undefined_names(self, source: str, tree: ast.Module, script_name: str) -> list[tuple[int, str]]:
+        if any(isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names)
+               for node in ast.walk(tree)):
+            return []
+
+        module_table = symtable.symtable(source, script_name, "exec")
+        defined = set(dir(builtins)) | set(self.MODULE_NAMES)
+        referenced = set()
+        tables = [module_table]
+        while tables:
+            table = tables.pop()
+            tables.extend(table.get_children())
+            for symbol in table.get_symbols():
+                if table is module_table or symbol.is_declared_global():
+                    if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace():
+                        defined.add(symbol.get_name())
+                if symbol.is_referenced() and (table is module_table or symbol.is_global()):
+                    referenced.add(symbol.get_name())
+
+        undefined = referenced - defined
+        first_lines = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and node.id in undefined:
+                first_lines[node.id] = min(first_lines.get(node.id, node.lineno), node.lineno)
+
+        return [(line, f"NameError: name '{name}' is not defined") for name, line in first_lines.items()]
+
+    def validate(self, task_dir_path: str, script_name: str) -> list[str]:
+        """
+            Checks a script for problems that would make it fail right away, without running it.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                list[str]: The problems found, each prefixed with its line number. Empty if the script passed.
+
+            Behavior:
+                - Compiles the script and reports a syntax error, if any. The other checks need a valid script.
+                - Reports modules that are not installed and not next to the script. Only imports at the top
+                  level of the script or of its 'if __name__ == "__main__":' block are checked. Imports in 'try'
+                  blocks, exception handlers, other conditional branches and functions may be optional and are not
+                  checked.
+                - Reports names that are used but never defined, imported or built in. This check is skipped for
+                  scripts with 'from ... import *', whose names cannot be known without importing.
+        """
+        script_path = os.path.join(task_dir_path, script_name)
+        with open(script_path, mode="r", encoding="utf-8") as file:
+            source = file.read()
+
+        try:
+            compile(source, script_name, "exec", dont_inherit=True)
+            tree = ast.parse(source, script_name)
+        except SyntaxError as e:
+            problem = f"line {e.lineno}: {type(e).__name__}: {e.msg}"
+            if e.text:
+                problem += f"\n    {e.text.strip()}"
+            return [problem]
+        except ValueError as e:
+            return [f"line 1: {type(e).__name__}: {e}"]
+
+        problems = self.__find_missing_modules(tree, os.path.dirname(os.path.abspath(script_path)))
+        problems += self.__find_undefined_names(source, tree, script_name)
+        return [f"line {line}: {message}" for line, message in sorted(problems)]
+
+    def describe_problems(self, script_name: str, problems: list[str]) -> str:
+        """
+            Formats the problems found in a script as a compact observation.
+
+            Parameters:
+                script_name (str): The script path relative to the task directory.
+                problems (list[str]): The problems returned by 'validate'.
+
+            Returns:
+                str: A header followed by at most 'MAX_PROBLEMS' problems.
+        """
+        lines = [f"Pre-execution check of '{script_name}' found {len(problems)} problem(s):"]
+        lines.extend(f"- {problem}" for problem in problems[:self.MAX_PROBLEMS])
+        if len(problems) > self.MAX_PROBLEMS:
+            lines.append(f"- ... and {len(problems) - self.MAX_PROBLEMS} more")
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+import csv
+import os
+import shutil
+import tempfile
+
+from modules.execution_profile import build_hooks_environment
+from modules.script_runner import ScriptRunner
+
+
+class SmokeRunner:
+    DEFAULT_MAX_ROWS = 200
+    DEFAULT_MAX_EPOCHS = 1
+    DEFAULT_MAX_STEPS = 5
+    DEFAULT_TIMEOUT = 120.0
+    TABLE_EXTENSIONS = {".csv": ",", ".tsv": "\t"}
+    LINE_EXTENSIONS = (".jsonl",)
+    IGNORED_DIR_NAMES = ("__pycache__",)
+
+    def __init__(self, max_rows: int = DEFAULT_MAX_ROWS, max_epochs: int = DEFAULT_MAX_EPOCHS,
+                 max_steps: int = DEFAULT_MAX_STEPS, timeout: float = DEFAULT_TIMEOUT,
+                 run_before_execution: bool = False):
+        self.max_rows = max_rows
+        self.max_epochs = max_epochs
+        self.max_steps = max_steps
+        self.run_before_execution = run_before_execution
+        self.script_runner = ScriptRunner(timeout=timeout)
+
+    @staticmethod
+    def __pick_rows(row_count: int, max_rows: int) -> set[int]:
+        """
+            Picks evenly spaced rows, so files sorted by label still keep every label.
+        """
+        return {index * row_count // max_rows for index in range(max_rows)}
+
+    def __sample_table(self, file_path: str, delimiter: str) -> tuple[int, int] | None:
+        with open(file_path, mode="r", encoding="utf-8", newline="") as file:
+            row_count = sum(1 for _ in csv.reader(file, delimiter=delimiter)) - 1
+        if row_count <= self.max_rows:
+            return None
+
+        picked_rows = self.__pick_rows(row_count, self.max_rows)
+        sampled_path = f"{file_path}.sampled"
+        with open(file_path, mode="r", encoding="utf-8", newline="") as source, \
+                open(sampled_path, mode="w", encoding="utf-8", newline="") as destination:
+            reader = csv.reader(source, delimiter=delimiter)
+            writer = csv.writer(destination, delimiter=delimiter, lineterminator="\n")
+            writer.writerow(next(reader))
+            for index, row in enumerate(reader):
+                if index in picked_rows:
+                    writer.writerow(row)
+        os.replace(sampled_path, file_path)
+        return row_count, len(picked_rows)
+
+    def __sample_lines(self, file_path: str) -> tuple[int, int] | None:
+        with open(file_path, mode="rb") as file:
+            row_count = sum(1 for line in file if line.strip())
+        if row_count <= self.max_rows:
+            return None
+
+        picked_rows = self.__pick_rows(row_count, self.max_rows)
+        sampled_path = f"{file_path}.sampled"
+        with open(file_path, mode="rb") as source, open(sampled_path, mode="wb") as destination:
+            lines = (line for line in source if line.strip())
+            for index, line in enumerate(lines):
+                if index in picked_rows:
+                    destination.write(line if line.endswith(b"\n") else line + b"\n")
+        os.replace(sampled_path, file_path)
+        return row_count, len(picked_rows)
+
+    def create_copy(self, task_dir_path: str) -> tuple[str, str]:
+        """
+            Copies the task directory and down-samples the data files of the copy.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+
+            Returns:
+                tuple[str, str]: The path to the copy and a note describing the smoke run.
+
+            Behavior:
+                - CSV and TSV files keep their header and 'max_rows' evenly spaced records.
+                  JSON Lines files keep 'max_rows' evenly spaced lines.
+                - Files that cannot be parsed are copied unchanged.
+        """
+        smoke_dir_path = tempfile.mkdtemp(prefix="mlagentio_smoke_run_")
+        shutil.copytree(task_dir_path, smoke_dir_path, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(*self.IGNORED_DIR_NAMES))
+
+        sampled_files = []
+        for dir_path, _, file_names in os.walk(smoke_dir_path):
+            for file_name in sorted(file_names):
+                file_path = os.path.join(dir_path, file_name)
+                extension = os.path.splitext(file_name)[1].lower()
+                try:
+                    if extension in self.TABLE_EXTENSIONS:
+                        sampled = self.__sample_table(file_path, self.TABLE_EXTENSIONS[extension])
+                    elif extension in self.LINE_EXTENSIONS:
+                        sampled = self.__sample_lines(file_path)
+                    else:
+                        continue
+                except (csv.Error, UnicodeDecodeError, StopIteration):
+                    continue
+
+                if sampled is not None:
+                    relative_path = os.path.relpath(file_path, smoke_dir_path).replace(os.sep, "/")
+                    sampled_files.append(f"{relative_path} {sampled[0]} -> {sampled[1]} rows")
+
+        note = (f"[Smoke run on a temporary copy of the task directory, with training capped at "
+                f"{self.max_epochs} epoch(s) and {self.max_steps} steps for Keras and Transformers. "
+                f"Down-sampled data: {', '.join(sampled_files) if sampled_files else 'none'}. "
+                f"Files written by the script were discarded.]")
+        return smoke_dir_path, note
+
+    @staticmethod
+    def remove_copy(smoke_dir_path: str):
+        """
+            Removes a copy created by 'create_copy'.
+        """
+        shutil.rmtree(smoke_dir_path, ignore_errors=True)
+
+    def get_environment(self) -> dict:
+        """
+            Builds the environment variables that cap the training length of a smoke run.
+
+            Returns:
+                dict: The variables to add to the environment of the script.
+        """
+        return {**build_hooks_environment(),
+                "MLAGENTIO_SMOKE_MAX_EPOCHS": str(self.max_epochs),
+                "MLAGENTIO_SMOKE_MAX_STEPS": str(self.max_steps)}
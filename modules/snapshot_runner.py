@@ -0,0 +1,259 @@
+"""
+    Runs a task script in two parts, so the state right after its training step can be snapshotted and reused.
+
+    Usage:
+        python snapshot_runner.py snapshot <script_name> <snapshot_path>
+        python snapshot_runner.py resume <script_name> <snapshot_path>
+
+    The script is executed with the same '__main__' semantics as 'python <script_name>'. The body of an
+    'if __name__ == "__main__":' guard is flattened into top level steps. In 'snapshot' mode every step is
+    executed and the picklable global values are saved right after the last training step. In 'resume' mode
+    only the imports and definitions up to the training step are executed, the saved values are loaded and the
+    steps after the training step are executed.
+
+    This module must only depend on the standard library, since it runs inside the task environment.
+"""
+import ast
+import builtins
+import json
+import os
+import pickle
+import sys
+import types
+
+# Changes whenever the layout of the snapshot file changes, so snapshots of an older layout are never resumed
+SNAPSHOT_FORMAT = "records-1"
+TRAINING_CALL_NAMES = {"fit", "fit_generator", "train", "train_on_batch", "backward"}
+DEFINITION_TYPES = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def is_main_guard(statement: ast.stmt) -> bool:
+    """
+        Checks whether a statement is an 'if __name__ == "__main__":' guard.
+
+        Parameters:
+            statement (ast.stmt): A top level statement of the script.
+
+        Returns:
+            bool: True if the statement is the main guard, False otherwise.
+    """
+    if not isinstance(statement, ast.If) or statement.orelse:
+        return False
+
+    test = statement.test
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == "__main__")
+
+
+def flatten_steps(tree: ast.Module) -> list:
+    """
+        Lists the top level statements of a script with the body of its main guard inlined.
+
+        Parameters:
+            tree (ast.Module): The parsed script.
+
+        Returns:
+            list: The statements in execution order.
+    """
+    steps = []
+    for statement in tree.body:
+        if is_main_guard(statement):
+            steps.extend(statement.body)
+        else:
+            steps.append(statement)
+    return steps
+
+
+def _calls_any(node: ast.AST, function_names: set) -> bool:
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Call):
+            continue
+        if isinstance(child.func, ast.Attribute) and child.func.attr in TRAINING_CALL_NAMES:
+            return True
+        if isinstance(child.func, ast.Name) and child.func.id in function_names:
+            return True
+    return False
+
+
+def find_training_boundary(steps: list) -> int | None:
+    """
+        Finds the last step of a script that trains a model.
+
+        Parameters:
+            steps (list): The flattened statements of the script.
+
+        Returns:
+            int | None: The index of the last training step, or None if the script does not train.
+
+        Behavior:
+            - A step trains if it calls a method such as 'fit', 'train' or 'backward', or a function of the
+              script that (transitively) does so.
+    """
+    functions = {}
+    for step in steps:
+        for node in ast.walk(step):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                functions[node.name] = node
+
+    training_functions = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, function in functions.items():
+            if name not in training_functions and _calls_any(function, training_functions):
+                training_functions.add(name)
+                changed = True
+
+    boundary = None
+    for index, step in enumerate(steps):
+        if isinstance(step, DEFINITION_TYPES):
+            continue
+        if _calls_any(step, training_functions):
+            boundary = index
+    return boundary
+
+
+def split_script(source: str) -> tuple[list, int | None]:
+    """
+        Parses a script and splits it at its training boundary.
+
+        Parameters:
+            source (str): The content of the script.
+
+        Returns:
+            tuple[list, int | None]: The flattened steps and the index of the last training step.
+    """
+    steps = flatten_steps(ast.parse(source))
+    return steps, find_training_boundary(steps)
+
+
+def find_loaded_names(steps: list) -> set:
+    """
+        Collects the names read by a list of statements.
+
+        Parameters:
+            steps (list): The statements to inspect.
+
+        Returns:
+            set: The identifiers loaded anywhere in the statements.
+    """
+    return {node.id for step in steps for node in ast.walk(step)
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+
+
+def build_main_module(script_path: str) -> types.ModuleType:
+    """
+        Creates a fresh '__main__' module for the script, as the interpreter would when running it directly.
+
+        Parameters:
+            script_path (str): The absolute path of the script.
+
+        Returns:
+            types.ModuleType: The module whose namespace the script is executed in.
+    """
+    module = types.ModuleType("__main__")
+    module.__file__ = script_path
+    module.__builtins__ = builtins
+    sys.modules["__main__"] = module
+    sys.argv = [script_path]
+    sys.path[0] = os.path.dirname(script_path)
+    return module
+
+
+def execute_steps(steps: list, module: types.ModuleType, script_path: str):
+    """
+        Executes statements of the script in the namespace of its '__main__' module.
+
+        Parameters:
+            steps (list): The statements to execute, with their original line numbers.
+            module (types.ModuleType): The '__main__' module of the script.
+            script_path (str): The path of the script, used in tracebacks.
+    """
+    if not steps:
+        return
+    code = compile(ast.Module(body=steps, type_ignores=[]), script_path, "exec")
+    exec(code, module.__dict__)
+
+
+def save_snapshot(module: types.ModuleType, snapshot_path: str):
+    """
+        Saves the picklable global values of the script, such as trained models and predictions.
+
+        Parameters:
+            module (types.ModuleType): The '__main__' module of the script.
+            snapshot_path (str): The path of the snapshot file.
+
+        Behavior:
+            - Every value is pickled once, straight into the file, as a (name, value) record, so large values such
+              as models and DataFrames are neither serialized twice nor copied in memory.
+            - Modules, functions and classes are skipped, since they are recreated by re-executing definitions.
+            - Values that cannot be pickled are skipped: the file is truncated back to the end of the previous
+              record. They are listed in the '<snapshot_path>.json' metadata file.
+            - If the snapshot cannot be written at all, the snapshot file is removed and the error is recorded in
+              the metadata file instead of the script's output, which the agent reads.
+    """
+    skipped = []
+    metadata = {}
+    try:
+        with open(snapshot_path, mode="wb") as file:
+            for name, value in list(module.__dict__.items()):
+                if name.startswith("__") or isinstance(value, (types.ModuleType, types.FunctionType, type)):
+                    continue
+                record_start = file.tell()
+                try:
+                    pickle.dump((name, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+                except OSError:
+                    raise
+                except Exception:
+                    file.seek(record_start)
+                    file.truncate()
+                    skipped.append(name)
+    except OSError as e:
+        metadata["error"] = f"The training snapshot could not be saved: {e}"
+        try:
+            os.remove(snapshot_path)
+        except OSError:
+            pass
+
+    metadata["skipped"] = sorted(skipped)
+    with open(f"{snapshot_path}.json", mode="w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+
+
+def load_snapshot(module: types.ModuleType, snapshot_path: str):
+    """
+        Loads the global values saved by 'save_snapshot' into the '__main__' module of the script.
+    """
+    with open(snapshot_path, mode="rb") as file:
+        while True:
+            try:
+                name, value = pickle.load(file)
+            except EOFError:
+                break
+            module.__dict__[name] = value
+
+
+def main(argv: list) -> None:
+    mode, script_name, snapshot_path = argv
+    script_path = os.path.abspath(script_name)
+    with open(script_path, mode="r", encoding="utf-8") as file:
+        source = file.read()
+
+    steps, boundary = split_script(source)
+    module = build_main_module(script_path)
+
+    if mode == "resume":
+        definitions = [step for step in steps[:boundary + 1] if isinstance(step, DEFINITION_TYPES)]
+        execute_steps(definitions, module, script_path)
+        load_snapshot(module, snapshot_path)
+        execute_steps(steps[boundary + 1:], module, script_path)
+        return
+
+    execute_steps(steps[:boundary + 1], module, script_path)
+    save_snapshot(module, snapshot_path)
+    execute_steps(steps[boundary + 1:], module, script_path)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,158 @@
+import math
+import re
+import threading
+
+
+class TrainingMonitor:
+    """
+        Watches the output of a running script and decides when training should be stopped early.
+
+        Metrics are parsed from lines such as "loss: 0.6931 - val_loss: 0.7012" (Keras),
+        "{'eval_loss': 0.52, 'epoch': 1.0}" (Transformers) or "loss=0.41" (custom loops).
+        A line with a validation metric (prefixed with "val_" or "eval_") marks the end of an epoch.
+    """
+    METRIC_PATTERN = re.compile(
+        r"['\"]?\b((?:val_|eval_|train_)?[A-Za-z_/]*(?:loss|acc|accuracy|f1|auc|precision|recall|mae|mse|rmse)"
+        r"[A-Za-z_0-9/]*)['\"]?\s*[:=]\s*(?:tensor\()?([-+]?(?:nan|inf(?:inity)?|\d+\.?\d*(?:e[-+]?\d+)?|\.\d+"
+        r"(?:e[-+]?\d+)?))", re.IGNORECASE)
+    VALIDATION_PREFIXES = ("val_", "eval_")
+    LOWER_IS_BETTER = ("loss", "mae", "mse", "rmse")
+    MIN_IMPROVEMENT = 1e-4
+    MIN_LOSS_OBSERVATIONS = 3
+
+    def __init__(self, stop_on_nan: bool = True, patience: int | None = None, explosion_factor: float | None = 10.0):
+        """
+            Parameters:
+                stop_on_nan (bool): Stops the run as soon as a loss is NaN or infinite.
+                patience (int | None): Stops the run after this many epochs without improvement of the validation
+                                       metric, or never if None.
+                explosion_factor (float | None): Stops the run when the training loss grows above this multiple of
+                                                 the lowest training loss seen, or never if None.
+        """
+        self.stop_on_nan = stop_on_nan
+        self.patience = patience
+        self.explosion_factor = explosion_factor
+        self.lock = threading.Lock()
+        self.reset()
+
+    def copy(self) -> "TrainingMonitor":
+        """
+            Creates a monitor with the same rules that has not seen any output, so concurrent runs are watched
+            independently.
+        """
+        return TrainingMonitor(stop_on_nan=self.stop_on_nan, patience=self.patience,
+                               explosion_factor=self.explosion_factor)
+
+    def reset(self):
+        """
+            Forgets everything seen, so the monitor can watch a new run.
+        """
+        with self.lock:
+            self.last_metrics = {}
+            self.loss_observations = 0
+            self.lowest_loss = None
+            self.validation_metric = None
+            self.best_validation_value = None
+            self.epochs_without_improvement = 0
+            self.stop_reason = None
+
+    @staticmethod
+    def __parse_value(value: str) -> float:
+        return float(value.lower().replace("infinity", "inf"))
+
+    def __is_lower_better(self, metric_name: str) -> bool:
+        return any(metric_name.lower().endswith(suffix) for suffix in self.LOWER_IS_BETTER)
+
+    def __check_validation(self, metrics: dict) -> str | None:
+        validation_metrics = [name for name in metrics if name.lower().startswith(self.VALIDATION_PREFIXES)]
+        if self.patience is None or not validation_metrics:
+            return None
+
+        if self.validation_metric is None:
+            # Prefer the validation loss, otherwise follow the first validation metric reported
+            losses = [name for name in validation_metrics if name.lower().endswith("loss")]
+            self.validation_metric = losses[0] if losses else validation_metrics[0]
+        if self.validation_metric not in metrics:
+            return None
+
+        value = metrics[self.validation_metric]
+        if math.isnan(value):
+            return None
+
+        sign = 1 if self.__is_lower_better(self.validation_metric) else -1
+        if self.best_validation_value is None or \
+                sign * (value - self.best_validation_value) < -self.MIN_IMPROVEMENT:
+            self.best_validation_value = value
+            self.epochs_without_improvement = 0
+            return None
+
+        self.epochs_without_improvement += 1
+        if self.epochs_without_improvement >= self.patience:
+            return (f"'{self.validation_metric}' did not improve for {self.epochs_without_improvement} epochs "
+                    f"(best: {self.best_validation_value:.4g})")
+        return None
+
+    def __check_losses(self, metrics: dict) -> str | None:
+        for name, value in metrics.items():
+            if "loss" in name.lower() and self.stop_on_nan and (math.isnan(value) or math.isinf(value)):
+                return f"'{name}' became {value}"
+
+        training_losses = [value for name, value in metrics.items()
+                           if name.lower().endswith("loss") and not name.lower().startswith(self.VALIDATION_PREFIXES)
+                           and math.isfinite(value)]
+        if self.explosion_factor is None or not training_losses:
+            return None
+
+        loss = training_losses[0]
+        self.loss_observations += 1
+        if self.lowest_loss is not None and self.loss_observations > self.MIN_LOSS_OBSERVATIONS and \
+                self.lowest_loss > 0 and loss > self.explosion_factor * self.lowest_loss:
+            return (f"the training loss exploded to {loss:.4g}, more than {self.explosion_factor:g}x its lowest "
+                    f"value {self.lowest_loss:.4g}")
+        if self.lowest_loss is None or loss < self.lowest_loss:
+            self.lowest_loss = loss
+        return None
+
+    def observe_line(self, line: str) -> str | None:
+        """
+            Parses the metrics on a line of output and checks the stopping rules.
+
+            Parameters:
+                line (str): A line of output of the script.
+
+            Returns:
+                str | None: Why the run should be stopped, or None if it should continue.
+
+            Behavior:
+                - Once a rule fires, the same reason is returned for every later line.
+        """
+        matches = self.METRIC_PATTERN.findall(line)
+        if not matches:
+            return self.stop_reason
+
+        with self.lock:
+            if self.stop_reason is not None:
+                return self.stop_reason
+
+            metrics = {}
+            for name, value in matches:
+                try:
+                    metrics[name] = self.__parse_value(value)
+                except ValueError:
+                    continue
+            self.last_metrics.update(metrics)
+
+            self.stop_reason = self.__check_losses(metrics) or self.__check_validation(metrics)
+            return self.stop_reason
+
+    def describe_last_metrics(self) -> str | None:
+        """
+            Describes the latest value of every metric seen.
+
+            Returns:
+                str | None: The metrics as "name=value" pairs, or None if no metric was seen.
+        """
+        with self.lock:
+            if not self.last_metrics:
+                return None
+            return ", ".join(f"{name}={value:.4g}" for name, value in self.last_metrics.items())
@@ -0,0 +1,182 @@
+import ast
+import hashlib
+import json
+import os
+import sys
+
+from modules.script_cache import ScriptResultCache
+from modules.snapshot_runner import DEFINITION_TYPES, SNAPSHOT_FORMAT, find_loaded_names, split_script
+
+
+class TrainingSnapshot:
+    """
+        Reuses the state of a script right after its training step across runs, so a script whose code up to the
+        training step and whose input files are unchanged only re-executes the code after it.
+
+        Scripts are run through 'snapshot_runner.py', which snapshots the picklable globals after the last training
+        step. A snapshot is kept only if its run succeeds, and the least recently used snapshots are evicted once
+        all snapshots exceed 'max_bytes'.
+    """
+    SNAPSHOT_DEFAULT_DIR = "../cache/training_snapshots"
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+    RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot_runner.py")
+
+    def __init__(self, snapshot_dir_path: str = None, max_bytes: int = None):
+        if snapshot_dir_path is None:
+            snapshot_dir_path = TrainingSnapshot.SNAPSHOT_DEFAULT_DIR
+        if max_bytes is None:
+            max_bytes = TrainingSnapshot.DEFAULT_MAX_BYTES
+
+        self.snapshot_dir_path = os.path.abspath(snapshot_dir_path)
+        self.max_bytes = max_bytes
+        self.pending_snapshots = {}
+
+    def __build_script_dir_path(self, task_dir_path: str, script_name: str) -> str:
+        script_key = f"{os.path.abspath(task_dir_path)}:{script_name}"
+        return os.path.join(self.snapshot_dir_path, hashlib.sha256(script_key.encode("utf-8")).hexdigest()[:20])
+
+    @staticmethod
+    def __fingerprint(task_dir_path: str, training_steps: list) -> str:
+        """
+            Fingerprints everything the state after the training step depends on.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                training_steps (list): The steps of the script up to and including the last training step.
+
+            Returns:
+                str: A hash of the training steps (ignoring comments and line numbers), of the task files they
+                     name in string literals and of the interpreter and library versions.
+        """
+        fingerprint = hashlib.sha256(SNAPSHOT_FORMAT.encode("utf-8"))
+        fingerprint.update(ast.dump(ast.Module(body=training_steps, type_ignores=[])).encode("utf-8"))
+        fingerprint.update(ScriptResultCache.get_environment_fingerprint().encode("utf-8"))
+
+        literals = sorted({node.value for step in training_steps for node in ast.walk(step)
+                           if isinstance(node, ast.Constant) and isinstance(node.value, str)
+                           and 0 < len(node.value) < 256 and "\n" not in node.value})
+        for literal in literals:
+            full_path = os.path.join(task_dir_path, literal)
+            if os.path.isabs(literal) or os.path.normpath(literal) in (".", "..") or not os.path.exists(full_path):
+                continue
+
+            file_paths = [full_path] if os.path.isfile(full_path) else [
+                os.path.join(full_path, *relative_path.split("/"))
+                for relative_path in sorted(ScriptResultCache.snapshot(full_path))]
+            for file_path in file_paths:
+                fingerprint.update(f"{literal}:{os.path.relpath(file_path, task_dir_path)}".encode("utf-8"))
+                fingerprint.update(ScriptResultCache.hash_file(file_path).encode("utf-8"))
+
+        return fingerprint.hexdigest()
+
+    def prepare(self, task_dir_path: str, script_name: str) -> tuple[list, str | None]:
+        """
+            Decides how a script is run: resumed from a training snapshot, run while snapshotting, or run plainly.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+
+            Returns:
+                tuple[list, str | None]: The command to run and, if the run is resumed from a snapshot,
+                                         a note describing which lines are executed again.
+
+            Behavior:
+                - Resumes if a snapshot of a successful run with identical code up to the training step and
+                  identical input files exists, and the code after the training step needs no value that
+                  could not be snapshotted.
+                - Otherwise runs the whole script through the snapshot runner, which snapshots the state right
+                  after the training step. The snapshot is kept by 'finish' only if the run succeeds.
+                - Scripts that cannot be parsed or do not train are run plainly.
+        """
+        plain_command = [sys.executable, script_name]
+        try:
+            with open(os.path.join(task_dir_path, script_name), mode="r", encoding="utf-8") as file:
+                steps, boundary = split_script(file.read())
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+            return plain_command, None
+
+        if boundary is None:
+            return plain_command, None
+
+        script_dir_path = self.__build_script_dir_path(task_dir_path, script_name)
+        snapshot_path = os.path.join(script_dir_path, f"{self.__fingerprint(task_dir_path, steps[:boundary + 1])}.pkl")
+        post_training_steps = steps[boundary + 1:]
+
+        if os.path.exists(snapshot_path) and os.path.exists(f"{snapshot_path}.json") and post_training_steps:
+            with open(f"{snapshot_path}.json", mode="r", encoding="utf-8") as file:
+                skipped = set(json.load(file)["skipped"])
+            defined = {alias.asname or alias.name.split(".")[0]
+                       for step in steps[:boundary + 1] if isinstance(step, (ast.Import, ast.ImportFrom))
+                       for alias in step.names}
+            defined |= {step.name for step in steps[:boundary + 1]
+                        if isinstance(step, DEFINITION_TYPES) and hasattr(step, "name")}
+
+            if not (find_loaded_names(post_training_steps) & (skipped - defined)):
+                os.utime(snapshot_path)
+                first_line = post_training_steps[0].lineno
+                last_line = post_training_steps[-1].end_lineno
+                note = (f"[Resumed from the training snapshot of the previous successful run: the code up to the "
+                        f"training step (line {steps[boundary].lineno}) is unchanged, so only lines "
+                        f"{first_line}-{last_line} were executed again.]")
+                return [sys.executable, self.RUNNER_PATH, "resume", script_name, snapshot_path], note
+
+        os.makedirs(script_dir_path, exist_ok=True)
+        pending_path = os.path.join(script_dir_path, f"pending_{os.getpid()}.pkl")
+        self.pending_snapshots[(task_dir_path, script_name)] = (pending_path, steps[:boundary + 1])
+        return [sys.executable, self.RUNNER_PATH, "snapshot", script_name, pending_path], None
+
+    def finish(self, task_dir_path: str, script_name: str, succeeded: bool):
+        """
+            Keeps or discards the snapshot taken by the latest run of a script.
+
+            Parameters:
+                task_dir_path (str): The path to the task directory.
+                script_name (str): The script path relative to the task directory.
+                succeeded (bool): Whether the run finished with exit code 0.
+
+            Behavior:
+                - On success, the snapshot replaces all earlier snapshots of the script.
+                - On failure, the snapshot is deleted.
+                - Evicts the least recently used snapshots while all snapshots exceed 'max_bytes'.
+        """
+        pending = self.pending_snapshots.pop((task_dir_path, script_name), None)
+        if pending is None:
+            return
+
+        pending_path, training_steps = pending
+        if not succeeded or not os.path.exists(pending_path) or not os.path.exists(f"{pending_path}.json"):
+            for path in (pending_path, f"{pending_path}.json"):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        script_dir_path = os.path.dirname(pending_path)
+        for file_name in os.listdir(script_dir_path):
+            if not file_name.startswith("pending_"):
+                os.remove(os.path.join(script_dir_path, file_name))
+
+        snapshot_path = os.path.join(script_dir_path, f"{self.__fingerprint(task_dir_path, training_steps)}.pkl")
+        os.replace(f"{pending_path}.json", f"{snapshot_path}.json")
+        os.replace(pending_path, snapshot_path)
+
+        self.__evict()
+
+    def __evict(self):
+        snapshots = []
+        total_bytes = 0
+        for dir_path, _, file_names in os.walk(self.snapshot_dir_path):
+            for file_name in file_names:
+                if file_name.endswith(".pkl") and not file_name.startswith("pending_"):
+                    snapshot_path = os.path.join(dir_path, file_name)
+                    stat = os.stat(snapshot_path)
+                    snapshots.append((stat.st_mtime, stat.st_size, snapshot_path))
+                    total_bytes += stat.st_size
+
+        for _, size, snapshot_path in sorted(snapshots):
+            if total_bytes <= self.max_bytes:
+                break
+            for path in (snapshot_path, f"{snapshot_path}.json"):
+                if os.path.exists(path):
+                    os.remove(path)
+            total_bytes -= size
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+from low_level_actions import summarize_diff
+
+
+class VersionStore:
+    """
+        Keeps every version of the task files written by the agent in a content-addressed store, so an edit can be
+        inspected, compared and rolled back without asking the supporting assistant to regenerate the file.
+
+        Every version is stored as a blob named by the SHA-256 of its content, so identical versions, e.g. a restored
+        version, share one blob. The versions only live as long as their task run: the blobs of a run are removed
+        when it ends.
+    """
+    VERSIONS_DEFAULT_DIR = "../cache/versions"
+
+    def __init__(self, versions_dir_path: str = None):
+        if versions_dir_path is None:
+            versions_dir_path = VersionStore.VERSIONS_DEFAULT_DIR
+
+        self.versions_dir_path = versions_dir_path
+        self.blobs_dir_path = None
+        self.versions = []
+        self.lock = threading.Lock()
+
+    def setup(self, task_dir_path: str):
+        """
+            Starts an empty version history for a task run.
+
+            Parameters:
+                task_dir_path (str): The environment directory of the run, whose name identifies the run.
+        """
+        self.clear()
+        self.blobs_dir_path = os.path.join(self.versions_dir_path, os.path.basename(os.path.normpath(task_dir_path)))
+        os.makedirs(self.blobs_dir_path, exist_ok=True)
+
+    def clear(self):
+        """
+            Forgets the versions of the current task run and removes their blobs.
+        """
+        with self.lock:
+            self.versions = []
+            if self.blobs_dir_path is not None:
+                shutil.rmtree(self.blobs_dir_path, ignore_errors=True)
+                self.blobs_dir_path = None
+
+    def __build_blob_path(self, blob_hash: str) -> str:
+        return os.path.join(self.blobs_dir_path, blob_hash)
+
+    def __write_blob(self, content: str) -> str:
+        data = content.encode("utf-8", errors="surrogatepass")
+        blob_hash = hashlib.sha256(data).hexdigest()
+        blob_path = self.__build_blob_path(blob_hash)
+        if not os.path.exists(blob_path):
+            temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, mode="wb") as file:
+                file.write(data)
+            os.replace(temp_path, blob_path)
+        return blob_hash
+
+    def __read_blob(self, blob_hash: str) -> str:
+        with open(self.__build_blob_path(blob_hash), mode="rb") as file:
+            return file.read().decode("utf-8", errors="surrogatepass")
+
+    def is_tracked(self, file_name: str) -> bool:
+        """
+            Checks whether any version of a file is stored.
+        """
+        file_name = os.path.normpath(file_name)
+        with self.lock:
+            return any(version["file_name"] == file_name for version in self.versions)
+
+    def save(self, file_name: str, content: str, note: str) -> int:
+        """
+            Stores a version of a file.
+
+            Parameters:
+                file_name (str): The path of the file relative to the task directory.
+                content (str): The content of this version.
+                note (str): How the version was created, e.g. "Edit Script (AI)".
+
+            Returns:
+                int: The number of the version, starting from 1.
+        """
+        if self.blobs_dir_path is None:
+            raise Exception("The version store is not set up for a task")
+
+        blob_hash = self.__write_blob(content)
+        version = {"file_name": os.path.normpath(file_name), "blob_hash": blob_hash,
+                   "line_count": len(content.splitlines()), "char_count": len(content),
+                   "saved_at": time.strftime("%H:%M:%S"), "note": note}
+        with self.lock:
+            self.versions.append(version)
+            return len(self.versions)
+
+    def get(self, version_number: int) -> dict:
+        """
+            Returns the record of a version.
+
+            Raises:
+                Exception: If there is no such version.
+        """
+        with self.lock:
+            if not 1 <= version_number <= len(self.versions):
+                raise Exception(f"Version {version_number} does not exist. There are {len(self.versions)} versions")
+            return self.versions[version_number - 1]
+
+    def load(self, version_number: int) -> str:
+        """
+            Returns the content of a version.
+        """
+        return self.__read_blob(self.get(version_number)["blob_hash"])
+
+    def describe_versions(self, file_name: str | None = None) -> str:
+        """
+            Lists the stored versions, optionally of a single file.
+
+            Returns:
+                str: One line per version with its number, file, size, time and note.
+        """
+        if file_name is not None:
+            file_name = os.path.normpath(file_name)
+        with self.lock:
+            versions = [(number, version) for number, version in enumerate(self.versions, start=1)
+                        if file_name is None or version["file_name"] == file_name]
+        if not versions:
+            return f"No versions of '{file_name}' are stored." if file_name is not None else "No versions are stored."
+
+        lines = [f"{len(versions)} versions" + (f" of '{file_name}':" if file_name is not None else ":")]
+        for number, version in versions:
+            lines.append(f"v{number}  {version['file_name']}  {version['line_count']} lines  "
+                         f"{version['char_count']} chars  {version['saved_at']}  {version['note']}")
+        return "\n".join(lines)
+
+    def diff(self, old_version_number: int, new_version_number: int) -> str:
+        """
+            Compares two versions.
+
+            Returns:
+                str: The line counts and a unified diff, as returned by 'summarize_diff'.
+        """
+        old_version = self.get(old_version_number)
+        new_version = self.get(new_version_number)
+        return summarize_diff(self.__read_blob(old_version["blob_hash"]), self.__read_blob(new_version["blob_hash"]),
+                              f"v{old_version_number} {old_version['file_name']}",
+                              f"v{new_version_number} {new_version['file_name']}")
+
+    def restore(self, version_number: int, task_dir_path: str, file_name: str | None = None) -> int:
+        """
+            Writes a version back into the task directory.
+
+            Parameters:
+                version_number (int): The version to restore.
+                task_dir_path (str): The task directory.
+                file_name (str | None): The file to write, or None to write the file the version belongs to.
+
+            Returns:
+                int: The number of the new version recording the restore. It shares the blob of the restored version.
+
+            Behavior:
+                - The blob is copied into place with a single atomic replace, so the cost does not depend on the
+                  number of versions or edits since.
+        """
+        version = self.get(version_number)
+        file_name = os.path.normpath(file_name) if file_name else version["file_name"]
+        content = self.__read_blob(version["blob_hash"])
+
+        file_path = os.path.join(task_dir_path, file_name)
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.restore.tmp"
+        with open(temp_path, mode="w", encoding="utf-8", errors="surrogatepass", newline="") as file:
+            file.write(content)
+        os.replace(temp_path, file_path)
+        return self.save(file_name, content, note=f"Restored from v{version_number}")